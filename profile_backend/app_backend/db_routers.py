@@ -0,0 +1,49 @@
+"""
+Database routers for the PostgreSQL profile.
+
+`PrimaryReplicaRouter` is installed when `DATABASE_REPLICA_URL` is set. It
+sends reads of the catalog tables to the `replica` database and everything else
+to `default`. The catalog tables back the movie and sequel lists, search and the
+home feeds, and only change during ingestion. Reviews, history and
+recommendation tables are read and written on the primary, so a user always
+sees their own writes.
+
+Reads inside a transaction on the primary stay on the primary, so ingestion
+never compares against rows the replica has not received yet.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+# `app_label.model_name` of the catalog tables, including the genre link tables.
+CATALOG_MODELS = {
+    'movies_sequels.movie',
+    'movies_sequels.sequel',
+    'movies_sequels.genre',
+    'movies_sequels.movie_genres',
+    'movies_sequels.sequel_genres',
+    'movies_sequels.movieneighbor',
+}
+
+
+class PrimaryReplicaRouter:
+    """
+    Route catalog reads to the replica and every write to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.label_lower not in CATALOG_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives the schema through replication.
+        return db == DEFAULT_DB_ALIAS
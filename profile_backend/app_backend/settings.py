@@ -9,7 +9,8 @@ It includes configurations for:
 - Installed apps and middleware
 - CORS settings for handling cross-origin requests
 - Email backend configuration for SMTP
-- Database settings (SQLite by default)
+- Database settings (SQLite by default, or PostgreSQL with pooling and a read replica)
+- Cache settings (local memory by default), the home feed cache and the recommendation cache
 - Password validation
 - Internationalization and timezone settings
 - Static files configuration
@@ -20,6 +21,7 @@ https://docs.djangoproject.com/en/5.0/topics/settings/
 """
 # settings.py
 import os
+from datetime import timedelta
 from pathlib import Path
 import environ
 from dotenv import load_dotenv
@@ -77,6 +79,8 @@ CORS_ALLOW_HEADERS = [
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+# List endpoints send the next page's cursor URL in a Link header
+CORS_EXPOSE_HEADERS = ['Link']
 CSRF_TRUSTED_ORIGINS = [
     'http://localhost:3000',
 ]
@@ -108,6 +112,14 @@ MIDDLEWARE = [
 # URL configuration
 ROOT_URLCONF = 'app_backend.urls'
 
+# JSON is rendered with orjson when installed, byte for byte as DRF's JSONRenderer would
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'movies_sequels.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 # settings.py
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_NAME = 'sessionid'
@@ -134,13 +146,127 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app_backend.wsgi.application'
 
-# Database configuration
+# Database configuration: SQLite by default. DATABASE_PROFILE=postgres reads the
+# primary from DATABASE_URL and an optional read replica from DATABASE_REPLICA_URL.
+DATABASE_PROFILE = env.str('DATABASE_PROFILE', default='sqlite')
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+DATABASE_ROUTERS = []
+
+# Opt-in SQLite tuning applied to every new connection; see movies_sequels.sqlite_tuning
+SQLITE_TUNING_ENABLED = env.bool('SQLITE_TUNING_ENABLED', default=False)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # milliseconds
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -64 * 1024,  # negative: KiB
+    'temp_store': 'MEMORY',
+}
+
+if DATABASE_PROFILE == 'postgres':
+    # Django's native pool (needs psycopg[pool]) or, with DATABASE_POOL=False,
+    # persistent connections reused for CONN_MAX_AGE seconds after a health check.
+    DATABASE_POOL = env.bool('DATABASE_POOL', default=True)
+
+    def postgres_database(url):
+        """
+        Build a PostgreSQL database entry from a URL with the pooling settings.
+        """
+        database = env.db_url_config(url)
+        if DATABASE_POOL:
+            database['OPTIONS'] = {'pool': {
+                'min_size': env.int('DATABASE_POOL_MIN_SIZE', default=2),
+                'max_size': env.int('DATABASE_POOL_MAX_SIZE', default=10),
+                'timeout': env.int('DATABASE_POOL_TIMEOUT', default=10),
+            }}
+        else:
+            database['CONN_MAX_AGE'] = env.int('CONN_MAX_AGE', default=600)
+            database['CONN_HEALTH_CHECKS'] = True
+        return database
+
+    DATABASES = {'default': postgres_database(env.str('DATABASE_URL'))}
+    if env.str('DATABASE_REPLICA_URL', default=''):
+        # Catalog reads go to the replica; see app_backend.db_routers.
+        DATABASES['replica'] = postgres_database(env.str('DATABASE_REPLICA_URL'))
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+        DATABASE_ROUTERS = ['app_backend.db_routers.PrimaryReplicaRouter']
+
+# Cache configuration (per-process locmem unless CACHE_URL points at a shared backend)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+    # The recommendation cache generation and counters, kept apart so they are never culled with
+    # the entries; point it at a shared, non-evicting store along with CACHE_URL
+    'recommendation-state': env.cache(
+        'RECOMMENDATION_STATE_CACHE_URL', default='locmemcache://recommendation-state'),
+}
+
+# Home feed cache: rendered JSON for the recently-released and most-popular feeds
+FEED_CACHE_ENABLED = env.bool('FEED_CACHE_ENABLED', default=True)
+FEED_CACHE_ALIAS = 'default'
+# Feeds are keyed by the catalog version; the timeout rolls the date window and expires old versions.
+FEED_CACHE_TIMEOUT = 3600
+
+# ETag/Last-Modified of the catalog endpoints, from a catalog version row in the
+# database that every catalog write bumps
+CATALOG_ETAG_ENABLED = env.bool('CATALOG_ETAG_ENABLED', default=True)
+
+# Per-user recommendation cache; invalidated on user activity and catalog reloads
+RECOMMENDATION_CACHE_ENABLED = env.bool('RECOMMENDATION_CACHE_ENABLED', default=True)
+RECOMMENDATION_CACHE_ALIAS = 'default'
+RECOMMENDATION_STATE_CACHE_ALIAS = 'recommendation-state'
+RECOMMENDATION_CACHE_TIMEOUT = 900
+
+# Write-behind buffer for watch/search history POSTs, which are answered with 202.
+# Events still queued when the process is killed are lost; disable for synchronous writes.
+HISTORY_BUFFER_ENABLED = env.bool('HISTORY_BUFFER_ENABLED', default=True)
+HISTORY_BUFFER_MAX_ROWS = 500
+HISTORY_BUFFER_INTERVAL_MS = 250
+HISTORY_BUFFER_MAX_QUEUE = 10000
+# When the queue is full, block requests until it drains (True) or drop events (False)
+HISTORY_BUFFER_BLOCK_WHEN_FULL = True
+
+# History is kept as one rollup row per user and movie. Also append every event to
+# the raw WatchHistory/SearchHistory log, e.g. for analytics (off by default).
+HISTORY_RAW_LOG_ENABLED = env.bool('HISTORY_RAW_LOG_ENABLED', default=False)
+
+# Retention policies applied by the `prune_history` command, per history table:
+# `days` drops rows whose latest event is older, `per_user` keeps each user's newest rows.
+HISTORY_RETENTION = {
+    'WatchHistory': {'days': 90},
+    'SearchHistory': {'days': 90},
+    'WatchHistoryRollup': {'per_user': 500},
+    'SearchHistoryRollup': {'per_user': 500},
+}
+
+# Bayesian movie scores: ratings are averaged with RATING_PRIOR_COUNT extra ratings of
+# RATING_PRIOR_MEAN. Run `manage.py rebuild_rating_stats` after changing either.
+RATING_PRIOR_MEAN = 5.5
+RATING_PRIOR_COUNT = 10
+# How often `sync_user_popularity --loop` copies changed scores to the movies; match it when running from cron
+RATING_SYNC_INTERVAL = timedelta(minutes=1)
+
+# Trending feed: watch/search counts per movie in buckets of TRENDING_BUCKET_SECONDS,
+# scored per window as (window, half-life) with exponential decay, keeping the top K.
+TRENDING_BUCKET_SECONDS = 300
+TRENDING_WINDOWS = {
+    '1h': (timedelta(hours=1), timedelta(minutes=20)),
+    '24h': (timedelta(hours=24), timedelta(hours=6)),
+    '7d': (timedelta(days=7), timedelta(days=2)),
+}
+TRENDING_WATCH_WEIGHT = 1.0
+TRENDING_SEARCH_WEIGHT = 0.5
+TRENDING_TOP_K = 32
+# How often `snapshot_trending --loop` recomputes the snapshots; match it when running from cron
+TRENDING_SNAPSHOT_INTERVAL = timedelta(minutes=5)
+
+# In-process type-ahead suggestion index; reloaded after this many seconds
+SUGGESTION_INDEX_ENABLED = env.bool('SUGGESTION_INDEX_ENABLED', default=True)
+SUGGESTION_INDEX_MAX_AGE = 300
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
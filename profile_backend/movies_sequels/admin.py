@@ -6,6 +6,8 @@ allowing for the management of movies and sequels through the Django admin inter
 
 It includes:
 
+- GenreAdmin: Lists genres with their TMDB ids.
+
 - MovieAdmin: Customizes the admin interface for the Movie model, including:
   - List display of movie titles, release dates, directors, genres, and TMDB popularity.
   - Inline interface for adding and editing related sequels.
@@ -19,7 +21,10 @@ It includes:
 """
 
 from django.contrib import admin
-from .models import Movie, Sequel, RatingReview, WatchHistory, SearchHistory
+from .models import (
+    Genre, Movie, MovieRatingStats, Sequel, RatingReview, WatchHistory, SearchHistory, WatchHistoryRollup,
+    SearchHistoryRollup,
+)
 
 
 class SequelInline(admin.TabularInline):
@@ -31,6 +36,15 @@ class SequelInline(admin.TabularInline):
     extra = 1
 
 
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the Genre model.
+    """
+    list_display = ('name', 'tmdb_id')
+    search_fields = ('name',)
+
+
 @admin.register(Movie)
 class MovieAdmin(admin.ModelAdmin):
     """
@@ -41,7 +55,7 @@ class MovieAdmin(admin.ModelAdmin):
     list_display = ('id','title', 'release_date', 'director', 'genre', 'tmdb_popularity')
     inlines = [SequelInline]
     search_fields = ('title', 'director', 'genre')
-    list_filter = ('release_date', 'genre', 'tmdb_popularity')
+    list_filter = ('release_date', 'genres', 'tmdb_popularity')
 
 
 @admin.register(Sequel)
@@ -84,3 +98,21 @@ class SearchHistoryAdmin(admin.ModelAdmin):
     """
     list_display = ('logged_id', 'logged_name', 'movie')
     search_fields = ('movie', 'logged_name')
+
+@admin.register(WatchHistoryRollup, SearchHistoryRollup)
+class HistoryRollupAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the watch and search history rollups.
+    Displays one row per user and movie with its event count and last event.
+    """
+    list_display = ('logged_id', 'logged_name', 'movie', 'count', 'last_seen')
+    search_fields = ('logged_name',)
+
+@admin.register(MovieRatingStats)
+class MovieRatingStatsAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the per-movie rating aggregates.
+    Displays each movie's rating count, sum and Bayesian score.
+    """
+    list_display = ('movie', 'rating_count', 'rating_sum', 'bayesian_score')
+    search_fields = ('movie__title',)
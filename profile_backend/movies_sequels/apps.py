@@ -3,7 +3,8 @@ Configuration for the 'movies_sequels' Django app.
 
 This module defines the application configuration for the 'movies_sequels' app,
 which manages movie and sequel data. The configuration includes setting the default
-auto field type to 'BigAutoField' and specifying the app name.
+auto field type to 'BigAutoField', specifying the app name and connecting the
+app's signal receivers, including the opt-in SQLite tuning profile.
 
 Attributes:
     default_auto_field (str): The default type of primary key field to use for models in this app.
@@ -11,6 +12,7 @@ Attributes:
 """
 
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class MoviesSequelsConfig(AppConfig):
@@ -21,3 +23,13 @@ class MoviesSequelsConfig(AppConfig):
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'movies_sequels'
+
+    def ready(self):
+        """
+        Connect the app's signal receivers.
+        """
+        # pylint: disable=import-outside-toplevel, unused-import
+        from . import signals  # noqa: F401
+        from .sqlite_tuning import apply_sqlite_pragmas
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='movies_sequels.sqlite_tuning')
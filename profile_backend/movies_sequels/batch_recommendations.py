@@ -0,0 +1,139 @@
+"""
+Batch computation of recommendations for every recently active user.
+
+`RecommendationEngine` merges the neighbours of one user's seed movies per
+request. This module scores all active users at once:
+
+1. ratings and watches are loaded with one query each and grouped by user
+    into a sparse user x movie seed matrix, weighted like the engine does;
+2. the genre links and directors become a movie x feature one-hot matrix, as
+    in `similarity`, and the neighbour table a sparse movie x movie matrix;
+3. the seed matrix times the feature matrix gives every user's genre/director
+    affinity vector in one product. A movie scores its affinity with the user,
+    blended by `AFFINITY_WEIGHT` with the neighbour scores of the user's
+    movies, so movies outside the neighbour lists can still be recommended.
+    Users are split into shards by id, and each shard is scored on a
+    `ProcessPoolExecutor` worker;
+4. the top movies per user replace the `UserRecommendation` table in bulk.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Movie, MovieNeighbor, RatingReview, UserRecommendation, WatchHistoryRollup
+from .movieRecommendation import seed_weight
+from .recommendation_cache import invalidate_recommendations
+from .recommendation_workers import init_worker, score_shard
+from .similarity import content_matrix
+
+# Share of the genre/director affinity in a movie's score; the rest comes from the neighbour table.
+AFFINITY_WEIGHT = 0.5
+
+
+def load_seeds(since):
+    """
+    Return the seed weights of every user active since `since`.
+
+    A rating takes precedence over a watch of the same movie, as in
+    `RecommendationEngine.get_seed_weights`.
+
+    Returns:
+        dict: Maps a user ID to a dict of movie ID to weight.
+    """
+    # pylint: disable=no-member
+    ratings = RatingReview.objects.values_list('logged_id', 'movie_id', 'rating', 'created_at')
+    watches = WatchHistoryRollup.objects.values_list('logged_id', 'movie_id', 'last_seen')
+    seeds, active = {}, set()
+    for user_id, movie_id, last_seen in watches.iterator():
+        seeds.setdefault(user_id, {})[movie_id] = seed_weight(None)
+        if last_seen >= since:
+            active.add(user_id)
+    for user_id, movie_id, rating, created_at in ratings.iterator():
+        seeds.setdefault(user_id, {})[movie_id] = seed_weight(rating)
+        if created_at >= since:
+            active.add(user_id)
+    return {user_id: seeds[user_id] for user_id in active}
+
+
+def neighbor_matrix(movie_index):
+    """
+    Build the sparse movie x neighbour similarity matrix from `MovieNeighbor`.
+    """
+    rows, cols, scores = [], [], []
+    # pylint: disable=no-member
+    for movie_id, neighbor_id, score in MovieNeighbor.objects.values_list(
+            'movie_id', 'neighbor_id', 'score').iterator():
+        rows.append(movie_index[movie_id])
+        cols.append(movie_index[neighbor_id])
+        scores.append(score)
+    size = len(movie_index)
+    return sparse.csr_matrix((np.asarray(scores, dtype=float), (rows, cols)), shape=(size, size))
+
+
+def seed_matrix(user_ids, seeds, movie_index):
+    """
+    Build the sparse user x movie seed weight matrix of `user_ids`.
+    """
+    rows, cols, weights = [], [], []
+    for row, user_id in enumerate(user_ids):
+        for movie_id, weight in seeds[user_id].items():
+            if movie_id in movie_index:
+                rows.append(row)
+                cols.append(movie_index[movie_id])
+                weights.append(weight)
+    return sparse.csr_matrix(
+        (np.asarray(weights, dtype=float), (rows, cols)), shape=(len(user_ids), len(movie_index)))
+
+
+def precompute_recommendations(days=90, limit=10, shards=4, workers=None, batch_size=5000,
+                               affinity_weight=AFFINITY_WEIGHT):
+    """
+    Recompute the stored recommendations of every user active in the last `days` days.
+
+    The table is replaced in one transaction, so users inactive for longer
+    fall back to the per-request path. Cached responses are dropped afterwards.
+
+    Args:
+        days (int): How far back activity makes a user active.
+        limit (int): How many movies to store per user.
+        shards (int): How many user-id shards to score in parallel.
+        workers (int): The worker process count; defaults to the CPU count.
+        batch_size (int): The bulk insert batch size.
+        affinity_weight (float): Share of the genre/director affinity in the score.
+
+    Returns:
+        tuple: The number of users scored and of rows written.
+    """
+    seeds = load_seeds(timezone.now() - timedelta(days=days))
+    # pylint: disable=no-member
+    directors = list(Movie.objects.order_by('id').values_list('id', 'director'))
+    movie_ids = np.fromiter((movie_id for movie_id, _ in directors), dtype=np.int64, count=len(directors))
+    movie_index = {int(movie_id): row for row, movie_id in enumerate(movie_ids)}
+    neighbors = neighbor_matrix(movie_index)
+    features = content_matrix(
+        movie_index, directors, Movie.genres.through.objects.values_list('movie_id', 'genre_id').iterator())
+
+    shard_users = [sorted(user_id for user_id in seeds if user_id % shards == shard) for shard in range(shards)]
+    rows = []
+    with ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=(neighbors, features, movie_ids)) as executor:
+        futures = [
+            executor.submit(score_shard, user_ids, seed_matrix(user_ids, seeds, movie_index), limit, affinity_weight)
+            for user_ids in shard_users if user_ids
+        ]
+        for future in futures:
+            rows.extend(
+                UserRecommendation(logged_id=user_id, movie_id=movie_id, rank=rank, score=score)
+                for user_id, user_movie_ids, scores in future.result()
+                for rank, (movie_id, score) in enumerate(zip(user_movie_ids, scores))
+            )
+    with transaction.atomic():
+        UserRecommendation.objects.all().delete()
+        UserRecommendation.objects.bulk_create(rows, batch_size=batch_size)
+    invalidate_recommendations()
+    return len(seeds), len(rows)
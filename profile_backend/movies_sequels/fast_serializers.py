@@ -0,0 +1,195 @@
+"""
+Serializers for the high-volume catalog lists, built on `.values()` rows.
+
+A `ModelSerializer` builds a model instance per row, then asks every field of
+its serializer to read the instance. For a list of thousands of movies with
+nested sequels, that dominates the request. `ValuesSerializer` is compiled
+once from a `ModelSerializer` class: it keeps the serializer's field order and
+replaces each field with the column it reads and a plain converter, so rows
+come from `.values()` and are turned into dicts in a single pass. A nested
+`many=True` serializer becomes one more `.values()` query over the related
+rows, grouped by parent, as `prefetch_related` would do.
+
+`with_fields` returns the same serializer restricted to a sparse fieldset, so
+only the selected columns are read and an unselected nested list is never
+queried.
+
+The dicts equal what the `ModelSerializer` returns, so the rendered JSON is the
+same. Their floats are checked as they are converted, so `FastJSONRenderer`
+does not have to walk the lists again before encoding them with orjson. Only plain model fields, primary-key relations and nested reverse
+relations are supported; anything else is refused when the serializer is
+compiled.
+"""
+from collections import defaultdict
+from functools import cached_property, lru_cache
+
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .renderers import CheckedFloats, formats_differently
+from .serializers import MovieSerializer, SequelSerializer
+
+# Converters for fields whose `to_representation` is a type cast the column
+# value already satisfies, or a cheap method call.
+CONVERTERS = {
+    serializers.CharField: None,
+    serializers.URLField: None,
+    serializers.EmailField: None,
+    serializers.IntegerField: None,
+    serializers.BooleanField: None,
+    serializers.FloatField: float,
+}
+
+
+def _converter(field):
+    """
+    Return the function turning a column value into the field's representation,
+    or None when the value is already it.
+    """
+    if type(field) in CONVERTERS:
+        return CONVERTERS[type(field)]
+    # Without a `format` of its own, a DateField uses `DATE_FORMAT`.
+    iso_dates = api_settings.DATE_FORMAT.lower() == ISO_8601
+    if type(field) is serializers.DateField and not hasattr(field, 'format') and iso_dates:
+        return lambda value: value.isoformat()
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    A `ModelSerializer` compiled to read `.values()` rows.
+
+    Args:
+        serializer_class (type): The `ModelSerializer` to reproduce.
+        fields (tuple): The names of the fields to keep; all of them by default.
+    """
+    def __init__(self, serializer_class, fields=None):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.fields = fields
+
+    @lru_cache(maxsize=64)
+    def with_fields(self, fields):
+        """
+        Return this serializer restricted to some of its fields, compiled once per selection.
+
+        Args:
+            fields (tuple): Field names, such as those from `fieldsets.requested_fields`.
+        """
+        return ValuesSerializer(self.serializer_class, fields)
+
+    @cached_property
+    def compiled(self):
+        """
+        Compile the serializer's fields on first use, once the app registry is ready.
+
+        Returns:
+            tuple: The `(key, column, converter)` of every plain field and the
+                `(key, accessor, ValuesSerializer, foreign key column)` of every
+                nested list, in serializer field order.
+        """
+        fields, nested = [], []
+        for key, field in self.serializer_class().fields.items():
+            if field.write_only or self.fields is not None and key not in self.fields:
+                continue
+            if '.' in field.source or field.source == '*':
+                raise ValueError(f'{self.serializer_class.__name__}.{key}: dotted sources are not supported')
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                child = ValuesSerializer(type(field.child))
+                nested.append((key, field.source, child, relation.field.attname))
+                fields.append((key, None, None))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                fields.append((key, self.model._meta.get_field(field.source).attname, None))
+            elif isinstance(field, (serializers.BaseSerializer, serializers.RelatedField,
+                                    serializers.ManyRelatedField, serializers.SerializerMethodField)):
+                raise ValueError(f'{self.serializer_class.__name__}.{key}: {type(field).__name__} is not supported')
+            else:
+                fields.append((key, field.source, _converter(field)))
+        return fields, nested
+
+    @property
+    def columns(self):
+        """
+        The columns `values` selects.
+        """
+        fields, _ = self.compiled
+        columns = [column for _, column, _ in fields if column is not None]
+        if 'pk' not in columns and self.model._meta.pk.attname not in columns:
+            columns.append(self.model._meta.pk.attname)
+        return columns
+
+    def values(self, queryset, *extra):
+        """
+        Narrow a queryset of the serializer's model to the rows `serialize` reads.
+
+        Args:
+            queryset (QuerySet): Filtered and ordered as the response needs;
+                prefetches are dropped, as the nested lists are fetched here.
+            *extra (str): More columns to select without serializing them, such
+                as a pagination key.
+
+        Returns:
+            QuerySet: Dicts holding the serialized columns.
+        """
+        columns = self.columns
+        return queryset.prefetch_related(None).values(*columns, *(name for name in extra if name not in columns))
+
+    def serialize(self, rows):
+        """
+        Turn rows from `values` into the serializer's representation.
+
+        Args:
+            rows (iterable): Dicts from `values`, such as a page of them.
+
+        Returns:
+            CheckedFloats: One dict per row, equal to the `ModelSerializer`'s
+                `data`, with its floats checked for `FastJSONRenderer`.
+        """
+        rows = list(rows)
+        fields, nested = self.compiled
+        pk = self.model._meta.pk.attname
+        data = CheckedFloats()
+        children = {}
+        for key, accessor, child, foreign_key in nested:
+            children[key], mismatch = self._fetch_children(accessor, child, foreign_key, [row[pk] for row in rows])
+            data.mismatch |= mismatch
+        for row in rows:
+            item = {}
+            for key, column, convert in fields:
+                if column is None:
+                    item[key] = children[key].get(row[pk], [])
+                    continue
+                value = row[column]
+                if value is not None:
+                    if convert is not None:
+                        value = convert(value)
+                    if type(value) is float and formats_differently(value):
+                        data.mismatch = True
+                item[key] = value
+            data.append(item)
+        return data
+
+    def _fetch_children(self, accessor, child, foreign_key, parent_ids):
+        """
+        Serialize the related rows of every parent in one query.
+
+        Returns:
+            tuple: A dict mapping a parent's primary key to its serialized
+                related rows, and whether any of them failed the float check.
+        """
+        if not parent_ids:
+            return {}, False
+        related = self.model._meta.get_field(accessor).related_model
+        columns = child.columns
+        queryset = related._default_manager.filter(**{f'{foreign_key}__in': parent_ids})
+        rows = list(queryset.values(*columns, *([foreign_key] if foreign_key not in columns else [])))
+        data = child.serialize(rows)
+        grouped = defaultdict(list)
+        for row, item in zip(rows, data):
+            grouped[row[foreign_key]].append(item)
+        return grouped, data.mismatch
+
+
+movie_values = ValuesSerializer(MovieSerializer)
+sequel_values = ValuesSerializer(SequelSerializer)
@@ -0,0 +1,52 @@
+"""
+Cache of the rendered home feeds.
+
+The recently-released and most-popular endpoints are requested on every frontend
+page load, but only change when the catalog does. This module stores each feed as
+rendered JSON bytes in the cache named by `FEED_CACHE_ALIAS`, so a hit skips the
+queries, the serializers and the renderer.
+
+Entries are keyed by the catalog version from `catalog_version`, which every
+catalog write bumps in the database. Once a process has bumped it, every other
+process misses on its next request and builds the feed again, even when each
+one has its own local-memory cache; stale entries expire with the timeout.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .catalog_version import catalog_version
+from .renderers import FastJSONRenderer
+
+RECENTLY_RELEASED = 'recently-released'
+MOST_POPULAR = 'most-popular'
+FEEDS = (RECENTLY_RELEASED, MOST_POPULAR)
+
+
+def _cache():
+    return caches[settings.FEED_CACHE_ALIAS]
+
+
+def _key(name, version):
+    return f'feed:{name}:{version}'
+
+
+def get_feed(name, build):
+    """
+    Return the rendered JSON of a feed, building and caching it on a miss.
+
+    Args:
+        name (str): One of `FEEDS`.
+        build (callable): Returns the feed data to render.
+
+    Returns:
+        bytes: The feed rendered as JSON.
+    """
+    if not settings.FEED_CACHE_ENABLED:
+        return FastJSONRenderer().render(build())
+    version, _ = catalog_version()
+    key = _key(name, version)
+    payload = _cache().get(key)
+    if payload is None:
+        payload = FastJSONRenderer().render(build())
+        _cache().set(key, payload, settings.FEED_CACHE_TIMEOUT)
+    return payload
@@ -0,0 +1,102 @@
+"""
+Sparse fieldsets for the catalog endpoints.
+
+The movie and sequel endpoints accept two query parameters:
+
+- `fields` lists the fields to return, for example `?fields=id,title,image_url`;
+- `expand` lists nested relations to include, such as `?expand=sequels`.
+
+Lists default to `LIST_FIELDS`, the fields a poster grid needs, without nested
+relations. Single objects default to every field and relation, like
+`MovieDetailsView`. Only the columns backing the selected fields are read from
+the database, and a relation that is not expanded is never queried.
+"""
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+# The default fields of a list response.
+LIST_FIELDS = ('id', 'title', 'image_url')
+
+
+@lru_cache(maxsize=None)
+def field_names(serializer_class):
+    """
+    Return the fields of a serializer, split into plain fields and nested relations.
+
+    Returns:
+        tuple: A dict mapping each plain field name to its source attribute,
+            and the nested relation names, both in serializer order.
+    """
+    plain, nested = {}, []
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.BaseSerializer):
+            nested.append(name)
+        else:
+            plain[name] = field.source
+    return plain, tuple(nested)
+
+
+def _parse(request, param):
+    value = request.query_params.get(param)
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+def requested_fields(request, serializer_class, default=None):
+    """
+    Return the fields a response should carry, from the `fields` and `expand` parameters.
+
+    Args:
+        request (Request): The request.
+        serializer_class (type): The serializer whose fields can be selected.
+        default (tuple): The plain fields returned without `fields`, or None
+            for all of them. Nested relations are returned when expanded, or
+            when `default` is None and neither parameter is given.
+
+    Returns:
+        tuple: The selected field names, in serializer order.
+
+    Raises:
+        ValidationError: If a parameter names a field the serializer does not have.
+    """
+    plain, nested = field_names(serializer_class)
+    fields, expand = _parse(request, FIELDS_PARAM), _parse(request, EXPAND_PARAM)
+    errors = {}
+    if fields is not None and fields - plain.keys():
+        errors[FIELDS_PARAM] = f'Unknown fields: {", ".join(sorted(fields - plain.keys()))}'
+    if expand is not None and expand - set(nested):
+        errors[EXPAND_PARAM] = f'Unknown relations: {", ".join(sorted(expand - set(nested)))}'
+    if errors:
+        raise ValidationError(errors)
+
+    if fields is None and expand is None and default is None:
+        return (*plain, *nested)
+    if fields is None:
+        fields = set(plain if default is None else default)
+    selected = fields | (expand or set())
+    return tuple(name for name in (*plain, *nested) if name in selected)
+
+
+def narrow(queryset, serializer_class, fields):
+    """
+    Restrict a queryset to the columns and relations of the selected fields.
+
+    Args:
+        queryset (QuerySet): Rows of the serializer's model, possibly prefetching
+            the nested relations.
+        serializer_class (type): The serializer the rows are rendered with.
+        fields (tuple): Names from `requested_fields`.
+
+    Returns:
+        QuerySet: The queryset loading only the selected columns with `.only()`,
+            and prefetching only the expanded relations.
+    """
+    plain, nested = field_names(serializer_class)
+    if not set(nested) & set(fields):
+        queryset = queryset.prefetch_related(None)
+    return queryset.only(*(plain[name] for name in fields if name in plain))
@@ -0,0 +1,136 @@
+"""
+Recording of watch and search history events.
+
+Every event upserts the `(logged_id, movie)` row of the matching rollup table,
+counting it and moving `last_seen` forward, so history listings scale with the
+distinct movies a user saw rather than with raw events. With
+`HISTORY_RAW_LOG_ENABLED`, events are also appended to the raw `WatchHistory`
+and `SearchHistory` tables for analytics, with their own names and times, so
+the log agrees with the rollups' `last_seen`.
+
+`record_events` is called by the write-behind buffer's flusher and, when the
+buffer is disabled, by the create views directly. It also feeds the trending
+counters in `trending`.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SearchHistory, SearchHistoryRollup, WatchHistory, WatchHistoryRollup
+from .signals import user_activity_recorded
+from .trending import count_events
+
+ROLLUPS = {WatchHistory: WatchHistoryRollup, SearchHistory: SearchHistoryRollup}
+# Columns copied from the latest event of a user and movie onto its rollup row.
+LATEST_FIELDS = {WatchHistory: ('logged_name',), SearchHistory: ('logged_name', 'movie_name')}
+
+
+def rollup_rows(events, latest_fields):
+    """
+    Aggregate events into one row per `(logged_id, movie_id)`.
+
+    Args:
+        events (list): Unsaved raw history instances.
+        latest_fields (tuple): Columns taken from the latest event.
+
+    Returns:
+        list: Dicts of rollup column values.
+    """
+    rows = {}
+    for event in events:
+        seen = event.watched_at or timezone.now()
+        row = rows.get((event.logged_id, event.movie_id))
+        if row is None:
+            row = rows[event.logged_id, event.movie_id] = {
+                'logged_id': event.logged_id, 'movie_id': event.movie_id,
+                'first_seen': seen, 'last_seen': seen, 'count': 0,
+            }
+        row['count'] += 1
+        row['first_seen'] = min(row['first_seen'], seen)
+        if seen >= row['last_seen']:
+            row['last_seen'] = seen
+            row.update({field: getattr(event, field) for field in latest_fields})
+    return list(rows.values())
+
+
+def upsert_rollups(rollup, rows, latest_fields):
+    """
+    Insert rollup rows, or add them to the existing rows of the same user and movie.
+
+    Django's `bulk_create(update_conflicts=True)` can only overwrite columns,
+    so the upsert is written by hand. `ON CONFLICT ... DO UPDATE` has the same
+    syntax on SQLite and PostgreSQL.
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(rollup._meta.db_table)
+    columns = ['logged_id', 'movie_id', 'first_seen', 'last_seen', 'count', *latest_fields]
+
+    def newer(column):
+        return (f'{quote(column)} = CASE WHEN excluded.{quote("last_seen")} >= {table}.{quote("last_seen")} '
+                f'THEN excluded.{quote(column)} ELSE {table}.{quote(column)} END')
+
+    assignments = [
+        f'{quote("count")} = {table}.{quote("count")} + excluded.{quote("count")}',
+        f'{quote("first_seen")} = CASE WHEN excluded.{quote("first_seen")} < {table}.{quote("first_seen")} '
+        f'THEN excluded.{quote("first_seen")} ELSE {table}.{quote("first_seen")} END',
+        *(newer(column) for column in (*latest_fields, 'last_seen')),
+    ]
+    sql = (
+        f'INSERT INTO {table} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))}) '
+        f'ON CONFLICT ({quote("logged_id")}, {quote("movie_id")}) DO UPDATE SET {", ".join(assignments)}'
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        [adapt(row[column]) if column in ('first_seen', 'last_seen') else row[column] for column in columns]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def log_raw_events(model, events):
+    """
+    Append events to the raw history table of `model`, as they were recorded.
+
+    `watched_at` is `auto_now_add`, which would stamp every row with the time
+    of the flush, so the rows are inserted by hand like the rollups.
+    """
+    quote = connection.ops.quote_name
+    columns = ['logged_id', 'movie_id', 'watched_at', *LATEST_FIELDS[model]]
+    sql = (
+        f'INSERT INTO {quote(model._meta.db_table)} ({", ".join(map(quote, columns))}) '
+        f'VALUES ({", ".join(["%s"] * len(columns))})'
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    params = [
+        [event.logged_id, event.movie_id, adapt(event.watched_at),
+         *(getattr(event, field) for field in LATEST_FIELDS[model])]
+        for event in events
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def record_events(model, events):
+    """
+    Record a batch of watch or search events in one transaction.
+
+    Args:
+        model (Model): `WatchHistory` or `SearchHistory`.
+        events (list): Unsaved instances of `model`.
+    """
+    if not events:
+        return
+    now = timezone.now()
+    for event in events:
+        if event.watched_at is None:
+            event.watched_at = now
+    with transaction.atomic():
+        upsert_rollups(ROLLUPS[model], rollup_rows(events, LATEST_FIELDS[model]), LATEST_FIELDS[model])
+        count_events(model, events)
+        if settings.HISTORY_RAW_LOG_ENABLED:
+            log_raw_events(model, events)
+    user_activity_recorded.send(sender=model, logged_ids={event.logged_id for event in events})
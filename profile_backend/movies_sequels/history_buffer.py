@@ -0,0 +1,227 @@
+"""
+Write-behind buffer for watch and search history events.
+
+The frontend records a history event on every movie view and search click.
+Instead of one INSERT per request, which serializes writers on SQLite,
+`WriteBehindBuffer.put` queues the unsaved instance and returns at once. A
+background thread records queued events in batches with
+`history.record_events`, every `HISTORY_BUFFER_INTERVAL_MS` milliseconds or as
+soon as `HISTORY_BUFFER_MAX_ROWS` events are waiting.
+
+Durability trade-offs, set in settings:
+
+- Events still queued when the process is killed are lost. A normal exit
+    flushes every buffer through `atexit`. Events put after a buffer is
+    closed are written on the calling thread. `HISTORY_BUFFER_ENABLED = False`
+    goes back to synchronous inserts.
+- When `HISTORY_BUFFER_MAX_QUEUE` events are waiting, `put` blocks until the
+    flusher catches up if `HISTORY_BUFFER_BLOCK_WHEN_FULL` is set, and drops
+    the event otherwise.
+- A batch that fails to write is retried one event at a time, so only the
+    events that fail on their own are dropped. Events of a movie deleted
+    since they were queued are dropped without a retry.
+- Event timestamps are taken when an event is queued, for the rollups and
+    the raw log alike, so they do not trail the request by a flush interval.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .history import record_events
+from .models import Movie, SearchHistory, WatchHistory
+
+logger = logging.getLogger(__name__)
+
+# Queued by `close` to make the flusher write what it holds and exit.
+_STOP = object()
+
+
+class WriteBehindBuffer:
+    """
+    Queue of unsaved model instances drained by one background flusher thread.
+    """
+
+    def __init__(self, model):
+        """
+        Args:
+            model (Model): The model whose instances are buffered.
+        """
+        self.model = model
+        self.flushed = 0
+        self.dropped = 0
+        self._queue = None
+        self._thread = None
+        self._closed = False
+        # Guards the flusher thread and the counters.
+        self._lock = threading.Lock()
+        # Held while an event is queued and while `close` marks the buffer
+        # closed, so no event lands in the queue after its final drain.
+        self._put_lock = threading.Lock()
+        # Serializes writes between the flusher and `flush`.
+        self._flush_lock = threading.Lock()
+
+    def depth(self):
+        """
+        Return how many events are waiting to be written.
+        """
+        return self._queue.qsize() if self._queue else 0
+
+    def put(self, instance):
+        """
+        Queue an unsaved instance, starting the flusher on first use. Once the
+        buffer is closed, the instance is written at once instead.
+
+        Returns:
+            bool: Whether the event was queued or written; False if it was
+                dropped because the queue is full.
+        """
+        with self._put_lock:
+            if not self._closed:
+                self._start()
+                try:
+                    self._queue.put(instance, block=settings.HISTORY_BUFFER_BLOCK_WHEN_FULL)
+                except queue.Full:
+                    self._count(dropped=1)
+                    logger.warning('%s buffer full, event dropped', self.model.__name__)
+                    return False
+                return True
+        self._write([instance])
+        return True
+
+    def flush(self, limit=None):
+        """
+        Write queued events now, on the calling thread.
+
+        Args:
+            limit (int): The maximum number of events to write, or None for all.
+
+        Returns:
+            int: The number of events written.
+        """
+        if not self._queue:
+            return 0
+        batch = []
+        while limit is None or len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._write(batch)
+        return len(batch)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._queue = queue.Queue(maxsize=settings.HISTORY_BUFFER_MAX_QUEUE)
+                self._thread = threading.Thread(
+                    target=self._run, name=f'{self.model.__name__}-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """
+        Flusher loop: wait for a first event, then collect more until the batch
+        is full or the interval has passed, and write the batch.
+        """
+        interval = settings.HISTORY_BUFFER_INTERVAL_MS / 1000
+        max_rows = settings.HISTORY_BUFFER_MAX_ROWS
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + interval
+            while len(batch) < max_rows and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if batch[-1] is _STOP:
+                stopping = True
+                batch.pop()
+            close_old_connections()
+            self._write(batch)
+
+    def close(self, timeout=10):
+        """
+        Stop the flusher after it writes the events it holds, then write the rest.
+        """
+        with self._put_lock:
+            self._closed = True
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self.flush()
+
+    def _write(self, batch):
+        """
+        Record a batch in one transaction, or one event at a time if that fails.
+        """
+        if not batch:
+            return
+        with self._flush_lock:
+            try:
+                record_events(self.model, batch)
+                written = len(batch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Failed to write %d %s events, retrying one by one',
+                                 len(batch), self.model.__name__)
+                written = self._write_each(batch)
+        self._count(flushed=written, dropped=len(batch) - written)
+
+    def _write_each(self, batch):
+        """
+        Record the events of a failed batch one by one, skipping those of deleted movies.
+
+        Returns:
+            int: The number of events written.
+        """
+        # pylint: disable=no-member
+        movie_ids = set(Movie.objects.filter(
+            pk__in={event.movie_id for event in batch}).values_list('pk', flat=True))
+        written = 0
+        for event in batch:
+            if event.movie_id not in movie_ids:
+                logger.warning('%s event of missing movie %s dropped', self.model.__name__, event.movie_id)
+                continue
+            try:
+                record_events(self.model, [event])
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('%s event dropped', self.model.__name__)
+                continue
+            written += 1
+        return written
+
+    def _count(self, flushed=0, dropped=0):
+        with self._lock:
+            self.flushed += flushed
+            self.dropped += dropped
+
+    def stats(self):
+        """
+        Return the queue depth and the written and dropped event counts.
+        """
+        with self._lock:
+            return {'depth': self.depth(), 'flushed': self.flushed, 'dropped': self.dropped}
+
+
+watch_history_buffer = WriteBehindBuffer(WatchHistory)
+search_history_buffer = WriteBehindBuffer(SearchHistory)
+BUFFERS = (watch_history_buffer, search_history_buffer)
+
+
+@atexit.register
+def flush_all():
+    """
+    Write every queued event; runs when the process exits normally.
+    """
+    for buffer in BUFFERS:
+        buffer.close()
@@ -0,0 +1,164 @@
+"""
+Helpers shared by the `bench_*` management commands.
+
+Django skips command modules whose names start with an underscore, so this
+module is importable by the benchmarks without being a command itself.
+"""
+import datetime
+import hashlib
+import string
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+# TMDB ids and names of the genres given to every synthetic movie.
+SYNTHETIC_GENRES = {28: 'Action', 18: 'Drama'}
+BASE62 = string.digits + string.ascii_letters
+
+
+@contextmanager
+def isolated_database(test_name=None):
+    """
+    Run the enclosed block against a freshly migrated throwaway database,
+    created the same way the test runner creates one, so benchmarks never
+    touch real data. The test environment is set up too, so the test client
+    can be used inside the block.
+
+    Args:
+        test_name (str): The throwaway database name, for example a file path
+            where SQLite would otherwise use an in-memory database.
+    """
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    if test_name:
+        test_settings['NAME'] = test_name
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        test_settings['NAME'] = old_test_name
+
+
+@contextmanager
+def timer():
+    """
+    Measure the wall-clock time of the enclosed block.
+
+    Yields:
+        dict: Holds the elapsed seconds under `seconds` once the block exits.
+    """
+    result = {}
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result['seconds'] = time.perf_counter() - start
+
+
+def synthetic_poster_path(index):
+    """
+    Return a poster path shaped like TMDB's: `/w500/` and 27 base-62 characters.
+    """
+    digest = int.from_bytes(hashlib.sha1(str(index).encode()).digest(), 'big')
+    name = ''
+    for _ in range(27):
+        digest, digit = divmod(digest, 62)
+        name += BASE62[digit]
+    return f'/w500/{name}.jpg'
+
+
+def synthetic_overview(index):
+    """
+    Return an overview shaped like TMDB's, with years, counts and mixed case.
+    """
+    year = 1950 + index % 75
+    return (
+        f'In {year}, {index % 12 + 2} estranged siblings reunite in Los Angeles after their '
+        f'father, a 3rd-generation safecracker, leaves them a 40-page letter and a key to '
+        f'Vault 7E. Now they have 48 hours to finish the job he started in {year - 25}.'
+    )
+
+
+def synthetic_records(count, sequels_every=5, sequels_per_movie=3):
+    """
+    Build `count` records shaped like the ones `process_movie` returns.
+
+    Release dates count back one day per movie from today, so the first
+    ninety or so movies fall inside the recently-released window.
+    """
+    today = timezone.now().date()
+    records = []
+    for index in range(count):
+        defaults = {
+            'release_date': today - datetime.timedelta(days=index % 9000),
+            'director': f'Director {index % 997}',
+            'genre': 'Action, Drama',
+            'description': synthetic_overview(index),
+            'image_url': f'https://image.tmdb.org/t/p{synthetic_poster_path(index)}',
+            'tmdb_popularity': float(count - index),
+            'tmdb_id': index + 1,
+        }
+        sequels = []
+        if index % sequels_every == 0:
+            sequels = [
+                {'title': f'Movie {index} Part {part}', 'defaults': dict(defaults),
+                 'genre_ids': list(SYNTHETIC_GENRES)}
+                for part in range(2, sequels_per_movie + 2)
+            ]
+        records.append({'title': f'Movie {index}', 'defaults': defaults, 'genre_ids': list(SYNTHETIC_GENRES),
+                        'sequels': sequels})
+    return records
+
+
+def seed_catalog(count):
+    """
+    Write `count` synthetic movies and their sequels through `BatchWriter`.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .populate_models import BatchWriter, save_genres
+
+    save_genres(SYNTHETIC_GENRES)
+    writer = BatchWriter(batch_size=1000)
+    for record in synthetic_records(count):
+        writer.add(record)
+    writer.flush()
+
+
+def seed_activity(users, per_user, movie_count):
+    """
+    Give each of `users` synthetic users `per_user` ratings, searches and watches
+    spread over the first `movie_count` movies.
+    """
+    # pylint: disable=import-outside-toplevel
+    from movies_sequels.history import record_events
+    from movies_sequels.models import Movie, RatingReview, SearchHistory, WatchHistory
+    from movies_sequels.ratings import rebuild_rating_stats
+
+    movie_ids = list(Movie.objects.order_by('id').values_list('id', flat=True)[:movie_count])
+    reviews, searches, watches = [], [], []
+    for user in range(1, users + 1):
+        for offset in range(per_user):
+            movie_id = movie_ids[(user * 7 + offset * 13) % len(movie_ids)]
+            name = f'user{user}'
+            reviews.append(RatingReview(movie_id=movie_id, logged_id=user, logged_name=name,
+                                        rating=(user + offset) % 10 + 1))
+            searches.append(SearchHistory(movie_id=movie_id, logged_id=user, logged_name=name))
+            watches.append(WatchHistory(movie_id=movie_id, logged_id=user, logged_name=name))
+    RatingReview.objects.bulk_create(reviews, batch_size=1000, ignore_conflicts=True)
+    rebuild_rating_stats()
+    record_events(SearchHistory, searches)
+    record_events(WatchHistory, watches)
+
+
+def percentile(samples, fraction):
+    """
+    Return the value below which `fraction` of the sorted samples fall.
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,59 @@
+"""
+Measure what conditional GETs save on the catalog endpoints.
+
+Seeds a synthetic catalog into a throwaway database and requests each catalog
+endpoint through the test client, first unconditionally and then with the
+`If-None-Match` of the first response, as a browser revalidating its cache
+would. Reports bytes transferred per request, latency percentiles and queries
+per request for both.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from ._benchmark import isolated_database, percentile, seed_catalog
+
+ENDPOINTS = ('/api/movies/', '/api/sequels/', '/api/most-popular/', '/api/recently-released/')
+
+
+class Command(BaseCommand):
+    help = 'Compare full and conditional (304) responses of the catalog endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=5000,
+                            help='Number of synthetic movies (default: 5000).')
+        parser.add_argument('--requests', type=int, default=300,
+                            help='Requests per endpoint and mode (default: 300).')
+
+    def handle(self, *args, **kwargs):
+        with isolated_database():
+            seed_catalog(kwargs['movies'])
+            client = Client()
+            for endpoint in ENDPOINTS:
+                etag = client.get(endpoint)['ETag']
+                for mode, headers, expected in (('full', {}, 200), ('304', {'HTTP_IF_NONE_MATCH': etag}, 304)):
+                    self.report(mode, endpoint, *self.run_load(client, endpoint, headers, expected, kwargs['requests']))
+
+    @staticmethod
+    def run_load(client, endpoint, headers, expected, count):
+        """
+        Issue `count` sequential GETs and return the latencies, body bytes and query count.
+        """
+        latencies, size = [], 0
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(endpoint, **headers)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == expected, response.status_code
+                size += len(response.content)
+        return latencies, size / count, len(queries) / count
+
+    def report(self, mode, endpoint, latencies, size, queries):
+        self.stdout.write(
+            f'{mode:>4} {endpoint:<26} {size / 1024:9.1f} KiB/req  '
+            f'p50 {percentile(latencies, 0.5) * 1000:7.2f}ms  '
+            f'p99 {percentile(latencies, 0.99) * 1000:7.2f}ms  '
+            f'{queries:4.1f} queries/req')
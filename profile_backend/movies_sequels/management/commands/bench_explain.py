@@ -0,0 +1,100 @@
+"""
+Show the query plan of every query issued by the read endpoints.
+
+Seeds a synthetic catalog and user activity into a throwaway database,
+requests each endpoint through the test client while capturing its SQL, and
+runs `EXPLAIN QUERY PLAN` (SQLite) or `EXPLAIN` (other backends) on every
+captured query. Steps that read a whole table without an index are flagged,
+so a missing or unused index shows up next to the view that needs it.
+"""
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from movies_sequels.catalog_version import bump_catalog_version
+from movies_sequels.models import Movie
+from ._benchmark import isolated_database, seed_activity, seed_catalog
+
+# A full table read: "SCAN <table>" without an index on SQLite, "Seq Scan" on PostgreSQL.
+FULL_SCAN_RE = re.compile(r'^SCAN \w+$|Seq Scan')
+
+
+def endpoints(movie_title, user_id):
+    """
+    Return the read endpoints to explain, with realistic arguments.
+    """
+    return [
+        '/api/movies/',
+        '/api/sequels/',
+        '/api/recently-released/',
+        '/api/most-popular/',
+        '/api/suggestions/?q=movie',
+        '/api/search/?q=synthetic',
+        f'/api/{movie_title}/sequels/',
+        f'/api/{movie_title}/movie-details/',
+        f'/api/rating-reviews/list/?user_id={user_id}',
+        '/api/rating-reviews/list/?movie_id=1',
+        f'/api/recommendations/user{user_id}/?user_id={user_id}',
+        f'/api/list-watch-history/?user_id={user_id}',
+        f'/api/list-search-history/?user_id={user_id}',
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan of every query behind the read endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=5000,
+                            help='Number of synthetic movies (default: 5000).')
+        parser.add_argument('--users', type=int, default=200,
+                            help='Number of synthetic users with activity (default: 200).')
+
+    def handle(self, *args, **kwargs):
+        with isolated_database():
+            seed_catalog(kwargs['movies'])
+            seed_activity(kwargs['users'], per_user=20, movie_count=kwargs['movies'])
+            with connection.cursor() as cursor:
+                # Give the planner real statistics, as a long-running database would have.
+                cursor.execute('ANALYZE')
+            client = Client()
+            movie_title = Movie.objects.order_by('id').values_list('title', flat=True).first()
+            full_scans = 0
+            bump_catalog_version()
+            with override_settings(FEED_CACHE_ENABLED=False, SUGGESTION_INDEX_ENABLED=False):
+                for endpoint in endpoints(movie_title, user_id=1):
+                    full_scans += self.explain_endpoint(client, endpoint)
+            self.stdout.write(f'{full_scans} full table scan(s)')
+
+    def explain_endpoint(self, client, endpoint):
+        """
+        Request `endpoint`, print the plan of each query it ran and return how
+        many plan steps were full table scans.
+        """
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(endpoint)
+        assert response.status_code == 200, (endpoint, response.status_code)
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{endpoint}  ({len(context)} queries)'))
+        full_scans = 0
+        for query in context.captured_queries:
+            self.stdout.write(f'  {query["sql"][:160]}')
+            for step in self.explain(query['sql']):
+                if FULL_SCAN_RE.search(step):
+                    full_scans += 1
+                    self.stdout.write(self.style.WARNING(f'    ! {step}'))
+                else:
+                    self.stdout.write(f'      {step}')
+        return full_scans
+
+    @staticmethod
+    def explain(sql):
+        """
+        Return the plan steps of a captured query as strings.
+        """
+        prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql)
+            rows = cursor.fetchall()
+        # SQLite returns (id, parent, notused, detail) rows, others a single text column.
+        return [row[-1] for row in rows]
@@ -0,0 +1,55 @@
+"""
+Load-test the home feed endpoints with and without the feed cache.
+
+Seeds a synthetic catalog into a throwaway database and requests
+`/api/recently-released/` and `/api/most-popular/` through the test client,
+reporting requests per second and latency percentiles for each mode.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from movies_sequels.catalog_version import bump_catalog_version
+from ._benchmark import isolated_database, percentile, seed_catalog
+
+ENDPOINTS = ('/api/recently-released/', '/api/most-popular/')
+
+
+class Command(BaseCommand):
+    help = 'Measure home feed requests/second with and without the feed cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=5000,
+                            help='Number of synthetic movies (default: 5000).')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per endpoint and mode (default: 500).')
+
+    def handle(self, *args, **kwargs):
+        with isolated_database():
+            seed_catalog(kwargs['movies'])
+            client = Client()
+            for enabled in (False, True):
+                bump_catalog_version()
+                with override_settings(FEED_CACHE_ENABLED=enabled):
+                    for endpoint in ENDPOINTS:
+                        self.report('cached' if enabled else 'uncached', endpoint,
+                                    self.run_load(client, endpoint, kwargs['requests']))
+
+    @staticmethod
+    def run_load(client, endpoint, count):
+        """
+        Issue `count` sequential GETs and return each latency in seconds.
+        """
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            response = client.get(endpoint)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+        return latencies
+
+    def report(self, mode, endpoint, latencies):
+        self.stdout.write(
+            f'{mode:>8} {endpoint:<26} {len(latencies) / sum(latencies):8.1f} req/s  '
+            f'p50 {percentile(latencies, 0.5) * 1000:7.2f}ms  '
+            f'p99 {percentile(latencies, 0.99) * 1000:7.2f}ms')
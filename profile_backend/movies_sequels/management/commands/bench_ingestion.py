@@ -0,0 +1,59 @@
+"""
+Benchmark the ingestion save stage on a synthetic catalog.
+
+Compares the row-at-a-time `update_or_create` path the command used to take
+against `BatchWriter`, reporting rows written per second for each.
+"""
+from django.core.management.base import BaseCommand
+from movies_sequels.models import Movie, Sequel
+from ._benchmark import isolated_database, synthetic_records, timer
+from .populate_models import BatchWriter
+
+
+def save_row_by_row(records):
+    """
+    The previous save path: one `update_or_create` per movie and per sequel.
+    """
+    for record in records:
+        # pylint: disable=no-member
+        movie, _ = Movie.objects.update_or_create(title=record['title'], defaults=record['defaults'])
+        for sequel in record['sequels']:
+            Sequel.objects.update_or_create(movie=movie, title=sequel['title'], defaults=sequel['defaults'])
+
+
+def save_batched(records, batch_size):
+    """
+    The current save path through `BatchWriter`.
+    """
+    writer = BatchWriter(batch_size=batch_size)
+    for record in records:
+        writer.add(record)
+    writer.flush()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark row-by-row against batched movie/sequel upserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=50000,
+                            help='Number of synthetic movies (default: 50000).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='BatchWriter batch size (default: 500).')
+
+    def handle(self, *args, **kwargs):
+        records = synthetic_records(kwargs['movies'])
+        rows = len(records) + sum(len(record['sequels']) for record in records)
+        paths = [
+            ('row-by-row', lambda: save_row_by_row(records)),
+            ('batched', lambda: save_batched(records, kwargs['batch_size'])),
+        ]
+
+        for label, save in paths:
+            # Each path runs twice: first into an empty table, then as a re-sync.
+            with isolated_database():
+                for phase in ('insert', 'update'):
+                    with timer() as elapsed:
+                        save()
+                    self.stdout.write(
+                        f'{label:>10} {phase}: {rows} rows in {elapsed["seconds"]:.2f}s '
+                        f'({rows / elapsed["seconds"]:,.0f} rows/s)')
@@ -0,0 +1,53 @@
+"""
+Benchmark per-user recommendation scoring against the batch path.
+
+For each user count, seeds a synthetic catalog, user activity and neighbour
+table into a throwaway database. It then times `RecommendationEngine` scoring
+a sample of users one at a time, with its queries per user, projected to all
+users, against one `precompute_recommendations` run over every user.
+"""
+import random
+
+from django.core.management.base import BaseCommand
+from movies_sequels.batch_recommendations import precompute_recommendations
+from movies_sequels.movieRecommendation import RecommendationEngine
+from movies_sequels.similarity import build_neighbors
+from ._benchmark import isolated_database, seed_activity, seed_catalog, timer
+
+
+class Command(BaseCommand):
+    help = 'Compare per-user recommendation queries with the batch precompute path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[10000, 100000],
+                            help='User counts to benchmark (default: 10000 100000).')
+        parser.add_argument('--movies', type=int, default=5000,
+                            help='Number of synthetic movies (default: 5000).')
+        parser.add_argument('--per-user', type=int, default=10,
+                            help='Ratings and watches per user (default: 10).')
+        parser.add_argument('--sample', type=int, default=500,
+                            help='Users scored one at a time to project the per-user path (default: 500).')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Batch worker processes (default: CPU count).')
+
+    def handle(self, *args, **kwargs):
+        for users in kwargs['users']:
+            with isolated_database():
+                seed_catalog(kwargs['movies'])
+                seed_activity(users, kwargs['per_user'], kwargs['movies'])
+                build_neighbors()
+
+                sample = random.Random(0).sample(range(1, users + 1), min(kwargs['sample'], users))
+                with timer() as per_user:
+                    for user_id in sample:
+                        engine = RecommendationEngine(user_id)
+                        engine.merge_neighbors(engine.get_seed_weights())
+                projected = per_user['seconds'] / len(sample) * users
+
+                with timer() as batch:
+                    precompute_recommendations(days=36500, workers=kwargs['workers'])
+
+                self.stdout.write(
+                    f'{users:>7} users  per-user {per_user["seconds"] / len(sample) * 1000:6.2f}ms/user '
+                    f'(projected {projected:8.1f}s)  batch {batch["seconds"]:8.1f}s  '
+                    f'speedup {projected / batch["seconds"]:5.1f}x')
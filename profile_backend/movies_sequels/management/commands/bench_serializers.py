@@ -0,0 +1,89 @@
+"""
+Benchmark serializing and rendering the movie list.
+
+Seeds a synthetic catalog into a throwaway database and turns every movie,
+with its nested sequels, into JSON bytes three ways:
+
+- `MovieSerializer` rendered by DRF's `JSONRenderer`, as before;
+- the `.values()` serializer rendered by DRF's pure-Python `JSONRenderer`;
+- the `.values()` serializer rendered by the orjson `FastJSONRenderer`.
+
+Each run includes the queries, as the serializers issue them differently.
+The renderers are then timed alone on the same serialized data, both as the
+`CheckedFloats` list the `.values()` serializer returns and as a plain list,
+which `FastJSONRenderer` has to walk for floats before encoding. Times are
+reported per 1,000 movies, and all outputs are checked to be byte-identical.
+
+The synthetic posters and overviews are shaped like TMDB's, with digits next
+to letters, so text that resembles a float is represented.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from movies_sequels.fast_serializers import movie_values
+from movies_sequels.models import Movie
+from movies_sequels.renderers import FastJSONRenderer, orjson
+from movies_sequels.serializers import MovieSerializer
+from ._benchmark import isolated_database, percentile, seed_catalog, timer
+
+
+class Command(BaseCommand):
+    help = 'Measure movie list serialize+render time per 1k movies for each serializer and renderer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=5000,
+                            help='Number of synthetic movies (default: 5000).')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Runs per variant (default: 5).')
+
+    def handle(self, *args, **kwargs):
+        with isolated_database():
+            seed_catalog(kwargs['movies'])
+            # pylint: disable=no-member
+            queryset = Movie.objects.for_listing().order_by('-tmdb_popularity', '-id')
+            variants = [
+                ('MovieSerializer + JSONRenderer',
+                 lambda: JSONRenderer().render(MovieSerializer(queryset.all(), many=True).data)),
+                ('values + JSONRenderer',
+                 lambda: JSONRenderer().render(movie_values.serialize(movie_values.values(queryset)))),
+            ]
+            if orjson is not None:
+                variants.append(('values + FastJSONRenderer', lambda: FastJSONRenderer().render(
+                    movie_values.serialize(movie_values.values(queryset)))))
+            else:
+                self.stdout.write('orjson is not installed; FastJSONRenderer would fall back to JSONRenderer')
+
+            medians = self.run_variants(variants, kwargs['movies'], kwargs['rounds'])
+
+            data = movie_values.serialize(movie_values.values(queryset))
+            self.stdout.write('Render only:')
+            renderers = [
+                ('JSONRenderer', lambda: JSONRenderer().render(data)),
+                ('FastJSONRenderer, checked list', lambda: FastJSONRenderer().render(data)),
+                ('FastJSONRenderer, plain list', lambda: FastJSONRenderer().render(list(data))),
+            ]
+            render_medians = self.run_variants(renderers, kwargs['movies'], kwargs['rounds'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f'Byte-identical output; {medians[0] / medians[-1]:.1f}x faster than MovieSerializer, '
+                f'rendering {render_medians[0] / render_medians[1]:.1f}x faster than JSONRenderer'))
+
+    def run_variants(self, variants, movies, rounds):
+        """
+        Time each `(name, render)` pair, check they all render the same bytes and
+        return their median times per 1,000 movies in milliseconds.
+        """
+        baseline, medians = None, []
+        for name, render in variants:
+            samples = []
+            for _ in range(rounds):
+                with timer() as elapsed:
+                    payload = render()
+                samples.append(elapsed['seconds'])
+            if baseline is None:
+                baseline = payload
+            elif payload != baseline:
+                raise CommandError(f'{name} rendered different bytes than {variants[0][0]}')
+            per_thousand = percentile(samples, 0.5) * 1000 / movies * 1000
+            medians.append(per_thousand)
+            self.stdout.write(f'{name:<32} {per_thousand:8.2f}ms per 1k movies  ({len(payload) / 1024:.0f} KiB)')
+        return medians
@@ -0,0 +1,113 @@
+"""
+Load-test concurrent history writes and feed reads with and without the SQLite tuning profile.
+
+For each mode, seeds a synthetic catalog into a throwaway file database. Writer
+threads then POST to `/api/watch-history/` while reader threads GET
+`/api/most-popular/`. The command reports throughput, p50/p99 latency and
+failed requests per endpoint. The history buffer and the feed cache are off,
+so every request reaches SQLite.
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from movies_sequels.models import Movie
+from ._benchmark import isolated_database, percentile, seed_catalog
+
+WRITE_ENDPOINT = '/api/watch-history/'
+READ_ENDPOINT = '/api/most-popular/'
+
+
+class Command(BaseCommand):
+    help = 'Measure concurrent history write and feed read latency with and without SQLite tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movies', type=int, default=2000,
+                            help='Number of synthetic movies (default: 2000).')
+        parser.add_argument('--writers', type=int, default=4,
+                            help='Threads posting watch history (default: 4).')
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Threads reading the most-popular feed (default: 4).')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per thread and mode (default: 200).')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('The default database is not SQLite.')
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            for enabled in (False, True):
+                name = os.path.join(directory, f'bench_{"tuned" if enabled else "default"}.sqlite3')
+                with override_settings(SQLITE_TUNING_ENABLED=enabled, HISTORY_BUFFER_ENABLED=False,
+                                       FEED_CACHE_ENABLED=False), isolated_database(name):
+                    seed_catalog(kwargs['movies'])
+                    with connection.cursor() as cursor:
+                        cursor.execute('PRAGMA journal_mode')
+                        journal_mode = cursor.fetchone()[0]
+                    results = self.run_load(kwargs['writers'], kwargs['readers'], kwargs['requests'])
+                    mode = f'{"tuned" if enabled else "default"} ({journal_mode})'
+                    for endpoint, (latencies, errors, seconds) in results.items():
+                        self.report(mode, endpoint, latencies, errors, seconds)
+
+    @staticmethod
+    def run_load(writers, readers, count):
+        """
+        Run the writer and reader threads together.
+
+        Returns:
+            dict: Maps each endpoint to its latencies in seconds, its failed
+                request count and the wall-clock seconds of the run.
+        """
+        # pylint: disable=no-member
+        movie_ids = list(Movie.objects.values_list('id', flat=True)[:1000])
+        results = {WRITE_ENDPOINT: ([], [0]), READ_ENDPOINT: ([], [0])}
+        lock = threading.Lock()
+        barrier = threading.Barrier(writers + readers)
+
+        def worker(index, endpoint):
+            client = Client()
+            latencies, errors = [], 0
+            barrier.wait()
+            try:
+                for request in range(count):
+                    start = time.perf_counter()
+                    try:
+                        if endpoint == WRITE_ENDPOINT:
+                            response = client.post(endpoint, {
+                                'logged_id': index, 'logged_name': f'user{index}',
+                                'movie': movie_ids[(index * 31 + request) % len(movie_ids)],
+                            }, content_type='application/json')
+                        else:
+                            response = client.get(endpoint)
+                        failed = response.status_code >= 400
+                    except Exception:  # pylint: disable=broad-except
+                        # "database is locked" surfaces as an OperationalError.
+                        failed = True
+                    latencies.append(time.perf_counter() - start)
+                    errors += failed
+            finally:
+                connection.close()
+            with lock:
+                results[endpoint][0].extend(latencies)
+                results[endpoint][1][0] += errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(writers + readers) as executor:
+            futures = [executor.submit(worker, index, WRITE_ENDPOINT) for index in range(writers)]
+            futures += [executor.submit(worker, index, READ_ENDPOINT) for index in range(readers)]
+            for future in futures:
+                future.result()
+        seconds = time.perf_counter() - start
+        return {endpoint: (latencies, errors[0], seconds) for endpoint, (latencies, errors) in results.items()}
+
+    def report(self, mode, endpoint, latencies, errors, seconds):
+        self.stdout.write(
+            f'{mode:>16} {endpoint:<22} {len(latencies) / seconds:8.1f} req/s  '
+            f'p50 {percentile(latencies, 0.5) * 1000:7.2f}ms  '
+            f'p99 {percentile(latencies, 0.99) * 1000:7.2f}ms  '
+            f'{errors} failed')
@@ -0,0 +1,32 @@
+"""
+Rebuild the precomputed movie neighbour table used by recommendations.
+
+Run it after ingestion and periodically as ratings and history accumulate,
+for example from cron.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from movies_sequels.similarity import CONTENT_WEIGHT, build_neighbors
+
+
+class Command(BaseCommand):
+    help = 'Precompute the top-N similar movies of every movie for recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-n', type=int, default=20,
+                            help='Neighbours kept per movie (default: 20).')
+        parser.add_argument('--block-size', type=int, default=256,
+                            help='Movies scored per block; bounds memory use (default: 256).')
+        parser.add_argument('--content-weight', type=float, default=CONTENT_WEIGHT,
+                            help=f'Share of genre/director similarity in the score (default: {CONTENT_WEIGHT}).')
+
+    def handle(self, *args, **kwargs):
+        start = time.perf_counter()
+        written = build_neighbors(
+            top_n=kwargs['top_n'],
+            block_size=kwargs['block_size'],
+            content_weight=kwargs['content_weight'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} neighbours in {time.perf_counter() - start:.1f}s'))
@@ -1,182 +1,733 @@
-import requests
+"""
+Populate movies and sequels from the TMDB API.
+
+The command runs as a small pipeline:
+
+1. fetch: discover pages are requested concurrently, a few pages ahead of the writer.
+2. process: `process_movie` and `process_sequels` fetch detail payloads on a bounded
+    thread pool and turn them into plain records.
+3. save: `BatchWriter` upserts records and their genre links in batches on the
+    main thread.
+
+In incremental mode, movies whose list-level payload matches the fingerprint
+stored by the previous run are not fetched again.
+
+After every committed batch the command writes a checkpoint file, so an
+interrupted run continues from the same page with `--resume`. Movies that keep
+failing are parked in a dead-letter file instead of aborting the run. Unlike
+the checkpoint, it is kept after a run completes, and later runs skip its
+movies until `--retry-dead-letters` gives them another try.
+
+All HTTP traffic goes through one pooled `TMDBClient`, which enforces the
+requests-per-second budget and retries 429/5xx responses with backoff.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from movies_sequels.models import Movie, Sequel
-from enum import Enum
-
-API_KEY = '316aaf03b6a33bb139c69970f4272133'
-BASE_URL = 'https://api.themoviedb.org/3/'
-
-class ApiEndpoint(Enum):
-    GENRE_LIST = 'genre/movie/list'
-    DISCOVER_MOVIE = 'discover/movie'
-    MOVIE_DETAIL = 'movie/{movie_id}'
-
-def fetch_json(url, params):
+from django.db import transaction
+from django.utils import timezone
+from movies_sequels.models import Genre, Movie, Sequel
+from movies_sequels.search import index_movies
+from movies_sequels.signals import catalog_updated
+from movies_sequels.tmdb import ApiEndpoint, DetailCache, TMDBClient
+
+IMAGE_BASE_URL = 'https://image.tmdb.org/t/p/w500'
+# TMDB refuses discover requests past this page.
+MAX_DISCOVER_PAGES = 500
+DEFAULT_CHECKPOINT = settings.BASE_DIR / 'populate_models.checkpoint.json'
+DEFAULT_DEAD_LETTERS = settings.BASE_DIR / 'populate_models.dead_letters.json'
+DETAIL_FIELDS = (
+    'id', 'title', 'release_date', 'genre_ids', 'genres', 'poster_path', 'overview',
+    'popularity', 'belongs_to_collection',
+)
+
+logger = logging.getLogger(__name__)
+
+def fetch_json(client, endpoint, params=None, **path_params):
     """
-    Fetch JSON data from a given URL with provided parameters.
+    Fetch stage: request a TMDB endpoint through the shared client.
 
     Args:
-        url (str): The URL to fetch data from.
+        client (TMDBClient): The rate-limited client.
+        endpoint (ApiEndpoint): The endpoint to request.
         params (dict): The parameters to include in the request.
+        **path_params: Values substituted into the endpoint path.
 
     Returns:
         dict: The JSON response from the request.
     """
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return client.get_json(endpoint, params, **path_params)
 
-def get_genre_dict():
+def get_genre_dict(client):
     """
     Fetch the genre list from TMDB and return a dictionary mapping genre IDs to names.
 
+    Args:
+        client (TMDBClient): The rate-limited client.
+
     Returns:
         dict: A dictionary mapping genre IDs to genre names.
     """
-    genre_url = f'{BASE_URL}{ApiEndpoint.GENRE_LIST.value}'
-    params = {'api_key': API_KEY, 'language': 'en-US'}
-    genre_data = fetch_json(genre_url, params)
+    genre_data = fetch_json(client, ApiEndpoint.GENRE_LIST)
     return {genre['id']: genre['name'] for genre in genre_data['genres']}
 
-def get_movie_details(movie_id):
+def save_genres(genre_dict):
+    """
+    Upsert the TMDB genre list, keyed on the genre name so rows created from
+    genre strings by migration 0019 get their TMDB id.
+
+    Args:
+        genre_dict (dict): A dictionary mapping genre IDs to names.
+    """
+    # pylint: disable=no-member
+    Genre.objects.bulk_create(
+        [Genre(name=name, tmdb_id=genre_id) for genre_id, name in genre_dict.items()],
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['tmdb_id'],
+    )
+
+def get_genre_ids(movie_data):
+    """
+    Return the TMDB genre ids of a discover result (`genre_ids`) or detail payload (`genres`).
+    """
+    return movie_data.get('genre_ids') or [genre['id'] for genre in movie_data.get('genres') or []]
+
+def get_discover_page(client, page):
+    """
+    Fetch one page of popular movies.
+
+    Args:
+        client (TMDBClient): The rate-limited client.
+        page (int): The 1-based page number.
+
+    Returns:
+        dict: The discover response, including `results` and `total_pages`.
+    """
+    params = {
+        'sort_by': 'popularity.desc',  # Sort by popularity to get popular movies
+        'page': page,
+        'include_adult': 'false'
+    }
+    return fetch_json(client, ApiEndpoint.DISCOVER_MOVIE, params)
+
+def get_movie_details(client, movie_id):
     """
     Fetch detailed information about a movie including credits and collection info.
 
+    Payloads go through the client's detail cache, so a movie that is both listed
+    and part of other movies' collections is only fetched once per run.
+
     Args:
+        client (TMDBClient): The rate-limited client.
         movie_id (int): The TMDB ID of the movie.
 
     Returns:
-        dict: The detailed movie information.
+        dict: The detailed movie information, trimmed by `compact_details`.
+    """
+    params = {'append_to_response': 'credits,belongs_to_collection'}
+    return client.detail_cache.get(movie_id, lambda: compact_details(
+        fetch_json(client, ApiEndpoint.MOVIE_DETAIL, params, movie_id=movie_id)))
+
+def compact_details(detail_data):
+    """
+    Keep only the parts of a detail payload the command reads.
+
+    Full credits run to hundreds of cast and crew entries, which would dominate
+    the memory and disk used by the detail cache.
+    """
+    compact = {key: detail_data.get(key) for key in DETAIL_FIELDS if key in detail_data}
+    compact['credits'] = {'crew': [
+        crew_member for crew_member in detail_data.get('credits', {}).get('crew', [])
+        if crew_member.get('job') == 'Director'
+    ]}
+    return compact
+
+def get_director(detail_data):
+    """
+    Return the name of the director listed in a detail payload's credits.
+    """
+    return next(
+        (crew_member['name'] for crew_member in detail_data.get('credits', {}).get('crew', [])
+         if crew_member['job'] == 'Director'), 'Unknown'
+    )
+
+def list_fingerprint(movie_data):
     """
-    detail_url = f'{BASE_URL}{ApiEndpoint.MOVIE_DETAIL.value.format(movie_id=movie_id)}'
-    params = {'api_key': API_KEY, 'language': 'en-US', 'append_to_response': 'credits,belongs_to_collection'}
-    return fetch_json(detail_url, params)
+    Fingerprint the fields of a TMDB movie payload that signal a change worth a
+    detail fetch: popularity, release date and poster.
+
+    Popularity is rounded to a whole number because TMDB recomputes it daily;
+    without rounding every nightly run would see every movie as changed.
+
+    Args:
+        movie_data (dict): A discover result or detail payload.
 
-def process_movie(movie_data, genre_dict):
+    Returns:
+        str: A hex digest identifying the payload.
     """
-    Process and create or update a movie record in the database.
+    payload = [
+        round(movie_data.get('popularity') or 0),
+        movie_data.get('release_date') or '',
+        movie_data.get('poster_path') or '',
+    ]
+    return hashlib.sha1(json.dumps(payload).encode()).hexdigest()
+
+def process_movie(client, movie_data, genre_dict):
+    """
+    Process stage: fetch a movie's details and build the record to save.
+
+    Runs on a worker thread and does not touch the database.
 
     Args:
+        client (TMDBClient): The rate-limited client.
         movie_data (dict): The movie data from the API.
         genre_dict (dict): The dictionary mapping genre IDs to names.
+
+    Returns:
+        dict: The movie title, its field values, its TMDB genre ids and its sequel
+            records, or None if the movie has no poster and should be skipped.
     """
     movie_id = movie_data['id']
     title = movie_data['title']
     release_date = movie_data.get('release_date', '')
-    genre_ids = movie_data.get('genre_ids', [])
+    genre_ids = get_genre_ids(movie_data)
     genre_names = [genre_dict.get(genre_id, 'Unknown') for genre_id in genre_ids]
     image_path = movie_data.get('poster_path', '')
-    image_url = f"https://image.tmdb.org/t/p/w500{image_path}" if image_path else None
+    image_url = f"{IMAGE_BASE_URL}{image_path}" if image_path else None
     description = movie_data.get('overview', '')
     tmdb_popularity = movie_data.get('popularity', 0)
 
     if not image_url:
-        return
+        return None
 
-    detail_data = get_movie_details(movie_id)
-    director = next(
-        (crew_member['name'] for crew_member in detail_data.get('credits', {}).get('crew', [])
-         if crew_member['job'] == 'Director'), 'Unknown'
-    )
+    detail_data = get_movie_details(client, movie_id)
     collection = detail_data.get('belongs_to_collection', None)
 
-    movie_defaults = {
-        'release_date': release_date if release_date else None,
-        'director': director,
-        'genre': ', '.join(genre_names),
-        'description': description,
-        'image_url': image_url,
-        'tmdb_popularity': tmdb_popularity
+    return {
+        'title': title,
+        'defaults': {
+            'release_date': release_date if release_date else None,
+            'director': get_director(detail_data),
+            'genre': ', '.join(genre_names),
+            'description': description,
+            'image_url': image_url,
+            'tmdb_popularity': tmdb_popularity,
+            'tmdb_id': movie_id,
+            'sync_fingerprint': list_fingerprint(movie_data),
+        },
+        'genre_ids': genre_ids,
+        'sequels': process_sequels(client, collection, genre_dict) if collection else [],
     }
 
-    Movie.objects.update_or_create(
-        title=title,
-        defaults=movie_defaults
-    )
-
-    if collection:
-        process_sequels(Movie.objects.get(title=title), collection, genre_dict)
-
-def process_sequels(movie, collection, genre_dict):
+def process_sequels(client, collection, genre_dict):
     """
-    Process and create or update sequel records in the database.
+    Process stage: fetch the details of every part of a collection.
 
     Args:
-        movie (Movie): The parent movie instance.
+        client (TMDBClient): The rate-limited client.
         collection (dict): The collection data from the API.
         genre_dict (dict): The dictionary mapping genre IDs to names.
+
+    Returns:
+        list: The title, field values and TMDB genre ids of each sequel that has a poster.
     """
+    sequels = []
     for sequel_movie_id in collection.get('parts', []):
-        sequel_data = get_movie_details(sequel_movie_id)
+        sequel_data = get_movie_details(client, sequel_movie_id)
         sequel_title = sequel_data.get('title', 'Unknown')
         sequel_release_date = sequel_data.get('release_date', '')
-        sequel_genres = [genre_dict.get(genre_id, 'Unknown') for genre_id in sequel_data.get('genre_ids', [])]
+        sequel_genre_ids = get_genre_ids(sequel_data)
+        sequel_genres = [genre_dict.get(genre_id, 'Unknown') for genre_id in sequel_genre_ids]
         sequel_image_path = sequel_data.get('poster_path', '')
-        sequel_image_url = f"https://image.tmdb.org/t/p/w500{sequel_image_path}" if sequel_image_path else None
+        sequel_image_url = f"{IMAGE_BASE_URL}{sequel_image_path}" if sequel_image_path else None
         sequel_description = sequel_data.get('overview', '')
         sequel_popularity = sequel_data.get('popularity', 0)
 
         if not sequel_image_url:
             continue
 
-        director = next(
-            (crew_member['name'] for crew_member in sequel_data.get('credits', {}).get('crew', [])
-             if crew_member['job'] == 'Director'), 'Unknown'
-        )
+        sequels.append({
+            'title': sequel_title,
+            'defaults': {
+                'release_date': sequel_release_date if sequel_release_date else None,
+                'director': get_director(sequel_data),
+                'genre': ', '.join(sequel_genres),
+                'description': sequel_description,
+                'image_url': sequel_image_url,
+                'tmdb_popularity': sequel_popularity,
+                'tmdb_id': sequel_movie_id,
+                'sync_fingerprint': list_fingerprint(sequel_data),
+            },
+            'genre_ids': sequel_genre_ids,
+        })
+    return sequels
+
+class BatchWriter:
+    """
+    Save stage: collects processed records and upserts them in batches.
 
-        sequel_defaults = {
-            'release_date': sequel_release_date if sequel_release_date else None,
-            'director': director,
-            'genre': ', '.join(sequel_genres),
-            'description': sequel_description,
-            'image_url': sequel_image_url,
-            'tmdb_popularity': sequel_popularity
-        }
-
-        Sequel.objects.update_or_create(
-            title=sequel_title,
-            defaults=sequel_defaults
-        )
+    Each flush writes all pending movies with one `bulk_create(update_conflicts=True)`
+    keyed on the unique TMDB id, looks their ids up with a single query, upserts
+    their sequels keyed on `(movie, title)`, replaces the genre links of both
+    with bulk inserts into the many-to-many tables and refreshes the search
+    index rows, all inside one transaction.
+    """
+    SEQUEL_FIELDS = [
+        'release_date', 'director', 'genre', 'description', 'image_url', 'tmdb_popularity',
+        'tmdb_id', 'sync_fingerprint', 'last_synced_at',
+    ]
+    # A movie retitled on TMDB keeps its row.
+    MOVIE_FIELDS = ['title', *(field for field in SEQUEL_FIELDS if field != 'tmdb_id')]
+
+    def __init__(self, batch_size=500):
+        """
+        Args:
+            batch_size (int): The number of movies written per transaction.
+        """
+        self.batch_size = batch_size
+        self.pending = {}
+        self.movies_written = 0
+        self.sequels_written = 0
+        self.genre_pks = None
+
+    def add(self, record):
+        """
+        Queue a record built by `process_movie`, flushing once the batch is full.
+
+        Args:
+            record (dict): The record to save.
 
-        Sequel.objects.update_or_create(
-            movie=movie,
-            title=sequel_title,
-            defaults=sequel_defaults
+        Returns:
+            bool: Whether the batch was flushed.
+        """
+        # A later record for the same movie replaces the queued one, since an
+        # upsert cannot touch the same row twice in one statement.
+        self.pending[record['defaults']['tmdb_id']] = record
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """
+        Write all pending records in a single transaction.
+        """
+        if not self.pending:
+            return
+        records = list(self.pending.values())
+        self.pending = {}
+        synced_at = timezone.now()
+
+        with transaction.atomic():
+            # pylint: disable=no-member
+            Movie.objects.bulk_create(
+                [Movie(title=record['title'], last_synced_at=synced_at, **record['defaults'])
+                 for record in records],
+                update_conflicts=True,
+                unique_fields=['tmdb_id'],
+                update_fields=self.MOVIE_FIELDS,
+            )
+            movie_ids = dict(
+                Movie.objects.filter(tmdb_id__in=[record['defaults']['tmdb_id'] for record in records])
+                .values_list('tmdb_id', 'id')
+            )
+            sequels = {
+                (movie_ids[record['defaults']['tmdb_id']], sequel['title']): Sequel(
+                    movie_id=movie_ids[record['defaults']['tmdb_id']], title=sequel['title'],
+                    last_synced_at=synced_at, **sequel['defaults'])
+                for record in records
+                for sequel in record['sequels']
+            }
+            Sequel.objects.bulk_create(
+                list(sequels.values()),
+                update_conflicts=True,
+                unique_fields=['movie', 'title'],
+                update_fields=self.SEQUEL_FIELDS,
+            )
+            sequel_ids = {
+                (movie_id, title): sequel_id
+                for movie_id, title, sequel_id in Sequel.objects.filter(
+                    movie_id__in=movie_ids.values()).values_list('movie_id', 'title', 'id')
+            }
+            self.link_genres(Movie.genres.through, 'movie_id', {
+                movie_ids[record['defaults']['tmdb_id']]: record.get('genre_ids', ()) for record in records
+            })
+            self.link_genres(Sequel.genres.through, 'sequel_id', {
+                sequel_ids[movie_ids[record['defaults']['tmdb_id']], sequel['title']]: sequel.get('genre_ids', ())
+                for record in records
+                for sequel in record['sequels']
+            })
+            index_movies(movie_ids.values())
+
+        self.movies_written += len(records)
+        self.sequels_written += len(sequels)
+
+    def link_genres(self, through, owner_field, genre_ids):
+        """
+        Replace the genre links of the written rows in a many-to-many table.
+
+        Args:
+            through (Model): The many-to-many table.
+            owner_field (str): The column pointing at the movie or sequel.
+            genre_ids (dict): Maps a row id to its TMDB genre ids.
+        """
+        if not genre_ids:
+            return
+        if self.genre_pks is None:
+            # pylint: disable=no-member
+            self.genre_pks = dict(Genre.objects.filter(tmdb_id__isnull=False).values_list('tmdb_id', 'id'))
+        through.objects.filter(**{f'{owner_field}__in': list(genre_ids)}).delete()
+        through.objects.bulk_create([
+            through(**{owner_field: owner_id, 'genre_id': self.genre_pks[genre_id]})
+            for owner_id, owner_genre_ids in genre_ids.items()
+            for genre_id in set(owner_genre_ids) if genre_id in self.genre_pks
+        ])
+
+def write_json(path, state):
+    """
+    Write `state` as JSON, replacing the file at `path` atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w', encoding='utf-8') as temp_file:
+        json.dump(state, temp_file)
+    os.replace(temp_path, path)
+
+class Checkpoint:
+    """
+    Progress of an ingestion run, persisted as JSON after every committed batch.
+
+    Attributes:
+        page (int): The discover page in progress.
+        committed_ids (list): TMDB ids on that page that are already saved or skipped.
+        in_flight_ids (list): TMDB ids on that page still being processed.
+        genre_dict (dict): The genre map fetched at the start of the run.
+    """
+
+    def __init__(self, path, page=1, committed_ids=(), in_flight_ids=(), genre_dict=None):
+        self.path = path
+        self.page = page
+        self.committed_ids = list(committed_ids)
+        self.in_flight_ids = list(in_flight_ids)
+        self.genre_dict = genre_dict or {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a checkpoint file.
+
+        Returns:
+            Checkpoint: The saved progress, or None if there is no checkpoint.
+        """
+        try:
+            with open(path, encoding='utf-8') as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        # JSON object keys are always strings; TMDB ids are integers.
+        return cls(
+            path,
+            page=state['page'],
+            committed_ids=state['committed_ids'],
+            in_flight_ids=state['in_flight_ids'],
+            genre_dict={int(genre_id): name for genre_id, name in state['genre_dict'].items()},
         )
 
-class Command(BaseCommand):
-    help = 'Populate popular movies and sequels from an external API'
+    def save(self):
+        """
+        Write the checkpoint, replacing the previous file atomically.
+        """
+        write_json(self.path, {
+            'page': self.page,
+            'committed_ids': self.committed_ids,
+            'in_flight_ids': self.in_flight_ids,
+            'genre_dict': self.genre_dict,
+        })
+
+    def clear(self):
+        """
+        Remove the checkpoint file once a run completes.
+        """
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
 
-    def handle(self, *args, **kwargs):
+class DeadLetters:
+    """
+    Movies that failed every processing attempt, persisted as JSON across runs.
+
+    Attributes:
+        entries (dict): Maps a TMDB id to its attempts, last error and when it failed.
+    """
+
+    def __init__(self, path, entries=None):
+        self.path = path
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, path):
         """
-        Handle the command execution.
+        Read a dead-letter file.
+
+        Returns:
+            DeadLetters: The parked movies, empty if there is no file yet.
+        """
+        try:
+            with open(path, encoding='utf-8') as dead_letter_file:
+                entries = json.load(dead_letter_file)
+        except FileNotFoundError:
+            return cls(path)
+        return cls(path, {int(movie_id): entry for movie_id, entry in entries.items()})
 
+    def __contains__(self, movie_id):
+        return movie_id in self.entries
+
+    def add(self, movie_id, attempts, error):
+        """
+        Park a movie and write the file.
+        """
+        self.entries[movie_id] = {
+            'attempts': attempts, 'error': str(error), 'failed_at': timezone.now().isoformat()}
+        write_json(self.path, self.entries)
+
+    def discard(self, movie_id):
+        """
+        Release a movie that was processed after all, writing the file if it was parked.
+        """
+        if self.entries.pop(movie_id, None) is not None:
+            write_json(self.path, self.entries)
+
+class IngestionPipeline:
+    """
+    Walks the TMDB discover listing and feeds every movie through the
+    fetch, process and save stages.
+    """
+
+    def __init__(self, client, checkpoint, writer, dead_letters, concurrency=8, incremental=False,
+                 min_popularity=0, max_attempts=3, retry_dead_letters=False):
+        """
         Args:
-            *args: Additional arguments.
-            **kwargs: Additional keyword arguments.
+            client (TMDBClient): The rate-limited client shared by all workers.
+            checkpoint (Checkpoint): Where to start, and where progress is saved.
+                Its `genre_dict` maps genre IDs to names.
+            writer (BatchWriter): The writer receiving processed records.
+            dead_letters (DeadLetters): Where failing movies are parked; parked
+                movies are skipped.
+            concurrency (int): The number of worker threads.
+            incremental (bool): Skip movies whose list fingerprint is unchanged.
+            min_popularity (float): Stop paging once results fall below this popularity.
+            max_attempts (int): How many times a failing movie is processed before
+                it is dead-lettered.
+            retry_dead_letters (bool): Process parked movies again, releasing
+                those that succeed.
+        """
+        self.client = client
+        self.checkpoint = checkpoint
+        self.dead_letters = dead_letters
+        self.retry_dead_letters = retry_dead_letters
+        self.genre_dict = checkpoint.genre_dict
+        self.writer = writer
+        self.concurrency = concurrency
+        self.min_popularity = min_popularity
+        self.max_attempts = max_attempts
+        self.known_fingerprints = {}
+        if incremental:
+            # pylint: disable=no-member
+            self.known_fingerprints = dict(
+                Movie.objects.exclude(tmdb_id=None).values_list('tmdb_id', 'sync_fingerprint'))
+        self.skipped = 0
+
+    def iter_pages(self, executor, start_page=1):
+        """
+        Yield `(page, results)` in page order, prefetching up to `concurrency`
+        pages ahead of the consumer.
+        """
+        first_page = get_discover_page(self.client, start_page)
+        total_pages = min(first_page.get('total_pages', 1), MAX_DISCOVER_PAGES)
+        if not first_page['results']:
+            return
+        yield start_page, first_page['results']
+
+        pending = deque()
+        next_page = start_page + 1
+        try:
+            while pending or next_page <= total_pages:
+                while next_page <= total_pages and len(pending) < self.concurrency:
+                    pending.append((next_page, executor.submit(get_discover_page, self.client, next_page)))
+                    next_page += 1
+                page, future = pending.popleft()
+                results = future.result()['results']
+                if not results:
+                    return
+                yield page, results
+        finally:
+            for _, queued in pending:
+                queued.cancel()
+
+    def select(self, results):
         """
-        genre_dict = get_genre_dict()
+        Split a page of discover results into the movies that need a detail fetch
+        and the TMDB ids of those that are unchanged since the last sync.
+        """
+        changed, unchanged = [], []
+        for movie_data in results:
+            if movie_data.get('popularity', 0) < self.min_popularity:
+                continue
+            if self.known_fingerprints.get(movie_data['id']) == list_fingerprint(movie_data):
+                unchanged.append(movie_data['id'])
+            else:
+                changed.append(movie_data)
+        return changed, unchanged
+
+    def process(self, movie_data):
+        """
+        Run `process_movie`, retrying failures up to `max_attempts` times.
 
-        page = 1
-        total_pages = 1
+        Returns:
+            tuple: The record (or None) and, if every attempt failed, the last error.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return process_movie(self.client, movie_data, self.genre_dict), None
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning('Processing movie %s failed (attempt %d): %s', movie_data['id'], attempt, exc)
+                error = exc
+        return None, error
+
+    def run(self):
+        """
+        Run the pipeline to completion, starting from the checkpoint.
 
-        while page <= total_pages:
-            params = {
-                'api_key': API_KEY,
-                'language': 'en-US',
-                'sort_by': 'popularity.desc',  # Sort by popularity to get popular movies
-                'page': page,
-                'include_adult': 'false'
-            }
-            data = fetch_json(f'{BASE_URL}{ApiEndpoint.DISCOVER_MOVIE.value}', params)
-            total_pages = data.get('total_pages', 1)
+        Returns:
+            int: The number of movies saved.
+        """
+        checkpoint = self.checkpoint
+        start_page, resumed_ids = checkpoint.page, set(checkpoint.committed_ids)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for page, results in self.iter_pages(executor, start_page):
+                done = resumed_ids if page == start_page else set()
+                changed, unchanged = self.select([
+                    movie_data for movie_data in results
+                    if movie_data['id'] not in done
+                    and (self.retry_dead_letters or movie_data['id'] not in self.dead_letters)
+                ])
+                futures = [
+                    (movie_data['id'], executor.submit(self.process, movie_data))
+                    for movie_data in changed
+                ]
+                if unchanged:
+                    # pylint: disable=no-member
+                    Movie.objects.filter(tmdb_id__in=unchanged).update(last_synced_at=timezone.now())
+                    self.skipped += len(unchanged)
+
+                checkpoint.page = page
+                checkpoint.committed_ids = sorted(done) + unchanged
+                checkpoint.in_flight_ids = [movie_id for movie_id, _ in futures]
+                for movie_id, future in futures:
+                    record, error = future.result()
+                    checkpoint.in_flight_ids.remove(movie_id)
+                    checkpoint.committed_ids.append(movie_id)
+                    if error is not None:
+                        self.dead_letters.add(movie_id, self.max_attempts, error)
+                    else:
+                        self.dead_letters.discard(movie_id)
+                    # Everything handed to the writer so far is committed by a flush.
+                    if record and self.writer.add(record):
+                        checkpoint.save()
+                # Results are sorted by popularity, so nothing further can qualify.
+                if results[-1].get('popularity', 0) < self.min_popularity:
+                    break
+        self.writer.flush()
+        return self.writer.movies_written
 
-            if not data['results']:
-                break
+class Command(BaseCommand):
+    help = 'Populate popular movies and sequels from an external API'
 
-            for movie_data in data['results']:
-                process_movie(movie_data, genre_dict)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Number of concurrent TMDB requests (default: 8).')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of movies upserted per transaction (default: 500).')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Only fetch details for movies whose popularity, release date or poster changed.')
+        parser.add_argument(
+            '--min-popularity', type=float, default=0,
+            help='Stop paging once TMDB popularity drops below this floor (default: 0).')
+        parser.add_argument(
+            '--cache-dir',
+            help='Directory for cached TMDB detail payloads, reused across runs.')
+        parser.add_argument(
+            '--cache-ttl', type=float, default=86400,
+            help='Seconds a cached detail payload stays fresh (default: 86400).')
+        parser.add_argument(
+            '--checkpoint', default=str(DEFAULT_CHECKPOINT),
+            help='Checkpoint file written after every committed batch.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue from the checkpoint left by an interrupted run.')
+        parser.add_argument(
+            '--max-attempts', type=int, default=3,
+            help='Attempts per movie before it is dead-lettered (default: 3).')
+        parser.add_argument(
+            '--dead-letters', default=str(DEFAULT_DEAD_LETTERS),
+            help='File listing movies that failed every attempt, kept across runs.')
+        parser.add_argument(
+            '--retry-dead-letters', action='store_true',
+            help='Process dead-lettered movies again instead of skipping them.')
+        parser.add_argument(
+            '--rps', type=float, default=40,
+            help='Maximum TMDB requests per second, 0 for unlimited (default: 40).')
 
-            page += 1
+    def handle(self, *args, **kwargs):
+        """
+        Handle the command execution.
 
-        self.stdout.write(self.style.SUCCESS('Successfully populated popular movies and sequels.'))
+        Args:
+            *args: Additional arguments.
+            **kwargs: Additional keyword arguments.
+        """
+        concurrency = max(1, kwargs['concurrency'])
+        detail_cache = DetailCache(kwargs['cache_dir'], ttl=kwargs['cache_ttl'])
+        client = TMDBClient(rps=kwargs['rps'], pool_size=concurrency, detail_cache=detail_cache)
+        checkpoint = Checkpoint.load(kwargs['checkpoint']) if kwargs['resume'] else None
+        dead_letters = DeadLetters.load(kwargs['dead_letters'])
+        if checkpoint:
+            self.stdout.write(f'Resuming at page {checkpoint.page}.')
+        elif kwargs['resume']:
+            self.stdout.write('No checkpoint found, starting from the first page.')
+        try:
+            if not checkpoint:
+                checkpoint = Checkpoint(kwargs['checkpoint'], genre_dict=get_genre_dict(client))
+            save_genres(checkpoint.genre_dict)
+            writer = BatchWriter(batch_size=max(1, kwargs['batch_size']))
+            pipeline = IngestionPipeline(
+                client, checkpoint, writer, dead_letters, concurrency,
+                incremental=kwargs['incremental'], min_popularity=kwargs['min_popularity'],
+                max_attempts=max(1, kwargs['max_attempts']), retry_dead_letters=kwargs['retry_dead_letters'])
+            saved = pipeline.run()
+        finally:
+            client.close()
+            # Bulk writes skip the model signals, so announce the change once.
+            catalog_updated.send(sender=self.__class__)
+        checkpoint.clear()
+
+        if dead_letters.entries:
+            self.stdout.write(self.style.WARNING(
+                f'Dead-lettered movie ids, skipped until --retry-dead-letters: '
+                f'{", ".join(map(str, sorted(dead_letters.entries)))} (see {dead_letters.path})'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully populated popular movies and sequels '
+            f'({saved} movies updated, {pipeline.skipped} unchanged, '
+            f'{detail_cache.misses} detail fetches, {detail_cache.hits} cache hits).'))
@@ -0,0 +1,38 @@
+"""
+Precompute recommendations for every recently active user.
+
+Run it after `build_recommendations`, for example nightly from cron. Users
+without stored results are still served by the per-request path.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from movies_sequels.batch_recommendations import AFFINITY_WEIGHT, precompute_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Precompute and store recommendations for every user with recent activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90,
+                            help='Users rating or watching within this many days are active (default: 90).')
+        parser.add_argument('--limit', type=int, default=10,
+                            help='Movies stored per user (default: 10).')
+        parser.add_argument('--shards', type=int, default=4,
+                            help='User-id shards scored in parallel (default: 4).')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: CPU count).')
+        parser.add_argument('--affinity-weight', type=float, default=AFFINITY_WEIGHT,
+                            help=f'Share of genre/director affinity in the score (default: {AFFINITY_WEIGHT}).')
+
+    def handle(self, *args, **kwargs):
+        start = time.perf_counter()
+        users, written = precompute_recommendations(
+            days=kwargs['days'],
+            limit=kwargs['limit'],
+            shards=max(1, kwargs['shards']),
+            workers=kwargs['workers'],
+            affinity_weight=kwargs['affinity_weight'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} recommendations for {users} users in {time.perf_counter() - start:.1f}s'))
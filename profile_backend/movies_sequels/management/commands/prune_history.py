@@ -0,0 +1,39 @@
+"""
+Apply the `HISTORY_RETENTION` policies to the watch and search history tables.
+
+Run it periodically, for example nightly from cron. Rows are deleted in short
+chunks of primary keys. With `--compact`, the database is then compacted:
+VACUUM and ANALYZE on SQLite, VACUUM ANALYZE of the pruned tables on
+PostgreSQL. VACUUM rewrites the whole SQLite file under an exclusive lock, so
+run it in a maintenance window.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from movies_sequels.retention import MODELS, apply_retention, compact
+
+
+class Command(BaseCommand):
+    help = 'Delete history rows past their retention policy, optionally compacting the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Rows per delete transaction (default: 5000).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report the rows that would be deleted without deleting them.')
+        parser.add_argument('--compact', action='store_true',
+                            help='Run VACUUM/ANALYZE after deleting.')
+
+    def handle(self, *args, **kwargs):
+        start = time.perf_counter()
+        reclaimed = apply_retention(chunk_size=max(1, kwargs['chunk_size']), dry_run=kwargs['dry_run'])
+        verb = 'Would delete' if kwargs['dry_run'] else 'Deleted'
+        for name, rows in reclaimed.items():
+            self.stdout.write(f'{name}: {verb.lower()} {rows} rows')
+        pruned = [MODELS[name] for name, rows in reclaimed.items() if rows]
+        if pruned and not kwargs['dry_run'] and kwargs['compact']:
+            compact_start = time.perf_counter()
+            compact(pruned)
+            self.stdout.write(f'Compacted the database in {time.perf_counter() - compact_start:.1f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sum(reclaimed.values())} history rows in {time.perf_counter() - start:.1f}s'))
@@ -0,0 +1,34 @@
+"""
+Recompute the trending snapshots from the trending bucket counters.
+
+Requests only read the snapshots, so run this every
+`TRENDING_SNAPSHOT_INTERVAL`: from cron, or as a long-running process with
+`--loop`.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from movies_sequels.trending import snapshot_trending
+
+
+class Command(BaseCommand):
+    help = 'Recompute the 1h/24h/7d trending movie snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, recomputing every TRENDING_SNAPSHOT_INTERVAL.')
+
+    def handle(self, *args, **kwargs):
+        interval = settings.TRENDING_SNAPSHOT_INTERVAL.total_seconds()
+        while True:
+            start = time.perf_counter()
+            stored = snapshot_trending()
+            windows = ', '.join(f'{name}: {count}' for name, count in stored.items())
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'Stored trending movies ({windows}) in {elapsed:.2f}s'))
+            if not kwargs['loop']:
+                return
+            close_old_connections()
+            time.sleep(max(0, interval - elapsed))
@@ -0,0 +1,32 @@
+"""
+Copy the rating aggregates' Bayesian scores that changed to `Movie.user_popularity`.
+
+Reviews only update the aggregates, so run this every `RATING_SYNC_INTERVAL`:
+from cron, or as a long-running process with `--loop`.
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from movies_sequels.ratings import sync_user_popularity
+
+
+class Command(BaseCommand):
+    help = 'Copy changed Bayesian rating scores to the movies user_popularity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, syncing every RATING_SYNC_INTERVAL.')
+
+    def handle(self, *args, **kwargs):
+        interval = settings.RATING_SYNC_INTERVAL.total_seconds()
+        while True:
+            start = time.perf_counter()
+            updated = sync_user_popularity()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(f'Updated user_popularity of {updated} movies in {elapsed:.2f}s'))
+            if not kwargs['loop']:
+                return
+            close_old_connections()
+            time.sleep(max(0, interval - elapsed))
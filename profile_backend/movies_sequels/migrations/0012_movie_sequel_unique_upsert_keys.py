@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:43
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_sequels(apps, schema_editor):
+    """
+    Keep only the oldest of the sequels sharing a movie and title, so the unique
+    constraint below can be added. Nothing references a sequel yet.
+
+    Movies are not merged: titles repeat across remakes, so movies are keyed on
+    their TMDB id instead.
+    """
+    Sequel = apps.get_model('movies_sequels', 'Sequel')
+    groups = (
+        Sequel.objects.values('movie', 'title').annotate(rows=Count('id'), keep=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for group in groups:
+        Sequel.objects.filter(movie=group['movie'], title=group['title']).exclude(id=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0011_searchhistory_movie_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='tmdb_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='movie',
+            constraint=models.UniqueConstraint(fields=('tmdb_id',), name='unique_movie_tmdb_id'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title'], name='movie_title'),
+        ),
+        migrations.RunPython(merge_duplicate_sequels, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='sequel',
+            constraint=models.UniqueConstraint(fields=('movie', 'title'), name='unique_sequel_title_per_movie'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0012_movie_sequel_unique_upsert_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='sequel',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sequel',
+            name='sync_fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name='sequel',
+            name='tmdb_id',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
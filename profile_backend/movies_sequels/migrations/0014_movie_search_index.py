@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'movies_sequels_movie_fts'
+PG_INDEX = 'movies_sequels_movie_search_gin'
+PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(director, '') "
+    "|| ' ' || coalesce(description, ''))"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the FTS5 table (SQLite) or GIN index (PostgreSQL) used by
+    `movies_sequels.search`. Other backends, and SQLite builds without FTS5,
+    keep using the icontains fallback.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, director, description, tokenize='unicode61 remove_diacritics 2')"
+            )
+        except OperationalError:
+            return
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, director, description) "
+            f"SELECT id, title, coalesce(director, ''), coalesce(description, '') "
+            f"FROM movies_sequels_movie"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX {PG_INDEX} ON movies_sequels_movie USING GIN ({PG_DOCUMENT})"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0013_movie_sequel_sync_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0014_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-tmdb_popularity', '-id'], name='movie_popularity_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreview',
+            index=models.Index(fields=['movie', '-created_at', '-id'], name='review_movie_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreview',
+            index=models.Index(fields=['logged_id', '-created_at', '-id'], name='review_user_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='ratingreview',
+            index=models.Index(fields=['-created_at', '-id'], name='review_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='searchhistory',
+            index=models.Index(fields=['logged_id', '-watched_at', '-id'], name='search_user_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='searchhistory',
+            index=models.Index(fields=['-watched_at', '-id'], name='search_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='sequel',
+            index=models.Index(fields=['-tmdb_popularity', '-id'], name='sequel_popularity_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['logged_id', '-watched_at', '-id'], name='watch_user_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='watchhistory',
+            index=models.Index(fields=['-watched_at', '-id'], name='watch_keyset'),
+        ),
+    ]
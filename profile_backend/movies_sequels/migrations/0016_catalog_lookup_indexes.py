@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0015_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date'], name='movie_release_date'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre'], name='movie_genre'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['director'], name='movie_director'),
+        ),
+        migrations.AddIndex(
+            model_name='sequel',
+            index=models.Index(fields=['release_date'], name='sequel_release_date'),
+        ),
+        migrations.AddIndex(
+            model_name='sequel',
+            index=models.Index(fields=['genre'], name='sequel_genre'),
+        ),
+    ]
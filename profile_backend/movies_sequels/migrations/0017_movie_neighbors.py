@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0016_catalog_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieNeighbor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='movies_sequels.movie')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies_sequels.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'rank'), name='unique_movie_neighbor_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0017_movie_neighbors'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Genre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('tmdb_id', models.IntegerField(blank=True, null=True, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='genres',
+            field=models.ManyToManyField(blank=True, related_name='movies', to='movies_sequels.genre'),
+        ),
+        migrations.AddField(
+            model_name='sequel',
+            name='genres',
+            field=models.ManyToManyField(blank=True, related_name='sequels', to='movies_sequels.genre'),
+        ),
+    ]
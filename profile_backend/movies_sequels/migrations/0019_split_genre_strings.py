@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Placeholder the ingestion wrote for genre ids missing from the TMDB genre list.
+UNKNOWN_GENRE = 'Unknown'
+
+
+def split_names(genre):
+    return [name.strip() for name in (genre or '').split(',')
+            if name.strip() and name.strip() != UNKNOWN_GENRE]
+
+
+def link_genres(apps, schema_editor):
+    """
+    Create a Genre for every name found in the comma-joined `genre` strings
+    and link each movie and sequel to its genres. TMDB ids are filled in by
+    the next ingestion run.
+    """
+    Genre = apps.get_model('movies_sequels', 'Genre')
+    for model_name, owner_field in (('Movie', 'movie_id'), ('Sequel', 'sequel_id')):
+        model = apps.get_model('movies_sequels', model_name)
+        rows = [(owner_id, split_names(genre)) for owner_id, genre in model.objects.values_list('id', 'genre')]
+        names = {name for _, owner_names in rows for name in owner_names}
+        Genre.objects.bulk_create([Genre(name=name) for name in names], ignore_conflicts=True)
+        genre_ids = dict(Genre.objects.values_list('name', 'id'))
+        through = model.genres.through
+        through.objects.bulk_create(
+            [through(**{owner_field: owner_id, 'genre_id': genre_ids[name]})
+             for owner_id, owner_names in rows for name in set(owner_names)],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0018_genre'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_genres, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0019_split_genre_strings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('logged_id', models.IntegerField()),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies_sequels.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('logged_id', 'rank'), name='unique_user_recommendation_rank')],
+            },
+        ),
+    ]
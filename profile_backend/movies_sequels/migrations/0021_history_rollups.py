@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0020_user_recommendations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchHistoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('logged_id', models.IntegerField()),
+                ('logged_name', models.TextField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('movie_name', models.TextField(blank=True, null=True)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_rollups', to='movies_sequels.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['logged_id', '-last_seen', '-id'], name='search_rollup_user_keyset'), models.Index(fields=['-last_seen', '-id'], name='search_rollup_keyset')],
+                'constraints': [models.UniqueConstraint(fields=('logged_id', 'movie'), name='unique_search_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WatchHistoryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('logged_id', models.IntegerField()),
+                ('logged_name', models.TextField(blank=True, null=True)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='watch_rollups', to='movies_sequels.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['logged_id', '-last_seen', '-id'], name='watch_rollup_user_keyset'), models.Index(fields=['-last_seen', '-id'], name='watch_rollup_keyset')],
+                'constraints': [models.UniqueConstraint(fields=('logged_id', 'movie'), name='unique_watch_rollup')],
+            },
+        ),
+    ]
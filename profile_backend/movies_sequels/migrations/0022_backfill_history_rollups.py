@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count, Max, Min
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Roll the existing raw watch and search events up per user and movie.
+    """
+    for raw_name, rollup_name, extra in (
+        ('WatchHistory', 'WatchHistoryRollup', ()),
+        ('SearchHistory', 'SearchHistoryRollup', ('movie_name',)),
+    ):
+        raw = apps.get_model('movies_sequels', raw_name)
+        rollup = apps.get_model('movies_sequels', rollup_name)
+        groups = raw.objects.values('logged_id', 'movie_id').annotate(
+            first_seen=Min('watched_at'),
+            last_seen=Max('watched_at'),
+            count=Count('id'),
+            logged_name=Max('logged_name'),
+            **{field: Max(field) for field in extra},
+        ).order_by()
+        rollup.objects.bulk_create((rollup(**group) for group in groups.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0021_history_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0022_backfill_history_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingStats',
+            fields=[
+                ('movie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rating_stats', serialize=False, to='movies_sequels.movie')),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('ratings_1', models.PositiveIntegerField(default=0)),
+                ('ratings_2', models.PositiveIntegerField(default=0)),
+                ('ratings_3', models.PositiveIntegerField(default=0)),
+                ('ratings_4', models.PositiveIntegerField(default=0)),
+                ('ratings_5', models.PositiveIntegerField(default=0)),
+                ('ratings_6', models.PositiveIntegerField(default=0)),
+                ('ratings_7', models.PositiveIntegerField(default=0)),
+                ('ratings_8', models.PositiveIntegerField(default=0)),
+                ('ratings_9', models.PositiveIntegerField(default=0)),
+                ('ratings_10', models.PositiveIntegerField(default=0)),
+                ('bayesian_score', models.FloatField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['-user_popularity', '-id'], name='movie_user_popularity_keyset'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill_rating_stats(apps, schema_editor):
+    """
+    Aggregate the existing reviews per movie and derive `user_popularity`.
+    """
+    RatingReview = apps.get_model('movies_sequels', 'RatingReview')
+    MovieRatingStats = apps.get_model('movies_sequels', 'MovieRatingStats')
+    Movie = apps.get_model('movies_sequels', 'Movie')
+    buckets = {1: Q(rating__lte=1), 10: Q(rating__gte=10)}
+    groups = RatingReview.objects.values('movie_id').order_by().annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'ratings_{value}': Count('id', filter=buckets.get(value, Q(rating=value))) for value in range(1, 11)},
+    )
+    prior_count = settings.RATING_PRIOR_COUNT
+    rows = [
+        MovieRatingStats(
+            bayesian_score=(settings.RATING_PRIOR_MEAN * prior_count + group['rating_sum'])
+            / (prior_count + group['rating_count']),
+            **group,
+        )
+        for group in groups.iterator()
+    ]
+    MovieRatingStats.objects.bulk_create(rows, batch_size=1000)
+    Movie.objects.bulk_update(
+        [Movie(id=row.movie_id, user_popularity=row.bayesian_score) for row in rows],
+        ['user_popularity'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0023_movie_rating_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
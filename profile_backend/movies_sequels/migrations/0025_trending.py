@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0024_backfill_movie_rating_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('watches', models.PositiveIntegerField(default=0)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies_sequels.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='trending_bucket_start')],
+                'constraints': [models.UniqueConstraint(fields=('movie', 'bucket_start'), name='unique_trending_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=8)),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='movies_sequels.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('window', 'rank'), name='unique_trending_rank')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:35
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_catalog_version(apps, schema_editor):
+    """
+    Create the version row, counting from the current time in milliseconds so
+    its ETags differ from those the cache-held counter served before.
+    """
+    CatalogVersion = apps.get_model('movies_sequels', 'CatalogVersion')
+    now = timezone.now()
+    CatalogVersion.objects.create(pk=1, version=int(now.timestamp() * 1000), modified=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies_sequels', '0025_trending'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+                ('modified', models.DateTimeField()),
+            ],
+        ),
+        migrations.RunPython(create_catalog_version, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,33 @@ from django.db import models
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
+# Ingestion bookkeeping columns, never sent to API clients.
+SYNC_FIELDS = ('sync_fingerprint', 'last_synced_at')
+
+class MovieQuerySet(models.QuerySet):
+    """
+    QuerySet for Movie with the shared builder used by every movie-list endpoint.
+    """
+    def for_listing(self):
+        """
+        Returns movies ready to be serialized with their nested sequels:
+        sequels are prefetched in one query and unused columns are deferred.
+        """
+        return self.defer(*SYNC_FIELDS).prefetch_related(
+            models.Prefetch('sequels', queryset=Sequel.objects.defer(*SYNC_FIELDS))
+        )
+
+class Genre(models.Model):
+    """
+    A TMDB movie genre. Movies and sequels link to their genres through
+    many-to-many tables, so genre filters are indexed joins.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    tmdb_id = models.IntegerField(blank=True, null=True, unique=True)
+
+    def __str__(self) -> str:
+        return str(self.name)
+
 class Movie(models.Model):
     """
     Represents a movie with details such as title, release date, director, genre,
@@ -19,10 +46,37 @@ class Movie(models.Model):
     release_date = models.DateField(blank=True, null=True)
     director = models.CharField(max_length=100, blank=True, null=True)
     genre = models.CharField(max_length=50, blank=True, null=True)
+    genres = models.ManyToManyField(Genre, related_name='movies', blank=True)
     description = models.TextField(blank=True, null=True)
     image_url = models.URLField(max_length=200, blank=True, null=True)
     tmdb_popularity = models.FloatField(blank=True, null=True)
     user_popularity = models.FloatField(blank=True, null=True)
+    tmdb_id = models.IntegerField(blank=True, null=True)
+    sync_fingerprint = models.CharField(max_length=40, blank=True, null=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+
+    objects = MovieQuerySet.as_manager()
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # TMDB ids are the ingestion upsert key, so bulk upserts can resolve conflicts;
+        # titles repeat across remakes. Movies added by hand have no TMDB id.
+        constraints = [
+            models.UniqueConstraint(fields=['tmdb_id'], name='unique_movie_tmdb_id'),
+        ]
+        # The popularity indexes back the keyset pagination of the movie list, the
+        # most-popular and the top user-rated feeds; the rest back title lookups,
+        # the recent feed and recommendation filters.
+        indexes = [
+            models.Index(fields=['title'], name='movie_title'),
+            models.Index(fields=['-tmdb_popularity', '-id'], name='movie_popularity_keyset'),
+            models.Index(fields=['-user_popularity', '-id'], name='movie_user_popularity_keyset'),
+            models.Index(fields=['release_date'], name='movie_release_date'),
+            models.Index(fields=['genre'], name='movie_genre'),
+            models.Index(fields=['director'], name='movie_director'),
+        ]
 
     def __str__(self) -> str:
         return str(self.title)
@@ -39,7 +93,7 @@ class Movie(models.Model):
 
         # Filter movies released between three months ago and now
         # pylint: disable=no-member
-        return Movie.objects.filter(
+        return Movie.objects.for_listing().filter(
             release_date__gte=three_months_ago_date,
             release_date__lte=current_date
         )
@@ -50,7 +104,7 @@ class Movie(models.Model):
         Returns the top 30 highest-rated movies.
         """
         # pylint: disable=no-member
-        return Movie.objects.order_by('-tmdb_popularity')[:32]
+        return Movie.objects.for_listing().order_by('-tmdb_popularity')[:32]
 
     @staticmethod
     def get_movie_name(movie_id):
@@ -69,12 +123,31 @@ class Sequel(models.Model):
     movie = models.ForeignKey(Movie, related_name='sequels', on_delete=models.CASCADE)
     title = models.CharField(max_length=100, blank=False, null=False)
     genre = models.CharField(max_length=100, blank=False, null=False)
+    genres = models.ManyToManyField(Genre, related_name='sequels', blank=True)
     release_date = models.DateField(blank=True, null=True)
     director = models.CharField(max_length=100, blank=True, null=True)
     tmdb_popularity = models.FloatField(blank=True, null=True)
     user_popularity = models.FloatField(blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     image_url = models.URLField(max_length=200, blank=True, null=True)
+    tmdb_id = models.IntegerField(blank=True, null=True, db_index=True)
+    sync_fingerprint = models.CharField(max_length=40, blank=True, null=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'title'], name='unique_sequel_title_per_movie'),
+        ]
+        # The popularity index backs the keyset pagination of the sequel list; the
+        # rest back the recent feed and recommendation filters.
+        indexes = [
+            models.Index(fields=['-tmdb_popularity', '-id'], name='sequel_popularity_keyset'),
+            models.Index(fields=['release_date'], name='sequel_release_date'),
+            models.Index(fields=['genre'], name='sequel_genre'),
+        ]
 
     def __str__(self) -> str:
         return str(self.title)
@@ -91,11 +164,95 @@ class Sequel(models.Model):
 
         # Filter sequels released between three months ago and now
         # pylint: disable=no-member
-        return Sequel.objects.filter(
+        return Sequel.objects.defer(*SYNC_FIELDS).filter(
             release_date__gte=three_months_ago_date,
             release_date__lte=current_date
         )
 
+class MovieNeighbor(models.Model):
+    """
+    One of the movies most similar to `movie`, precomputed offline by the
+    `build_recommendations` command. Rank 0 is the closest neighbour.
+    """
+    movie = models.ForeignKey(Movie, related_name='neighbors', on_delete=models.CASCADE)
+    neighbor = models.ForeignKey(Movie, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # Also the index behind the per-request neighbour lookup by movie
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'rank'], name='unique_movie_neighbor_rank'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.movie_id} -> {self.neighbor_id} ({self.score:.3f})"
+
+class UserRecommendation(models.Model):
+    """
+    A movie recommended to a user, precomputed by the `precompute_recommendations`
+    command. Rank 0 is the best recommendation. A user's rows are dropped as soon
+    as their ratings or history change, until the next run.
+    """
+    logged_id = models.IntegerField()
+    movie = models.ForeignKey(Movie, related_name='+', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # Also the index behind the per-request lookup by user
+        constraints = [
+            models.UniqueConstraint(fields=['logged_id', 'rank'], name='unique_user_recommendation_rank'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.logged_id} -> {self.movie_id} ({self.score:.3f})"
+
+class MovieRatingStats(models.Model):
+    """
+    Aggregates of a movie's ratings, maintained by `movies_sequels.ratings` as
+    reviews change, so averages and rankings never aggregate reviews per request.
+    `bayesian_score` is copied to `Movie.user_popularity` by `ratings.sync_user_popularity`.
+    """
+    movie = models.OneToOneField(Movie, primary_key=True, related_name='rating_stats', on_delete=models.CASCADE)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Histogram: the number of ratings of each value from 1 to 10
+    ratings_1 = models.PositiveIntegerField(default=0)
+    ratings_2 = models.PositiveIntegerField(default=0)
+    ratings_3 = models.PositiveIntegerField(default=0)
+    ratings_4 = models.PositiveIntegerField(default=0)
+    ratings_5 = models.PositiveIntegerField(default=0)
+    ratings_6 = models.PositiveIntegerField(default=0)
+    ratings_7 = models.PositiveIntegerField(default=0)
+    ratings_8 = models.PositiveIntegerField(default=0)
+    ratings_9 = models.PositiveIntegerField(default=0)
+    ratings_10 = models.PositiveIntegerField(default=0)
+    bayesian_score = models.FloatField(blank=True, null=True)
+
+    def __str__(self) -> str:
+        return f"{self.movie_id}: {self.rating_count} ratings ({self.bayesian_score})"
+
+    @property
+    def average(self):
+        """
+        Returns the plain mean rating, or None without ratings.
+        """
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def histogram(self):
+        """
+        Returns the counts of ratings 1 to 10, in order.
+        """
+        return [getattr(self, f'ratings_{value}') for value in range(1, 11)]
+
 class RatingReview(models.Model):
     """
     Represents a user's rating and review for a specific movie.
@@ -114,11 +271,26 @@ class RatingReview(models.Model):
         Meta data about class
         """
         unique_together = ('movie', 'logged_id')  # A user can rate/review a movie only once
+        # Back the keyset pagination of the review lists, per movie, per user and overall
+        indexes = [
+            models.Index(fields=['movie', '-created_at', '-id'], name='review_movie_keyset'),
+            models.Index(fields=['logged_id', '-created_at', '-id'], name='review_user_keyset'),
+            models.Index(fields=['-created_at', '-id'], name='review_keyset'),
+        ]
 
     def __str__(self) -> str:
         # pylint: disable=no-member
         return f"{self.logged_id} - {self.movie.title} ({self.rating}/10)"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored movie and rating, so the rating aggregates can move
+        # a changed review out of its old bucket without querying for it.
+        loaded = {name: value for name, value in zip(field_names, values) if value is not models.DEFERRED}
+        instance.loaded_rating = (loaded.get('movie_id'), loaded.get('rating'))
+        return instance
+
     @staticmethod
     def get_movie_reviews(movie_id):
         """
@@ -136,10 +308,9 @@ class RatingReview(models.Model):
         return RatingReview.objects.filter(logged_id=user).order_by('-created_at')
 
 class SearchHistory(models.Model):
-    """_summary_
-
-    Args:
-        models (_type_): _description_
+    """
+    Raw search event log, kept for analytics when `HISTORY_RAW_LOG_ENABLED` is
+    set. Listings read `SearchHistoryRollup`.
     """
     logged_id = models.IntegerField()
     logged_name = models.TextField(blank=True, null=True)
@@ -147,14 +318,152 @@ class SearchHistory(models.Model):
     movie_name = models.TextField(blank=True, null=True)
     watched_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        """
+        Meta data about class
+        """
+        # Back the keyset pagination of the history lists, per user and overall
+        indexes = [
+            models.Index(fields=['logged_id', '-watched_at', '-id'], name='search_user_keyset'),
+            models.Index(fields=['-watched_at', '-id'], name='search_keyset'),
+        ]
 
-class WatchHistory(models.Model):
-    """_summary_
 
-    Args:
-        models (_type_): _description_
+class WatchHistory(models.Model):
+    """
+    Raw watch event log, kept for analytics when `HISTORY_RAW_LOG_ENABLED` is
+    set. Listings read `WatchHistoryRollup`.
     """
     logged_id = models.IntegerField()
     logged_name = models.TextField(blank=True, null=True)
     movie = models.ForeignKey(Movie, related_name='watch_histories', on_delete=models.CASCADE)
     watched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # Back the keyset pagination of the history lists, per user and overall
+        indexes = [
+            models.Index(fields=['logged_id', '-watched_at', '-id'], name='watch_user_keyset'),
+            models.Index(fields=['-watched_at', '-id'], name='watch_keyset'),
+        ]
+
+
+class HistoryRollup(models.Model):
+    """
+    One row per user and movie summarizing every history event between them,
+    maintained by upsert in `movies_sequels.history.record_events`.
+    """
+    logged_id = models.IntegerField()
+    logged_name = models.TextField(blank=True, null=True)
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField()
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        abstract = True
+
+
+class WatchHistoryRollup(HistoryRollup):
+    """
+    Watch history rolled up per user and movie.
+    """
+    movie = models.ForeignKey(Movie, related_name='watch_rollups', on_delete=models.CASCADE)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # The unique key is the upsert target; the indexes back the keyset pagination
+        constraints = [
+            models.UniqueConstraint(fields=['logged_id', 'movie'], name='unique_watch_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['logged_id', '-last_seen', '-id'], name='watch_rollup_user_keyset'),
+            models.Index(fields=['-last_seen', '-id'], name='watch_rollup_keyset'),
+        ]
+
+
+class SearchHistoryRollup(HistoryRollup):
+    """
+    Search history rolled up per user and movie.
+    """
+    movie = models.ForeignKey(Movie, related_name='search_rollups', on_delete=models.CASCADE)
+    movie_name = models.TextField(blank=True, null=True)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # The unique key is the upsert target; the indexes back the keyset pagination
+        constraints = [
+            models.UniqueConstraint(fields=['logged_id', 'movie'], name='unique_search_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['logged_id', '-last_seen', '-id'], name='search_rollup_user_keyset'),
+            models.Index(fields=['-last_seen', '-id'], name='search_rollup_keyset'),
+        ]
+
+
+class TrendingBucket(models.Model):
+    """
+    Watch and search events of one movie in one `TRENDING_BUCKET_SECONDS` time
+    bucket, counted by `movies_sequels.trending` as events are recorded.
+    """
+    movie = models.ForeignKey(Movie, related_name='+', on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+    watches = models.PositiveIntegerField(default=0)
+    searches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # The unique key is the upsert target; the index backs the window scans and pruning
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'bucket_start'], name='unique_trending_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='trending_bucket_start'),
+        ]
+
+
+class TrendingSnapshot(models.Model):
+    """
+    The top trending movies of one window, as of `computed_at`.
+    """
+    window = models.CharField(max_length=8)
+    rank = models.PositiveSmallIntegerField()
+    movie = models.ForeignKey(Movie, related_name='+', on_delete=models.CASCADE)
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        """
+        Meta data about class
+        """
+        # Also the index behind the per-request lookup by window
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'rank'], name='unique_trending_rank'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.window} #{self.rank}: {self.movie_id} ({self.score:.3f})"
+
+
+class CatalogVersion(models.Model):
+    """
+    The single row counting catalog changes, behind the ETag and Last-Modified
+    of the catalog endpoints; see `movies_sequels.catalog_version`. It lives in
+    the database so that a change made by any process, such as a
+    `populate_models` run, is seen by every web process.
+    """
+    version = models.BigIntegerField()
+    modified = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"catalog v{self.version} ({self.modified:%Y-%m-%d %H:%M:%S})"
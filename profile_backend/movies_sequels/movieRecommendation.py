@@ -1,8 +1,30 @@
-from .models import RatingReview, WatchHistory, Movie, Sequel
+import heapq
+from collections import defaultdict
+
+from django.db.models import F, IntegerField, Value
+
+from .models import SYNC_FIELDS, RatingReview, WatchHistoryRollup, Movie, MovieNeighbor, Sequel, UserRecommendation
+
+# Ratings above this pull a movie's neighbours up, ratings below push them down.
+NEUTRAL_RATING = 5
+# The rating assumed for a watched movie the user has not rated.
+WATCHED_RATING = 7
+
+def seed_weight(rating):
+    """
+    Return the weight in [-0.8, 1] of a seed movie; None stands for watched but not rated.
+    """
+    if rating is None:
+        rating = WATCHED_RATING
+    return (rating - NEUTRAL_RATING) / NEUTRAL_RATING
 
 class RecommendationEngine:
     """
     A class to provide movie recommendations based on user watch history, ratings, and search history.
+
+    Recommendations are read from the results of the `precompute_recommendations`
+    command when the user has any, and otherwise merged from the precomputed
+    neighbours (see `similarity`) of the movies the user rated or watched.
     """
 
     def __init__(self, user_id):
@@ -22,27 +44,99 @@ class RecommendationEngine:
             QuerySet: A queryset of RatingReview objects for movies rated by the user.
         """
         # Fetch movies rated by the user
-        print(self.user_id)
         rated_movies = RatingReview.objects.filter(logged_id=self.user_id)
         return rated_movies
 
-    def recommend_sequels_based_on_genre(self):
+    def get_seed_weights(self):
         """
-        Recommend sequels based on the genres of movies rated by the user.
+        Weigh the movies the user rated or watched, in one query.
 
         Returns:
-            QuerySet: A queryset of sequels in the genres of the user's rated movies.
+            dict: Maps a movie ID to a weight in [-0.8, 1]; a rating takes
+                precedence over a watch.
         """
-        # Get user's rated movies
-        rated_movies = self.get_user_rated_movies()
+        rated = self.get_user_rated_movies().values_list('movie_id', 'rating')
+        watched = WatchHistoryRollup.objects.filter(logged_id=self.user_id).values_list(
+            'movie_id', Value(None, output_field=IntegerField()))
+        weights = {}
+        for movie_id, rating in rated.union(watched, all=True):
+            if rating is not None or movie_id not in weights:
+                weights[movie_id] = seed_weight(rating)
+        return weights
+
+    def get_precomputed_movie_ids(self, limit=10):
+        """
+        Return the IDs of the movies precomputed for the user, best first.
+        """
+        return list(
+            UserRecommendation.objects.filter(logged_id=self.user_id)
+            .order_by('rank').values_list('movie_id', flat=True)[:limit]
+        )
+
+    def recommend_movies(self, weights, limit=10):
+        """
+        Recommend the movies closest to the user's movies.
+
+        Args:
+            weights (dict): The seed weights from `get_seed_weights`.
+            limit (int): The maximum number of movies.
+
+        Returns:
+            list: Movies with their sequels prefetched, best first. Falls back to
+                `recommend_movies_by_director` while the neighbour table is empty.
+        """
+        if not weights:
+            return []
+        movie_ids = self.get_precomputed_movie_ids(limit) or self.merge_neighbors(weights, limit)
+        if movie_ids is None:
+            return list(self.recommend_movies_by_director())
+        movies = {movie.id: movie for movie in Movie.objects.for_listing().filter(id__in=movie_ids)}
+        return [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
 
-        # Get genres of movies rated by the user
-        genres = rated_movies.values_list('movie__genre', flat=True).distinct()
+    @staticmethod
+    def merge_neighbors(weights, limit=10):
+        """
+        Score the neighbours of the seed movies by their weighted similarity.
 
-        # Fetch sequels in the same genres
-        recommended_sequels = Sequel.objects.filter(genre__in=genres)
+        Args:
+            weights (dict): The seed weights from `get_seed_weights`.
+            limit (int): The maximum number of movies.
 
-        return recommended_sequels
+        Returns:
+            list: The best movie IDs, or None if no seed has neighbours yet.
+        """
+        scores = defaultdict(float)
+        neighbors = MovieNeighbor.objects.filter(movie_id__in=weights).values_list(
+            'movie_id', 'neighbor_id', 'score')
+        found = False
+        for movie_id, neighbor_id, score in neighbors:
+            found = True
+            if neighbor_id not in weights:
+                scores[neighbor_id] += weights[movie_id] * score
+        if not found:
+            return None
+        best = heapq.nlargest(limit, (item for item in scores.items() if item[1] > 0), key=lambda item: item[1])
+        return [movie_id for movie_id, _ in best]
+
+    def recommend_sequels(self, weights, movies):
+        """
+        Recommend sequels of the movies the user liked, then of the recommended movies.
+
+        Args:
+            weights (dict): The seed weights from `get_seed_weights`.
+            movies (list): The recommended movies, with sequels prefetched.
+
+        Returns:
+            list: The recommended sequels.
+        """
+        liked = [movie_id for movie_id, weight in weights.items() if weight > 0]
+        sequels = list(
+            Sequel.objects.defer(*SYNC_FIELDS).filter(movie_id__in=liked)
+            .order_by(F('tmdb_popularity').desc(nulls_last=True))
+        ) if liked else []
+        for movie in movies:
+            sequels.extend(movie.sequels.all())
+        return sequels
 
     def recommend_movies_by_director(self):
         """
@@ -58,6 +152,7 @@ class RecommendationEngine:
         directors = rated_movies.values_list('movie__director', flat=True).distinct()
 
         # Fetch movies directed by the same directors, excluding already rated movies
-        recommended_movies = Movie.objects.filter(director__in=directors).exclude(id__in=rated_movies.values_list('movie_id', flat=True))
+        recommended_movies = Movie.objects.for_listing().filter(director__in=directors).exclude(
+            id__in=rated_movies.values_list('movie_id', flat=True))
 
         return recommended_movies.order_by('-tmdb_popularity')[:10]
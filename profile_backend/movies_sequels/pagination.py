@@ -0,0 +1,150 @@
+"""
+Keyset (cursor) pagination for the list endpoints.
+
+Pages are ordered by a key column, descending, with the primary key as a tie
+breaker, and the cursor carries the `(key, id)` pair of the last row served.
+The next page is fetched with a `WHERE (key, id) < cursor` condition, so deep
+pages cost the same as the first one, as long as a composite index on
+`(key, id)` backs the ordering.
+
+Querysets of model instances and of `.values()` dicts are both accepted.
+
+The response body stays a plain list, as the frontend expects. The cursor of
+the next page is sent in a `Link: <url>; rel="next"` header and is absent on the
+last page.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+INVALID_CURSOR = 'Invalid cursor'
+
+
+def encode_cursor(values):
+    """
+    Encode the key values of the last row served into an opaque cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor built by `encode_cursor`.
+
+    Raises:
+        NotFound: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as exc:
+        raise NotFound(INVALID_CURSOR) from exc
+    if not isinstance(values, list) or len(values) != 2:
+        raise NotFound(INVALID_CURSOR)
+    return values
+
+
+class KeysetPagination(BasePagination):
+    """
+    Descending keyset pagination on `(key_field, id)`; NULL keys sort last.
+    """
+    key_field = None
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        """
+        Return the requested page size, clamped to `max_page_size`.
+        """
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def after(self, cursor):
+        """
+        Return the filter selecting the rows that follow the cursor.
+        """
+        key, row_id = cursor
+        if key is None:
+            return Q(**{f'{self.key_field}__isnull': True, 'id__lt': row_id})
+        return (
+            Q(**{f'{self.key_field}__lt': key})
+            | Q(**{self.key_field: key, 'id__lt': row_id})
+            | Q(**{f'{self.key_field}__isnull': True})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(F(self.key_field).desc(nulls_last=True), '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.after(decode_cursor(cursor)))
+            except (TypeError, ValueError, ValidationError) as exc:
+                # Well-formed, but holding values the key or id column cannot take.
+                raise NotFound(INVALID_CURSOR) from exc
+
+        rows = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            if isinstance(last, dict):
+                self.next_cursor = encode_cursor([last[self.key_field], last['id']])
+            else:
+                self.next_cursor = encode_cursor([getattr(last, self.key_field), last.id])
+        return rows
+
+    def get_next_link(self):
+        """
+        Return the URL of the next page, or None on the last page.
+        """
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        headers = {}
+        next_link = self.get_next_link()
+        if next_link:
+            headers['Link'] = f'<{next_link}>; rel="next"'
+        return Response(data, headers=headers)
+
+
+class PopularityPagination(KeysetPagination):
+    """
+    Most popular first.
+    """
+    key_field = 'tmdb_popularity'
+
+
+class UserPopularityPagination(KeysetPagination):
+    """
+    Best user-rated first, by Bayesian rating score.
+    """
+    key_field = 'user_popularity'
+
+
+class CreatedAtPagination(KeysetPagination):
+    """
+    Newest first, by creation time.
+    """
+    key_field = 'created_at'
+
+
+class LastSeenPagination(KeysetPagination):
+    """
+    Most recently seen first, for history rollups.
+    """
+    key_field = 'last_seen'
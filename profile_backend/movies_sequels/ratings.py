@@ -0,0 +1,153 @@
+"""
+Per-movie rating aggregates.
+
+`MovieRatingStats` holds each movie's rating count, sum, 1-10 histogram and
+Bayesian score. The receivers in `signals` keep the aggregates in step as
+reviews are created, changed and deleted. Each change is one UPDATE of
+counters relative to their stored values, so concurrent reviews of the same
+movie never overwrite each other. `rebuild_rating_stats` recomputes every
+aggregate from the reviews, after bulk writes or a change of the prior.
+
+The score is copied to `Movie.user_popularity`, which the top user-rated feed
+sorts on, by `sync_user_popularity` rather than on every review. Changing it
+moves the catalog to a new version, which retires every cached feed, so the
+`sync_user_popularity` command copies the scores that changed once every
+`RATING_SYNC_INTERVAL` and a burst of reviews costs a single version bump.
+
+The Bayesian score is the mean rating after adding `RATING_PRIOR_COUNT` ratings
+of `RATING_PRIOR_MEAN`, so a movie with a handful of tens does not outrank one
+with hundreds of nines.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+
+from .catalog_version import bump_catalog_version
+from .models import Movie, MovieRatingStats, RatingReview
+
+RATING_VALUES = range(1, 11)
+
+
+def bucket(rating):
+    """
+    Return the histogram column counting `rating`; out-of-range ratings count as 1 or 10.
+    """
+    return f'ratings_{min(max(rating, RATING_VALUES[0]), RATING_VALUES[-1])}'
+
+
+def bayesian_score(count, total):
+    """
+    Return the Bayesian score of `count` ratings summing to `total`, or None without ratings.
+    """
+    if not count:
+        return None
+    prior_count = settings.RATING_PRIOR_COUNT
+    return (settings.RATING_PRIOR_MEAN * prior_count + total) / (prior_count + count)
+
+
+def _score_expression(count, total):
+    prior_count = settings.RATING_PRIOR_COUNT
+    return ExpressionWrapper(
+        (Value(float(settings.RATING_PRIOR_MEAN * prior_count)) + total) / (Value(float(prior_count)) + count),
+        output_field=FloatField(),
+    )
+
+
+def change_rating(movie_id, old_rating=None, new_rating=None):
+    """
+    Move one review's rating in the aggregates of a movie.
+
+    Args:
+        movie_id (int): The reviewed movie.
+        old_rating (int): The rating to remove, or None for a new review.
+        new_rating (int): The rating to add, or None for a deleted review.
+    """
+    count_delta = (new_rating is not None) - (old_rating is not None)
+    updates = {
+        'rating_count': F('rating_count') + count_delta,
+        'rating_sum': F('rating_sum') + (new_rating or 0) - (old_rating or 0),
+    }
+    if old_rating is not None:
+        updates[bucket(old_rating)] = F(bucket(old_rating)) - 1
+    if new_rating is not None:
+        column = bucket(new_rating)
+        updates[column] = updates.get(column, F(column)) + 1
+    updates['bayesian_score'] = Case(
+        # Compared with the count before this update.
+        When(rating_count__gt=-count_delta, then=_score_expression(updates['rating_count'], updates['rating_sum'])),
+        default=None,
+    )
+    with transaction.atomic():
+        # pylint: disable=no-member
+        if new_rating is not None:
+            MovieRatingStats.objects.get_or_create(movie_id=movie_id)
+        MovieRatingStats.objects.filter(movie_id=movie_id).update(**updates)
+        if count_delta < 0:
+            # Movies without ratings have no row, as after a rebuild.
+            MovieRatingStats.objects.filter(movie_id=movie_id, rating_count=0).delete()
+
+
+def rating_stats_rows(reviews):
+    """
+    Aggregate `reviews` into one unsaved `MovieRatingStats` per movie, in a single query.
+    """
+    edges = {RATING_VALUES[0]: Q(rating__lte=RATING_VALUES[0]), RATING_VALUES[-1]: Q(rating__gte=RATING_VALUES[-1])}
+    groups = reviews.values('movie_id').order_by().annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'ratings_{value}': Count('id', filter=edges.get(value, Q(rating=value))) for value in RATING_VALUES},
+    )
+    return [
+        MovieRatingStats(bayesian_score=bayesian_score(group['rating_count'], group['rating_sum']), **group)
+        for group in groups.iterator()
+    ]
+
+
+def refresh_rating_stats(movie_id):
+    """
+    Recompute the aggregates of one movie from its reviews.
+    """
+    # pylint: disable=no-member
+    with transaction.atomic():
+        MovieRatingStats.objects.filter(movie_id=movie_id).delete()
+        MovieRatingStats.objects.bulk_create(rating_stats_rows(RatingReview.objects.filter(movie_id=movie_id)))
+
+
+def rebuild_rating_stats(batch_size=5000):
+    """
+    Recompute the aggregates and `user_popularity` of every movie from the reviews.
+
+    Returns:
+        int: The number of movies with ratings.
+    """
+    # pylint: disable=no-member
+    rows = rating_stats_rows(RatingReview.objects.all())
+    with transaction.atomic():
+        MovieRatingStats.objects.all().delete()
+        MovieRatingStats.objects.bulk_create(rows, batch_size=batch_size)
+        sync_user_popularity(batch_size)
+    return len(rows)
+
+
+def sync_user_popularity(batch_size=5000):
+    """
+    Copy the Bayesian scores that changed since the last sync to
+    `Movie.user_popularity`, and move the catalog to a new version if any did.
+
+    Returns:
+        int: The number of movies updated.
+    """
+    # pylint: disable=no-member
+    scores = dict(MovieRatingStats.objects.values_list('movie_id', 'bayesian_score').iterator())
+    movies = Movie.objects.filter(Q(user_popularity__isnull=False) | Q(rating_stats__isnull=False))
+    stale = [
+        Movie(id=movie_id, user_popularity=scores.get(movie_id))
+        for movie_id, user_popularity in movies.values_list('id', 'user_popularity').iterator()
+        if scores.get(movie_id) != user_popularity
+    ]
+    if stale:
+        with transaction.atomic():
+            Movie.objects.bulk_update(stale, ['user_popularity'], batch_size=batch_size)
+            # `user_popularity` is part of every serialized movie, so this also retires the cached feeds.
+            bump_catalog_version()
+    return len(stale)
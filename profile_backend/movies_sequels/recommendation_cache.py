@@ -0,0 +1,122 @@
+"""
+Per-user cache of rendered recommendation responses.
+
+A user's recommendations only change when they rate, watch or search
+something, when the catalog is reloaded, or when the neighbour table is rebuilt.
+This module stores each user's response as rendered JSON bytes in the cache
+named by `RECOMMENDATION_CACHE_ALIAS`, so a hit skips the engine's queries,
+the serializers and the renderer.
+
+- `invalidate_user_recommendations` drops one user's entry. The receivers in
+    `signals` call it when that user's reviews or history change.
+- `invalidate_recommendations` drops every entry by bumping a generation
+    number that is part of every key. It runs when catalog ingestion or
+    `build_recommendations` finishes. Entries of older generations are never
+    read again and expire with the timeout.
+
+The generation and the hit and miss counters live in the cache named by
+`RECOMMENDATION_STATE_CACHE_ALIAS`, without a timeout, so culling the entries
+never takes them along. Should the generation be lost anyway, it starts again
+from the current time in microseconds, so no older generation, and none of its
+entries, comes back. With a shared backend, `recommendation_cache_stats`
+reports totals for every process.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .renderers import FastJSONRenderer
+
+GENERATION_KEY = 'recommendations:generation'
+HITS_KEY = 'recommendations:hits'
+MISSES_KEY = 'recommendations:misses'
+
+
+def _cache():
+    return caches[settings.RECOMMENDATION_CACHE_ALIAS]
+
+
+def _state():
+    return caches[settings.RECOMMENDATION_STATE_CACHE_ALIAS]
+
+
+def _generation():
+    """
+    Return the current generation, starting one from the current time if it is missing.
+    """
+    generation = _state().get(GENERATION_KEY)
+    if generation is None:
+        start = time.time_ns() // 1000
+        _state().add(GENERATION_KEY, start, None)
+        generation = _state().get(GENERATION_KEY, start)
+    return generation
+
+
+def _key(user_id):
+    return f'recommendations:{_generation()}:{user_id}'
+
+
+def _count(key, initial=0):
+    """
+    Increment a counter, creating it from `initial` if it is missing.
+    """
+    try:
+        _state().incr(key)
+    except ValueError:
+        _state().add(key, initial, None)
+        _state().incr(key)
+
+
+def get_recommendations(user_id, build):
+    """
+    Return the rendered recommendations of a user, building and caching them on a miss.
+
+    Args:
+        user_id (int): The ID of the user.
+        build (callable): Returns the recommendation data to render.
+
+    Returns:
+        bytes: The recommendations rendered as JSON.
+    """
+    if not settings.RECOMMENDATION_CACHE_ENABLED:
+        return FastJSONRenderer().render(build())
+    key = _key(user_id)
+    payload = _cache().get(key)
+    if payload is None:
+        _count(MISSES_KEY)
+        payload = FastJSONRenderer().render(build())
+        _cache().set(key, payload, settings.RECOMMENDATION_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+    return payload
+
+
+def invalidate_user_recommendations(user_id):
+    """
+    Drop the cached recommendations of one user.
+    """
+    _cache().delete(_key(user_id))
+
+
+def invalidate_recommendations():
+    """
+    Drop the cached recommendations of every user.
+    """
+    _count(GENERATION_KEY, _generation())
+
+
+def recommendation_cache_stats():
+    """
+    Return the hit and miss counters.
+
+    Returns:
+        dict: `hits`, `misses` and the `hit_rate` in [0, 1].
+    """
+    counters = _state().get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+    }
@@ -0,0 +1,71 @@
+"""
+Worker-process side of `batch_recommendations`.
+
+This module only depends on NumPy and SciPy, so worker processes can import it
+without setting Django up, whichever multiprocessing start method is in use.
+"""
+import numpy as np
+
+# Set in each worker process by `init_worker`, so the matrices are sent once per worker.
+_neighbors = None
+_features = None
+_features_t = None
+_movie_ids = None
+
+
+def init_worker(neighbors, features, movie_ids):
+    """
+    Keep the neighbour matrix, the movie feature matrix and the movie id of
+    each of their rows for `score_shard`.
+    """
+    global _neighbors, _features, _features_t, _movie_ids  # pylint: disable=global-statement
+    _neighbors, _features, _movie_ids = neighbors, features, movie_ids
+    _features_t = features.T.tocsc()
+
+
+def score_shard(user_ids, seeds, limit, affinity_weight, block_size=512):
+    """
+    Score one shard of users in a worker process.
+
+    Each user's seed weights are summed over the genre and director features of
+    their movies into an affinity vector. A movie scores the dot product of that
+    vector with its own features, blended with the neighbour scores of the
+    user's movies. Users are scored `block_size` at a time, so the dense score
+    block stays bounded.
+
+    Args:
+        user_ids (list): The users of the shard, one per row of `seeds`.
+        seeds (scipy.sparse.csr_matrix): Their seed weight matrix.
+        limit (int): How many movies to keep per user.
+        affinity_weight (float): Share of the genre/director affinity in the score.
+        block_size (int): How many users to score at a time.
+
+    Returns:
+        list: `(user_id, movie_ids, scores)` tuples, best first, positive scores only.
+    """
+    affinity = (seeds @ _features).tocsr()
+    keep = min(limit, seeds.shape[1])
+    results = []
+    for start in range(0, len(user_ids), block_size):
+        stop = min(start + block_size, len(user_ids))
+        block = seeds[start:stop]
+        scores = (
+            (1 - affinity_weight) * (block @ _neighbors)
+            + affinity_weight * (affinity[start:stop] @ _features_t)
+        ).toarray()
+        # Movies the user already rated or watched are never recommended.
+        seen_rows, seen_columns = block.nonzero()
+        scores[seen_rows, seen_columns] = 0.0
+        if keep <= 0:
+            results.extend((user_id, [], []) for user_id in user_ids[start:stop])
+            continue
+        candidates = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        best = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-best, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        for offset, (row_candidates, row_scores) in enumerate(zip(candidates, best)):
+            positive = row_scores > 0
+            results.append((user_ids[start + offset], _movie_ids[row_candidates[positive]].tolist(),
+                            row_scores[positive].tolist()))
+    return results
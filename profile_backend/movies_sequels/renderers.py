@@ -0,0 +1,94 @@
+"""
+JSON renderer backed by orjson, producing the same bytes as DRF's `JSONRenderer`.
+
+`FastJSONRenderer` encodes with orjson when it is installed and falls back to
+DRF's pure-Python renderer otherwise. The output matches DRF's compact,
+non-ASCII JSON byte for byte:
+
+- datetimes, dates and times are passed to DRF's `JSONEncoder`, which formats
+  them differently from orjson;
+- U+2028 and U+2029 are escaped afterwards, as DRF does;
+- orjson writes very large and very small floats differently from Python
+  (`1e16` against `1e+16`, `0.00001` against `1e-05`), so data holding such a
+  float, or a NaN or infinity, is rendered by DRF instead.
+
+Finding those floats means walking the data before encoding it. Lists built
+by `fast_serializers.ValuesSerializer` are `CheckedFloats`, whose floats were
+checked as they were converted, so the walk skips them and the catalog lists
+cost no more than the encoding itself.
+
+Anything orjson refuses, such as integers wider than 64 bits or non-string
+keys, and indented or non-strict output are rendered by DRF as well.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def formats_differently(value):
+    """
+    Return whether orjson writes the float `value` unlike Python's `json`, or
+    refuses it where DRF's strict encoder raises: exponent notation, fixed-point
+    below 1e-4, NaN and infinities.
+    """
+    return value != 0 and not 1e-4 <= abs(value) < 1e16
+
+
+class CheckedFloats(list):
+    """
+    A list of serialized data whose floats were checked with `formats_differently`
+    while it was built; `mismatch` records whether one of them failed.
+    """
+    mismatch = False
+
+
+def needs_python_render(data):
+    """
+    Return whether the dict or list `data` holds a float orjson would write unlike DRF.
+
+    The exact type checks come first, as this runs over every value.
+    """
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, CheckedFloats):
+            if item.mismatch:
+                return True
+            continue
+        for value in (item.values() if isinstance(item, dict) else item):
+            kind = type(value)
+            if kind is float:
+                if formats_differently(value):
+                    return True
+            elif kind is str or kind is int or value is None or kind is bool:
+                continue
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+            elif isinstance(value, float) and formats_differently(value):
+                return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    `JSONRenderer` encoding with orjson, with DRF's renderer as the fallback.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON, returning a bytestring.
+        """
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if needs_python_render([data]):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,187 @@
+"""
+Retention of the watch and search history tables.
+
+`HISTORY_RETENTION` sets a policy per table. A policy has two optional rules:
+
+- `days` deletes rows whose latest event is older than this many days;
+- `per_user` keeps only the most recent rows of each user.
+
+Deletes run in chunks of the next `chunk_size` matching primary keys, each in
+its own short transaction, so SQLite holds its write lock only briefly and the
+history buffer's flusher can write between chunks. The rows are deleted with
+plain DELETE statements, without loading them or sending `post_delete`.
+
+Skipping the signal is safe because the only `post_delete` receiver of the
+history tables, `signals.user_activity_changed`, drops the recommendations of
+the row's user. Recommendations are seeded from the rollups alone, and the
+users whose rollup rows were pruned are announced once through
+`user_activity_recorded` instead, which drops the same recommendations.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import SearchHistory, SearchHistoryRollup, WatchHistory, WatchHistoryRollup
+from .signals import user_activity_recorded
+
+# The column holding the time of a row's latest event, per table.
+TIME_FIELDS = {
+    WatchHistory: 'watched_at',
+    SearchHistory: 'watched_at',
+    WatchHistoryRollup: 'last_seen',
+    SearchHistoryRollup: 'last_seen',
+}
+# Tables by the model name used in `HISTORY_RETENTION`.
+MODELS = {model.__name__: model for model in TIME_FIELDS}
+
+
+def _delete_rows(model, using, pks):
+    """
+    Delete rows of `model` by primary key with plain DELETE statements.
+
+    `QuerySet.delete()` would load every row to send `post_delete`. The keys
+    are split into batches the backend accepts as query parameters.
+    """
+    database = connections[using]
+    table = database.ops.quote_name(model._meta.db_table)
+    column = database.ops.quote_name(model._meta.pk.column)
+    batch_size = database.features.max_query_params or len(pks)
+    deleted = 0
+    with database.cursor() as cursor:
+        for start in range(0, len(pks), batch_size):
+            batch = pks[start:start + batch_size]
+            cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(batch))})', batch)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def delete_in_chunks(queryset, chunk_size=5000, dry_run=False):
+    """
+    Delete the rows of `queryset`, `chunk_size` primary keys at a time.
+
+    Each chunk is the next `chunk_size` matching keys in order, so no DELETE is
+    issued for a gap in the keys. The rows are read from and deleted on the
+    primary database, never a replica.
+
+    Args:
+        queryset (QuerySet): The rows of a history table to delete.
+        chunk_size (int): The number of rows deleted per transaction.
+        dry_run (bool): Count the rows instead of deleting them.
+
+    Returns:
+        tuple: The number of rows deleted, or that would be, and the set of
+            users they belonged to (empty on a dry run).
+    """
+    if dry_run:
+        return queryset.count(), set()
+    model = queryset.model
+    using = router.db_for_write(model)
+    queryset = queryset.using(using).order_by('pk')
+    deleted, users, last = 0, set(), None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        with transaction.atomic(using=using):
+            rows = list(chunk.values_list('pk', 'logged_id')[:chunk_size])
+            if not rows:
+                break
+            deleted += _delete_rows(model, using, [pk for pk, _ in rows])
+        users.update(logged_id for _, logged_id in rows)
+        last = rows[-1][0]
+        if len(rows) < chunk_size:
+            break
+    return deleted, users
+
+
+def prune_older_than(model, days, chunk_size=5000, dry_run=False):
+    """
+    Delete the rows of `model` whose latest event is more than `days` days old.
+
+    Returns:
+        tuple: The number of rows deleted and the set of users they belonged to.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    # pylint: disable=no-member
+    queryset = model.objects.filter(**{f'{TIME_FIELDS[model]}__lt': cutoff})
+    return delete_in_chunks(queryset, chunk_size, dry_run)
+
+
+def prune_per_user(model, keep, chunk_size=5000, dry_run=False):
+    """
+    Delete all but the `keep` most recent rows of each user of `model`.
+
+    Returns:
+        tuple: The number of rows deleted and the set of users they belonged to.
+    """
+    time_field = TIME_FIELDS[model]
+    # pylint: disable=no-member
+    users = (
+        model.objects.values('logged_id').annotate(rows=Count('id'))
+        .filter(rows__gt=keep).values_list('logged_id', flat=True)
+    )
+    deleted, pruned_users = 0, set()
+    for user_id in list(users):
+        rows = model.objects.filter(logged_id=user_id)
+        # The oldest row kept; everything ordered after it goes.
+        boundary = rows.order_by(f'-{time_field}', '-id').values(time_field, 'id')[keep - 1]
+        older = Q(**{f'{time_field}__lt': boundary[time_field]}) | Q(
+            **{time_field: boundary[time_field], 'id__lt': boundary['id']})
+        pruned, _ = delete_in_chunks(rows.filter(older), chunk_size, dry_run)
+        deleted += pruned
+        pruned_users.add(user_id)
+    return deleted, pruned_users
+
+
+def apply_retention(policies=None, chunk_size=5000, dry_run=False):
+    """
+    Apply the retention policies to every history table that has one.
+
+    Args:
+        policies (dict): Maps a model name to its policy; defaults to
+            `HISTORY_RETENTION`.
+        chunk_size (int): The number of rows deleted per transaction.
+        dry_run (bool): Count the rows that would be deleted without deleting them.
+
+    Returns:
+        dict: Maps each model name to the number of rows deleted.
+    """
+    if policies is None:
+        policies = settings.HISTORY_RETENTION
+    reclaimed = {}
+    for name, policy in policies.items():
+        model = MODELS[name]
+        deleted, users = 0, set()
+        if policy.get('days') is not None:
+            pruned, pruned_users = prune_older_than(model, policy['days'], chunk_size, dry_run)
+            deleted += pruned
+            users |= pruned_users
+        if policy.get('per_user') is not None:
+            pruned, pruned_users = prune_per_user(model, policy['per_user'], chunk_size, dry_run)
+            deleted += pruned
+            users |= pruned_users
+        # Rollups seed recommendations; the raw logs do not.
+        if users and not dry_run and model in (WatchHistoryRollup, SearchHistoryRollup):
+            user_activity_recorded.send(sender=model, logged_ids=users)
+        reclaimed[name] = deleted
+    return reclaimed
+
+
+def compact(models):
+    """
+    Return freed pages to the filesystem and refresh planner statistics.
+
+    SQLite rebuilds the whole database file with VACUUM, then runs ANALYZE.
+    PostgreSQL runs VACUUM ANALYZE on the pruned tables only.
+
+    Args:
+        models (list): The pruned models.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for model in models:
+                cursor.execute(f'VACUUM ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+            cursor.execute('ANALYZE')
@@ -0,0 +1,226 @@
+"""
+Full-text search over movies.
+
+On SQLite the catalog is mirrored into an FTS5 virtual table (`FTS_TABLE`), with
+one row per movie keyed by the movie id. On PostgreSQL a GIN index over the
+`PG_DOCUMENT` expression is queried directly. Both are created by migration
+`0014_movie_search_index`. The FTS5 table is kept in step by the receivers in
+`signals` and by the ingestion writer, which call `index_movies` and
+`unindex_movies`. Searches run on the database the router picks for reading
+movies, which is the read replica when one is configured.
+
+Results are ranked by relevance (bm25 / ts_rank). If neither index is available,
+for example SQLite built without FTS5 or another backend, the functions fall back
+to `icontains` scans.
+"""
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from .models import Movie
+
+FTS_TABLE = 'movies_sequels_movie_fts'
+# bm25 column weights for title, director and description.
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(director, '') "
+    "|| ' ' || coalesce(description, ''))"
+)
+
+_TOKEN_RE = re.compile(r'\w+')
+_fts_tables = {}
+
+
+def fts_available(db=None):
+    """
+    Return whether a full-text index can be queried on a database connection.
+
+    Args:
+        db (BaseDatabaseWrapper): The connection; defaults to the default database.
+    """
+    db = db or connection
+    if db.vendor == 'postgresql':
+        return True
+    if db.vendor != 'sqlite':
+        return False
+    if db.alias not in _fts_tables:
+        _fts_tables[db.alias] = FTS_TABLE in db.introspection.table_names()
+    return _fts_tables[db.alias]
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query.lower())
+
+
+def _match_expression(tokens, prefix, columns):
+    """
+    Build an FTS5 MATCH expression from plain tokens. Every token is quoted, so
+    user input can never be parsed as FTS5 query syntax.
+    """
+    terms = [f'"{token}"' for token in tokens]
+    if prefix:
+        terms[-1] += '*'
+    expression = ' '.join(terms)
+    if columns:
+        expression = f'{{{" ".join(columns)}}} : ({expression})'
+    return expression
+
+
+def _tsquery(tokens, prefix):
+    terms = list(tokens)
+    if prefix:
+        terms[-1] += ':*'
+    return ' & '.join(terms)
+
+
+def ranked_movie_hits(query, limit=None, prefix=False, columns=None, after=None):
+    """
+    Return the movies matching every word of `query`, most relevant first.
+
+    Every hit carries a score where lower is more relevant (bm25 on SQLite,
+    negated ts_rank on PostgreSQL). Hits are ordered by `(score, id)`, so the
+    last hit of one page is the keyset cursor for the next.
+
+    Args:
+        query (str): The user's search text.
+        limit (int): The maximum number of hits, or None for all matches.
+        prefix (bool): Match the last word as a prefix, for type-ahead.
+        columns (tuple): Restrict matching to these of title, director and description.
+        after (list): The `[score, id]` of the last hit already served.
+
+    Returns:
+        list: `(movie_id, score)` pairs, or None when no full-text index is available.
+    """
+    db = connections[router.db_for_read(Movie)]
+    if not fts_available(db):
+        return None
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    if db.vendor == 'postgresql':
+        # The document expression must match the GIN index for it to be used.
+        document = PG_DOCUMENT
+        if columns:
+            document = "to_tsvector('english', {})".format(
+                " || ' ' || ".join(f"coalesce({column}, '')" for column in columns))
+        score = f"(-ts_rank({document}, to_tsquery('english', %s)))::float8"
+        score_params = [_tsquery(tokens, prefix)]
+        sql = (f"SELECT id, {score} FROM {Movie._meta.db_table} "
+               f"WHERE {document} @@ to_tsquery('english', %s)")
+        params = score_params + [_tsquery(tokens, prefix)]
+        row_id = 'id'
+    else:
+        score = f"bm25({FTS_TABLE}, %s, %s, %s)"
+        score_params = list(FTS_WEIGHTS)
+        sql = f"SELECT rowid, {score} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        params = score_params + [_match_expression(tokens, prefix, columns)]
+        row_id = 'rowid'
+        if limit is None:
+            limit = -1
+    if after:
+        sql += f" AND ({score} > %s OR ({score} = %s AND {row_id} > %s))"
+        params += score_params + [after[0]] + score_params + [after[0], after[1]]
+    sql += f" ORDER BY 2, {row_id} LIMIT %s"
+    params.append(limit)
+    with db.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def ranked_movie_ids(query, limit=None, prefix=False, columns=None):
+    """
+    Return the ids of `ranked_movie_hits`, or None when no full-text index is available.
+    """
+    hits = ranked_movie_hits(query, limit=limit, prefix=prefix, columns=columns)
+    return None if hits is None else [movie_id for movie_id, _ in hits]
+
+
+def search_movies(query, fields=('title', 'description', 'image_url'), limit=None, after=None):
+    """
+    Return one page of movies whose title, director or description match `query`.
+
+    Args:
+        query (str): The user's search text.
+        fields (tuple): The movie fields to return.
+        limit (int): The page size, or None for all matches.
+        after (list): The cursor returned with the previous page.
+
+    Returns:
+        tuple: Dicts of `fields`, most relevant first, and the cursor of the
+            next page, or None on the last page.
+    """
+    hits = ranked_movie_hits(query, limit=None if limit is None else limit + 1, after=after)
+    # pylint: disable=no-member
+    if hits is None:
+        # Without an index, matches are served in id order with a constant score.
+        movies = Movie.objects.filter(
+            Q(title__icontains=query) | Q(director__icontains=query) | Q(description__icontains=query))
+        if after:
+            movies = movies.filter(id__gt=after[1])
+        hits = [(movie_id, 0) for movie_id in movies.order_by('id').values_list('id', flat=True)[
+            :None if limit is None else limit + 1]]
+    next_key = None
+    if limit is not None and len(hits) > limit:
+        hits = hits[:limit]
+        movie_id, score = hits[-1]
+        next_key = [score, movie_id]
+    movie_ids = [movie_id for movie_id, _ in hits]
+    rows = {row['id']: row for row in Movie.objects.filter(id__in=movie_ids).values('id', *fields)}
+    results = [
+        {field: rows[movie_id][field] for field in fields}
+        for movie_id in movie_ids if movie_id in rows
+    ]
+    return results, next_key
+
+
+def suggest_titles(query, limit=8):
+    """
+    Return titles of movies whose title or director starts with the words typed so far.
+
+    Args:
+        query (str): The partial search text.
+        limit (int): The maximum number of titles.
+
+    Returns:
+        list: Movie titles, most relevant first.
+    """
+    movie_ids = ranked_movie_ids(query, limit=limit, prefix=True, columns=('title', 'director'))
+    # pylint: disable=no-member
+    if movie_ids is None:
+        return list(
+            Movie.objects.filter(Q(title__icontains=query) | Q(director__icontains=query))
+            .values_list('title', flat=True)[:limit]
+        )
+    titles = dict(Movie.objects.filter(id__in=movie_ids).values_list('id', 'title'))
+    return [titles[movie_id] for movie_id in movie_ids if movie_id in titles]
+
+
+def index_movies(movie_ids):
+    """
+    Refresh the FTS5 rows of the given movies from the movie table.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids or connection.vendor != 'sqlite' or not fts_available():
+        return
+    placeholders = ', '.join(['%s'] * len(movie_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', movie_ids)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, director, description) "
+            f"SELECT id, title, coalesce(director, ''), coalesce(description, '') "
+            f"FROM {Movie._meta.db_table} WHERE id IN ({placeholders})",
+            movie_ids,
+        )
+
+
+def unindex_movies(movie_ids):
+    """
+    Remove the FTS5 rows of the given movies.
+    """
+    movie_ids = list(movie_ids)
+    if not movie_ids or connection.vendor != 'sqlite' or not fts_available():
+        return
+    placeholders = ', '.join(['%s'] * len(movie_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', movie_ids)
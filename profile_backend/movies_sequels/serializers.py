@@ -3,40 +3,59 @@ This module contains serializers for the Movie, Sequel, and RatingReview models,
 as well as custom serializers for handling search suggestions and search results.
 
 The serializers included are:
+- `SparseFieldsMixin`: Lets a serializer keep only the fields it is given.
 - `SequelSerializer`: Serializes the Sequel model.
 - `MovieSerializer`: Serializes the Movie model and includes related sequels.
+- `UserRatedMovieSerializer`: Adds the rating count and mean rating to `MovieSerializer`.
 - `SearchSuggestionSerializer`: Serializes search suggestions, returning a list of
     suggestion strings.
 - `SearchResultSerializer`: Serializes search results, returning a list of
     MovieSerializer instances.
 - `RatingReviewSerializer`: Serializes the RatingReview model, including rating and
-    review data for a movie.
+    review data for a movie; ratings must be from 1 to 10.
 
 These serializers are designed to be used with Django REST Framework to facilitate
 the conversion of model instances and other complex data types to native Python datatypes
 that can then be easily rendered into JSON, XML, or other content types.
 """
 from rest_framework import serializers
-from .models import Movie, Sequel, RatingReview, WatchHistory, SearchHistory
+from .models import (
+    SYNC_FIELDS, Movie, Sequel, RatingReview, WatchHistory, SearchHistory,
+    WatchHistoryRollup, SearchHistoryRollup,
+)
+from .ratings import RATING_VALUES
 from .messages import ERROR_MESSAGES
 
-class SequelSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Serializer mixin accepting a `fields` argument, the names of the fields to
+    keep, for the `?fields=` and `?expand=` parameters of the catalog endpoints.
+    """
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class SequelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Sequel model.
-    Serializes all fields of the Sequel model.
+    Serializes all fields of the Sequel model except ingestion bookkeeping and
+    the genre links, which the `genre` string already carries.
     """
     class Meta:
         """
         Meta data about serializer
         """
         model = Sequel
-        fields = '__all__'
+        exclude = (*SYNC_FIELDS, 'genres')
 
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Movie model.
     Includes related sequels using the SequelSerializer.
-    Serializes all fields of the Movie model.
+    Serializes all fields of the Movie model except ingestion bookkeeping and
+    the genre links, which the `genre` string already carries.
     """
     sequels = SequelSerializer(many=True, read_only=True)
 
@@ -45,7 +64,15 @@ class MovieSerializer(serializers.ModelSerializer):
         Meta data about class movie serializer
         """
         model = Movie
-        fields = '__all__'
+        exclude = (*SYNC_FIELDS, 'genres')
+
+class UserRatedMovieSerializer(MovieSerializer):
+    """
+    Movie serializer with the rating count and mean rating read from the
+    movie's rating aggregates; `user_popularity` is the Bayesian score.
+    """
+    rating_count = serializers.IntegerField(source='rating_stats.rating_count', read_only=True)
+    average_rating = serializers.FloatField(source='rating_stats.average', read_only=True)
 
 class SearchSuggestionSerializer(serializers.Serializer):
     """
@@ -69,9 +96,10 @@ class SearchSuggestionSerializer(serializers.Serializer):
 class SearchResultSerializer(serializers.Serializer):
     """
     Serializer for search results.
-    Returns a list of MovieSerializer instances.
+    Returns a list of MovieSerializer instances and the URL of the next page.
     """
     results = MovieSerializer(many=True)
+    next = serializers.CharField(allow_null=True)
 
     def create(self, validated_data):
         """
@@ -98,6 +126,8 @@ class RatingReviewSerializer(serializers.ModelSerializer):
         fields = ['movie', 'logged_id', 'logged_name', 'rating',
                 'review', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+        # The rating aggregates count ratings from 1 to 10 in unsigned columns.
+        extra_kwargs = {'rating': {'min_value': RATING_VALUES[0], 'max_value': RATING_VALUES[-1]}}
 
 class SearchHistorySerializer(serializers.ModelSerializer):
     """_summary_
@@ -116,3 +146,31 @@ class WatchHistorySerializer(serializers.ModelSerializer):
         model = WatchHistory
         fields = ['logged_id', 'logged_name', 'movie', 'watched_at']
 
+class WatchHistoryRollupSerializer(serializers.ModelSerializer):
+    """
+    Serializer for watch history rollups. `watched_at` is the latest watch,
+    as in the raw watch history representation.
+    """
+    watched_at = serializers.DateTimeField(source='last_seen', read_only=True)
+
+    class Meta:
+        """
+        Meta data about the class
+        """
+        model = WatchHistoryRollup
+        fields = ['logged_id', 'logged_name', 'movie', 'watched_at', 'first_seen', 'count']
+
+class SearchHistoryRollupSerializer(serializers.ModelSerializer):
+    """
+    Serializer for search history rollups. `watched_at` is the latest search,
+    as in the raw search history representation.
+    """
+    watched_at = serializers.DateTimeField(source='last_seen', read_only=True)
+
+    class Meta:
+        """
+        Meta data about the class
+        """
+        model = SearchHistoryRollup
+        fields = ['id', 'logged_id', 'logged_name', 'movie', 'movie_name', 'watched_at', 'first_seen', 'count']
+
@@ -0,0 +1,149 @@
+"""
+Signals and receivers for the movies_sequels app.
+
+- `catalog_updated`: Sent when a bulk catalog change finishes, such as a
+    `populate_models` run, which writes with `bulk_create` and so bypasses
+    the model signals.
+- `user_activity_recorded`: Sent with a `logged_ids` set after history events
+    are recorded or pruned in bulk, which also bypasses them.
+
+The receivers below keep derived data (the catalog version, which also keys
+the home feed cache, the full-text search index, the suggestion index, the
+recommendation cache and the rating aggregates) in step with catalog writes
+and user activity. They are connected in `MoviesSequelsConfig.ready`.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .catalog_version import bump_catalog_version
+from .models import (
+    Movie, RatingReview, SearchHistory, SearchHistoryRollup, Sequel, UserRecommendation,
+    WatchHistory, WatchHistoryRollup,
+)
+from .ratings import change_rating, refresh_rating_stats
+from .recommendation_cache import invalidate_recommendations, invalidate_user_recommendations
+from .search import index_movies, unindex_movies
+from .suggestions import suggestion_index
+
+catalog_updated = Signal()
+user_activity_recorded = Signal()
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Sequel)
+@receiver(post_delete, sender=Sequel)
+@receiver(catalog_updated)
+def catalog_changed(sender, **kwargs):
+    """
+    Move to a new catalog version whenever the catalog changes, which also
+    retires the cached home feeds.
+    """
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, **kwargs):
+    """
+    Refresh the search and suggestion index entries of a saved movie.
+    """
+    index_movies([instance.pk])
+    suggestion_index.update(
+        'movie', instance.pk, instance.title, instance.director, instance.tmdb_popularity)
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    """
+    Remove a deleted movie from the search and suggestion indexes.
+    """
+    unindex_movies([instance.pk])
+    suggestion_index.update('movie', instance.pk)
+
+
+@receiver(post_save, sender=Sequel)
+def sequel_saved(sender, instance, **kwargs):
+    """
+    Refresh the suggestion index entries of a saved sequel.
+    """
+    suggestion_index.update('sequel', instance.pk, instance.title, popularity=instance.tmdb_popularity)
+
+
+@receiver(post_delete, sender=Sequel)
+def sequel_deleted(sender, instance, **kwargs):
+    """
+    Remove a deleted sequel from the suggestion index.
+    """
+    suggestion_index.update('sequel', instance.pk)
+
+
+@receiver(catalog_updated)
+def catalog_reloaded(sender, **kwargs):
+    """
+    Reload the suggestion index after a bulk catalog change.
+    """
+    suggestion_index.invalidate()
+
+
+@receiver(catalog_updated)
+def catalog_recommendations_stale(sender, **kwargs):
+    """
+    Drop every cached recommendation after a bulk catalog change.
+    """
+    invalidate_recommendations()
+
+
+@receiver(post_save, sender=RatingReview)
+@receiver(post_delete, sender=RatingReview)
+@receiver(post_save, sender=WatchHistory)
+@receiver(post_delete, sender=WatchHistory)
+@receiver(post_save, sender=SearchHistory)
+@receiver(post_delete, sender=SearchHistory)
+@receiver(post_delete, sender=WatchHistoryRollup)
+@receiver(post_delete, sender=SearchHistoryRollup)
+def user_activity_changed(sender, instance, **kwargs):
+    """
+    Drop the cached and precomputed recommendations of the user whose activity changed.
+    """
+    invalidate_user_recommendations(instance.logged_id)
+    UserRecommendation.objects.filter(logged_id=instance.logged_id).delete()
+
+
+@receiver(user_activity_recorded)
+def bulk_user_activity(sender, logged_ids, **kwargs):
+    """
+    Drop the cached and precomputed recommendations of every user in a bulk history write.
+    """
+    for logged_id in logged_ids:
+        invalidate_user_recommendations(logged_id)
+    UserRecommendation.objects.filter(logged_id__in=logged_ids).delete()
+
+
+@receiver(post_save, sender=RatingReview)
+def rating_saved(sender, instance, created, **kwargs):
+    """
+    Add a new review to its movie's rating aggregates, or move a changed one.
+    """
+    if created:
+        change_rating(instance.movie_id, new_rating=instance.rating)
+    else:
+        old_movie_id, old_rating = getattr(instance, 'loaded_rating', (None, None))
+        if old_movie_id == instance.movie_id and old_rating is not None:
+            if old_rating != instance.rating:
+                change_rating(instance.movie_id, old_rating, instance.rating)
+        else:
+            # The stored values are unknown or the review moved to another movie.
+            for movie_id in {old_movie_id, instance.movie_id} - {None}:
+                refresh_rating_stats(movie_id)
+    instance.loaded_rating = (instance.movie_id, instance.rating)
+
+
+@receiver(post_delete, sender=RatingReview)
+def rating_deleted(sender, instance, **kwargs):
+    """
+    Remove a deleted review from its movie's rating aggregates.
+    """
+    movie_id, rating = getattr(instance, 'loaded_rating', (None, None))
+    change_rating(
+        instance.movie_id if movie_id is None else movie_id,
+        old_rating=instance.rating if rating is None else rating)
@@ -0,0 +1,167 @@
+"""
+Offline item-item similarity for recommendations.
+
+`build_neighbors` scores every pair of movies by blending two cosine
+similarities computed with SciPy sparse matrices:
+
+- content, over one-hot genre and director features;
+- collaborative, over the user-movie interaction matrix built from ratings,
+  watches and searches, so movies engaged with by the same users score high.
+
+Only the `top_n` best neighbours of each movie are stored, in `MovieNeighbor`,
+so `RecommendationEngine` answers a request with one indexed lookup. Scores are
+computed one block of movies at a time, so memory stays bounded by
+`block_size` times the catalog size.
+"""
+import numpy as np
+from scipy import sparse
+
+from django.db import transaction
+
+from .models import Movie, MovieNeighbor, RatingReview, SearchHistoryRollup, WatchHistoryRollup
+from .recommendation_cache import invalidate_recommendations
+
+# Share of the content similarity in the blended score.
+CONTENT_WEIGHT = 0.3
+# Interaction strength per signal. Ratings count rating / 10.
+WATCH_WEIGHT = 0.5
+SEARCH_WEIGHT = 0.25
+
+
+def normalize_rows(matrix):
+    """
+    Scale every row of a sparse matrix to unit L2 norm; empty rows stay empty.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def content_matrix(movie_index, directors, genre_links):
+    """
+    Build the row-normalized movie x feature one-hot matrix.
+
+    Args:
+        movie_index (dict): Maps a movie id to its matrix row.
+        directors (iterable): `(movie_id, director)` tuples.
+        genre_links (iterable): `(movie_id, genre_id)` tuples.
+
+    Returns:
+        scipy.sparse.csr_matrix: The feature matrix.
+    """
+    features = {}
+    rows, cols = [], []
+    keyed = [(movie_id, ('director', director)) for movie_id, director in directors if director]
+    keyed += [(movie_id, ('genre', genre_id)) for movie_id, genre_id in genre_links]
+    for movie_id, key in keyed:
+        if movie_id in movie_index:
+            rows.append(movie_index[movie_id])
+            cols.append(features.setdefault(key, len(features)))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(movie_index), max(len(features), 1)))
+    return normalize_rows(matrix).tocsr()
+
+
+def interaction_matrix(movie_index, interactions):
+    """
+    Build the row-normalized movie x user interaction matrix.
+
+    Args:
+        movie_index (dict): Maps a movie id to its matrix row.
+        interactions (iterable): `(user_id, movie_id, weight)` tuples; repeated
+            pairs are summed.
+
+    Returns:
+        scipy.sparse.csr_matrix: The interaction matrix.
+    """
+    users = {}
+    rows, cols, weights = [], [], []
+    for user_id, movie_id, weight in interactions:
+        if movie_id in movie_index:
+            rows.append(movie_index[movie_id])
+            cols.append(users.setdefault(user_id, len(users)))
+            weights.append(weight)
+    matrix = sparse.csr_matrix(
+        (np.asarray(weights, dtype=float), (rows, cols)),
+        shape=(len(movie_index), max(len(users), 1)))
+    matrix.sum_duplicates()
+    return normalize_rows(matrix).tocsr()
+
+
+def top_neighbors(content, interactions, top_n=20, block_size=256, content_weight=CONTENT_WEIGHT):
+    """
+    Yield the best-scoring neighbours of every movie row.
+
+    Yields:
+        tuple: `(row, neighbor_rows, scores)`, best first, positive scores only.
+    """
+    count = content.shape[0]
+    keep = min(top_n, count - 1)
+    if keep <= 0:
+        return
+    content_t = content.T.tocsc()
+    interactions_t = interactions.T.tocsc()
+    for start in range(0, count, block_size):
+        stop = min(start + block_size, count)
+        scores = (
+            content_weight * (content[start:stop] @ content_t)
+            + (1 - content_weight) * (interactions[start:stop] @ interactions_t)
+        ).toarray()
+        scores[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        candidates = np.argpartition(-scores, keep - 1, axis=1)[:, :keep]
+        best = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-best, axis=1, kind='stable')
+        candidates = np.take_along_axis(candidates, order, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        for offset, (row_candidates, row_scores) in enumerate(zip(candidates, best)):
+            positive = row_scores > 0
+            yield start + offset, row_candidates[positive], row_scores[positive]
+
+
+def load_interactions():
+    """
+    Yield `(user_id, movie_id, weight)` for every rating and every movie a user watched or searched.
+    """
+    # pylint: disable=no-member
+    for user_id, movie_id, rating in RatingReview.objects.values_list('logged_id', 'movie_id', 'rating'):
+        yield user_id, movie_id, rating / 10
+    for user_id, movie_id in WatchHistoryRollup.objects.values_list('logged_id', 'movie_id').iterator():
+        yield user_id, movie_id, WATCH_WEIGHT
+    for user_id, movie_id in SearchHistoryRollup.objects.values_list('logged_id', 'movie_id').iterator():
+        yield user_id, movie_id, SEARCH_WEIGHT
+
+
+def build_neighbors(top_n=20, block_size=256, content_weight=CONTENT_WEIGHT, batch_size=5000):
+    """
+    Recompute the neighbour table from the current catalog and user activity.
+
+    The old table is replaced in one transaction, so readers see either the
+    previous model or the new one, and cached recommendations are dropped.
+
+    Args:
+        top_n (int): How many neighbours to keep per movie.
+        block_size (int): How many movies to score at a time.
+        content_weight (float): Share of the content similarity in the score.
+        batch_size (int): The bulk insert batch size.
+
+    Returns:
+        int: The number of neighbour rows written.
+    """
+    # pylint: disable=no-member
+    directors = list(Movie.objects.order_by('id').values_list('id', 'director'))
+    movie_ids = [movie_id for movie_id, _ in directors]
+    movie_index = {movie_id: row for row, movie_id in enumerate(movie_ids)}
+    content = content_matrix(
+        movie_index, directors, Movie.genres.through.objects.values_list('movie_id', 'genre_id').iterator())
+    interactions = interaction_matrix(movie_index, load_interactions())
+
+    neighbors = [
+        MovieNeighbor(movie_id=movie_ids[row], neighbor_id=movie_ids[neighbor], rank=rank, score=float(score))
+        for row, neighbor_rows, scores in top_neighbors(content, interactions, top_n, block_size, content_weight)
+        for rank, (neighbor, score) in enumerate(zip(neighbor_rows, scores))
+    ]
+    with transaction.atomic():
+        MovieNeighbor.objects.all().delete()
+        MovieNeighbor.objects.bulk_create(neighbors, batch_size=batch_size)
+    invalidate_recommendations()
+    return len(neighbors)
@@ -0,0 +1,32 @@
+"""
+Opt-in SQLite performance profile for single-node deployments.
+
+With `SQLITE_TUNING_ENABLED`, `apply_sqlite_pragmas` runs on every new SQLite
+connection and sets the `SQLITE_PRAGMAS` from settings:
+
+- `journal_mode=WAL` lets readers proceed while a writer commits. The mode is
+    stored in the database file, so it stays on after the profile is disabled.
+- `synchronous=NORMAL` syncs at checkpoints rather than on every commit. A
+    power loss can lose the last transactions but never corrupts the database.
+- `mmap_size`, `cache_size` and `temp_store=MEMORY` keep hot pages and
+    temporary tables in memory.
+- `busy_timeout` makes a blocked writer wait for the lock instead of failing
+    with "database is locked". It is set first, so the other pragmas wait too.
+
+The receiver is connected in `MoviesSequelsConfig.ready`.
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Set `SQLITE_PRAGMAS` on a new SQLite connection when the profile is enabled.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING_ENABLED:
+        return
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    with connection.cursor() as cursor:
+        if 'busy_timeout' in pragmas:
+            cursor.execute(f'PRAGMA busy_timeout = {int(pragmas.pop("busy_timeout"))}')
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,172 @@
+"""
+In-process index answering type-ahead suggestions without a database query.
+
+`SuggestionIndex` keeps a sorted array of lowercase keys built from movie
+titles, sequel titles and movie directors. A key is stored for the whole string
+and for every word after the first, so "kni" finds "The Dark Knight". A query
+is answered with two `bisect` calls to find the block of keys starting with
+the typed prefix, and the most popular distinct titles in that block are
+returned. Prefixes of one or two characters cover large blocks, so their
+results are memoised until a change touches them.
+
+The index loads lazily on first use. The receivers in `signals` update it
+incrementally when a movie or sequel is saved or deleted, and mark it stale when
+the catalog is bulk-updated. Every process holds its own copy, so it is also
+reloaded after `SUGGESTION_INDEX_MAX_AGE` seconds to pick up writes made
+elsewhere.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from operator import itemgetter
+
+from django.conf import settings
+
+from .models import Movie, Sequel
+
+# Word-start keys are not created for these words; the full-string key still is.
+STOP_WORDS = frozenset({'a', 'an', 'and', 'in', 'of', 'on', 'the', 'to'})
+MEMO_PREFIX_LENGTH = 2
+_END = '\U0010ffff'
+
+
+def normalize(text):
+    """
+    Lowercase `text` and collapse its whitespace.
+    """
+    return ' '.join((text or '').lower().split())
+
+
+def keys_for(text):
+    """
+    Return the index keys for `text`: the whole string and every word-start suffix.
+    """
+    words = normalize(text).split(' ')
+    keys = {' '.join(words)}
+    for position in range(1, len(words)):
+        if words[position] not in STOP_WORDS:
+            keys.add(' '.join(words[position:]))
+    keys.discard('')
+    return keys
+
+
+class SuggestionIndex:
+    """
+    Sorted-array prefix index over catalog titles and directors, ranked by
+    `tmdb_popularity`.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._entries_by_owner = {}
+        self._memo = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and (
+            time.monotonic() - self._loaded_at < settings.SUGGESTION_INDEX_MAX_AGE)
+
+    def load(self):
+        """
+        Rebuild the index from the database.
+        """
+        entries_by_owner = {}
+        # pylint: disable=no-member
+        for movie_id, title, director, popularity in Movie.objects.values_list(
+                'id', 'title', 'director', 'tmdb_popularity'):
+            entries_by_owner[('movie', movie_id)] = self._entries_for(title, director, popularity)
+        for sequel_id, title, popularity in Sequel.objects.values_list('id', 'title', 'tmdb_popularity'):
+            entries_by_owner[('sequel', sequel_id)] = self._entries_for(title, None, popularity)
+
+        entries = sorted(entry for owned in entries_by_owner.values() for entry in owned)
+        with self._lock:
+            self._entries = entries
+            self._entries_by_owner = entries_by_owner
+            self._memo = {}
+            self._loaded_at = time.monotonic()
+
+    @staticmethod
+    def _entries_for(title, director, popularity):
+        """
+        Build the `(key, -popularity, title)` entries of one movie or sequel.
+        Director keys resolve to the title, as director matches always have.
+        """
+        rank = -(popularity or 0)
+        keys = keys_for(title) | (keys_for(director) if director else set())
+        return [(key, rank, title) for key in keys]
+
+    def suggest(self, query, limit=8):
+        """
+        Return up to `limit` distinct titles matching `query`, most popular first.
+
+        Args:
+            query (str): The text typed so far.
+            limit (int): The maximum number of titles.
+
+        Returns:
+            list: Matching titles.
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if not self._is_fresh():
+            self.load()
+        with self._lock:
+            memoise = len(prefix) <= MEMO_PREFIX_LENGTH
+            if memoise and (prefix, limit) in self._memo:
+                return self._memo[(prefix, limit)]
+            start = bisect_left(self._entries, (prefix,))
+            stop = bisect_left(self._entries, (prefix + _END,), start)
+            titles = []
+            for _, _, title in sorted(self._entries[start:stop], key=itemgetter(1)):
+                if title not in titles:
+                    titles.append(title)
+                    if len(titles) == limit:
+                        break
+            if memoise:
+                self._memo[(prefix, limit)] = titles
+            return titles
+
+    def update(self, kind, object_id, title=None, director=None, popularity=None):
+        """
+        Replace (or, with no title, remove) the entries of one movie or sequel.
+
+        Does nothing until the index has been loaded, since the load will read
+        the current rows anyway.
+
+        Args:
+            kind (str): 'movie' or 'sequel'.
+            object_id (int): The primary key of the row.
+            title (str): The new title, or None if the row was deleted.
+            director (str): The new director of a movie.
+            popularity (float): The new TMDB popularity.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            old = self._entries_by_owner.pop((kind, object_id), [])
+            new = self._entries_for(title, director, popularity) if title is not None else []
+            for entry in old:
+                index = bisect_left(self._entries, entry)
+                if index < len(self._entries) and self._entries[index] == entry:
+                    del self._entries[index]
+            for entry in new:
+                insort(self._entries, entry)
+            if new:
+                self._entries_by_owner[(kind, object_id)] = new
+            touched = {entry[0][:length] for entry in old + new for length in range(1, MEMO_PREFIX_LENGTH + 1)}
+            self._memo = {
+                memo_key: titles for memo_key, titles in self._memo.items() if memo_key[0] not in touched
+            }
+
+    def invalidate(self):
+        """
+        Mark the index stale so the next query reloads it.
+        """
+        with self._lock:
+            self._loaded_at = None
+            self._memo = {}
+
+
+suggestion_index = SuggestionIndex()
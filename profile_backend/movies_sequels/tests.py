@@ -1 +1,906 @@
-# Create your tests here.
+"""
+Tests for the movies_sequels app.
+"""
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import requests
+
+from app_backend.db_routers import PrimaryReplicaRouter
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import search
+from .history import record_events
+from .management.commands.populate_models import (
+    BatchWriter, Checkpoint, DeadLetters, IngestionPipeline, get_genre_dict, save_genres,
+)
+from .history_buffer import WriteBehindBuffer
+from .models import (
+    CatalogVersion, Movie, Sequel, RatingReview, SearchHistory, SearchHistoryRollup, WatchHistory,
+    UserRecommendation, WatchHistoryRollup,
+)
+from .pagination import encode_cursor
+from .ratings import sync_user_popularity
+from .recommendation_cache import GENERATION_KEY, invalidate_recommendations, recommendation_cache_stats
+from .retention import apply_retention
+from .serializers import MovieSerializer
+from .batch_recommendations import precompute_recommendations
+from .similarity import build_neighbors
+from .tmdb import ApiEndpoint, DetailCache, RateLimiter, TMDBClient
+from .trending import snapshot_trending
+
+
+@override_settings(FEED_CACHE_ENABLED=False)
+class MovieListQueryBudgetTests(TestCase):
+    """
+    Query budgets for the endpoints that serialize movie lists with nested sequels.
+
+    The budgets do not depend on how many movies are listed, so an N+1 query
+    introduced in any of these code paths fails here. The catalog endpoints
+    also read the catalog version row once for their ETag.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(6):
+            movie = Movie.objects.create(
+                title=f'Movie {index}',
+                director='Director',
+                genre='Drama',
+                release_date=timezone.now().date(),
+                tmdb_popularity=float(index),
+            )
+            for part in range(3):
+                Sequel.objects.create(
+                    movie=movie,
+                    title=f'Movie {index} Part {part}',
+                    genre='Drama',
+                    release_date=timezone.now().date(),
+                )
+        RatingReview.objects.create(movie=Movie.objects.get(title='Movie 0'), logged_id=1, rating=8)
+        sync_user_popularity()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_movie_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/movies/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()[0]), ['id', 'title', 'image_url'])
+
+    def test_movie_list_expanded(self):
+        fields = [name for name in MovieSerializer().fields if name != 'sequels']
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/movies/', {'fields': ','.join(fields), 'expand': 'sequels'})
+        self.assertEqual(response.status_code, 200)
+        movies = Movie.objects.for_listing().order_by('-tmdb_popularity', '-id')
+        self.assertEqual(response.content, JSONRenderer().render(MovieSerializer(movies, many=True).data))
+
+    def test_movie_list_not_modified(self):
+        etag = self.client.get('/api/movies/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/movies/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog_version_bumped_elsewhere(self):
+        etag = self.client.get('/api/movies/')['ETag']
+        # As another process, such as a populate_models run, would.
+        CatalogVersion.objects.update(version=F('version') + 1)
+        response = self.client.get('/api/movies/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    @override_settings(FEED_CACHE_ENABLED=True)
+    def test_feed_cache_follows_catalog_version(self):
+        self.client.get('/api/most-popular/')
+        # A hit reads the version for the ETag and for the cache key.
+        with self.assertNumQueries(2):
+            self.client.get('/api/most-popular/')
+        # As another process, such as a populate_models run, would.
+        CatalogVersion.objects.update(version=F('version') + 1)
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/most-popular/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_most_popular(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/most-popular/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_recently_released(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recently-released/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_top_user_rated(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/top-user-rated/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie['rating_count'] for movie in response.json()], [1])
+
+    def test_trending(self):
+        record_events(WatchHistory, [WatchHistory(logged_id=2, movie=movie) for movie in Movie.objects.all()])
+        snapshot_trending()
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/trending/', {'window': '1h'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['trending_movies']), 6)
+
+    def test_trending_is_only_recomputed_by_the_command(self):
+        record_events(WatchHistory, [WatchHistory(logged_id=2, movie=Movie.objects.get(title='Movie 3'))])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/trending/').json()['trending_movies'], [])
+        call_command('snapshot_trending', stdout=StringIO())
+        response = self.client.get('/api/trending/')
+        self.assertEqual([movie['title'] for movie in response.json()['trending_movies']], ['Movie 3'])
+
+    def test_sequel_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/sequels/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/search/', {'q': 'Movie'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_recommendations_before_the_model_is_built(self):
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['recommended_movies']), 5)
+
+    def test_recommendations(self):
+        build_neighbors(top_n=5)
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['recommended_movies']), 5)
+        self.assertNotIn('Movie 0', [movie['title'] for movie in data['recommended_movies']])
+        self.assertEqual(len(data['recommended_sequels']), 18)
+
+    def test_precomputed_recommendations(self):
+        build_neighbors(top_n=5)
+        precompute_recommendations(workers=1)
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        self.assertEqual(len(response.json()['recommended_movies']), 5)
+
+    def test_precomputed_recommendations_score_affinity_without_neighbors(self):
+        Movie.objects.filter(title='Movie 5').update(director='Someone Else')
+        precompute_recommendations(workers=1)
+        recommended = UserRecommendation.objects.filter(logged_id=1).values_list('movie__title', flat=True)
+        # Only the movies sharing the director of Movie 0 match the user's affinity.
+        self.assertCountEqual(recommended, ['Movie 1', 'Movie 2', 'Movie 3', 'Movie 4'])
+
+    def test_recommendations_are_cached_until_the_user_rates_again(self):
+        self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        self.assertEqual(len(response.json()['recommended_movies']), 5)
+        RatingReview.objects.create(movie=Movie.objects.get(title='Movie 1'), logged_id=1, rating=9)
+        response = self.client.get('/api/recommendations/someone/', {'user_id': 1})
+        self.assertEqual(len(response.json()['recommended_movies']), 4)
+
+    def test_suggestions_skip_the_database_once_loaded(self):
+        self.client.get('/api/suggestions/', {'q': 'mov'})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/suggestions/', {'q': 'movie 5'})
+        self.assertEqual(response.json()['suggestions'][0], 'Movie 5')
+
+
+class RatingScoreSyncTests(TestCase):
+    """
+    Copying the Bayesian scores to `Movie.user_popularity` in periodic syncs.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [
+            Movie.objects.create(title=f'Movie {index}', release_date=timezone.now().date()) for index in range(3)]
+
+    def version(self):
+        return CatalogVersion.objects.get().version
+
+    def test_reviews_wait_for_the_sync(self):
+        version = self.version()
+        for rating in (6, 8, 10):
+            RatingReview.objects.create(movie=self.movies[0], logged_id=rating, rating=rating)
+        RatingReview.objects.create(movie=self.movies[1], logged_id=1, rating=2)
+        self.assertEqual(self.version(), version)
+        self.assertIsNone(Movie.objects.get(pk=self.movies[0].pk).user_popularity)
+
+        out = StringIO()
+        call_command('sync_user_popularity', stdout=out)
+        self.assertIn('Updated user_popularity of 2 movies', out.getvalue())
+        self.assertEqual(self.version(), version + 1)
+        self.assertAlmostEqual(Movie.objects.get(pk=self.movies[0].pk).user_popularity, (5.5 * 10 + 24) / 13)
+
+        # Nothing changed since, so the feeds keep their cache.
+        self.assertEqual(sync_user_popularity(), 0)
+        self.assertEqual(self.version(), version + 1)
+
+    def test_top_user_rated_counts_reviews_before_the_sync(self):
+        RatingReview.objects.create(movie=self.movies[0], logged_id=1, rating=7)
+        sync_user_popularity()
+        response = self.client.get('/api/top-user-rated/')
+        self.assertNotIn('ETag', response)
+        RatingReview.objects.create(movie=self.movies[0], logged_id=2, rating=9)
+        response = self.client.get('/api/top-user-rated/')
+        self.assertEqual([movie['rating_count'] for movie in response.json()], [2])
+
+    def test_out_of_range_ratings_are_rejected(self):
+        for rating in (0, -3, 11):
+            response = self.client.post(
+                '/api/rating-reviews/', {'movie': self.movies[0].pk, 'logged_id': 1, 'rating': rating})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('rating', response.json())
+        self.assertFalse(RatingReview.objects.exists())
+        response = self.client.post('/api/rating-reviews/', {'movie': self.movies[0].pk, 'logged_id': 1, 'rating': 10})
+        self.assertEqual(response.status_code, 201)
+
+    def test_deleted_reviews_clear_the_score(self):
+        review = RatingReview.objects.create(movie=self.movies[2], logged_id=1, rating=7)
+        sync_user_popularity()
+        review.delete()
+        self.assertEqual(sync_user_popularity(), 1)
+        self.assertIsNone(Movie.objects.get(pk=self.movies[2].pk).user_popularity)
+
+
+class RecommendationCacheTests(TestCase):
+    """
+    Hit and miss counting and the generation of the per-user recommendation cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(3):
+            Movie.objects.create(title=f'Movie {index}', director='Director', tmdb_popularity=float(index))
+        RatingReview.objects.create(movie=Movie.objects.get(title='Movie 0'), logged_id=1, rating=8)
+
+    def setUp(self):
+        cache.clear()
+        caches[settings.RECOMMENDATION_STATE_CACHE_ALIAS].clear()
+
+    def recommend(self, user_id):
+        return self.client.get('/api/recommendations/someone/', {'user_id': user_id})
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertEqual(recommendation_cache_stats(), {'hits': 0, 'misses': 0, 'hit_rate': 0.0})
+        self.recommend(1)
+        self.recommend(1)
+        self.recommend(1)
+        self.recommend(2)
+        self.assertEqual(recommendation_cache_stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_culling_the_entries_keeps_the_generation_and_counters(self):
+        self.recommend(1)
+        invalidate_recommendations()
+        generation = caches[settings.RECOMMENDATION_STATE_CACHE_ALIAS].get(GENERATION_KEY)
+        cache.clear()
+        self.recommend(1)
+        self.assertEqual(caches[settings.RECOMMENDATION_STATE_CACHE_ALIAS].get(GENERATION_KEY), generation)
+        self.assertEqual(recommendation_cache_stats()['misses'], 2)
+
+    def test_a_lost_generation_never_serves_older_entries(self):
+        self.recommend(1)
+        invalidate_recommendations()
+        self.recommend(1)
+        caches[settings.RECOMMENDATION_STATE_CACHE_ALIAS].delete(GENERATION_KEY)
+        self.recommend(1)
+        self.assertEqual(recommendation_cache_stats(), {'hits': 0, 'misses': 3, 'hit_rate': 0.0})
+
+
+@override_settings(CATALOG_ETAG_ENABLED=False)
+class KeysetPaginationTests(TestCase):
+    """
+    Walking the cursor-paginated lists through their `Link` headers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Popularities tie in pairs, and two movies have none, so they sort last.
+        for index in range(7):
+            Movie.objects.create(title=f'Movie {index}', tmdb_popularity=float(index // 2) if index < 5 else None)
+        movie = Movie.objects.get(title='Movie 0')
+        for user in range(5):
+            RatingReview.objects.create(movie=movie, logged_id=user, rating=5)
+        # Reviews written in the same instant tie on the key.
+        RatingReview.objects.filter(logged_id__lt=3).update(created_at=timezone.now() - timedelta(days=1))
+
+    def walk(self, url, **params):
+        """
+        Follow the `next` links from the first page, returning the pages and the links.
+        """
+        pages, links = [], []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            link = response.get('Link')
+            if link is None:
+                return pages, links
+            self.assertTrue(link.endswith('>; rel="next"'))
+            links.append(link[1:-len('>; rel="next"')])
+            response = self.client.get(links[-1])
+
+    def test_movie_list_pages(self):
+        pages, links = self.walk('/api/movies/', page_size=2)
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(len(links), 3)
+        self.assertTrue(all('page_size=2' in link and 'cursor=' in link for link in links))
+        titles = [movie['title'] for page in pages for movie in page]
+        self.assertEqual(titles, ['Movie 4', 'Movie 3', 'Movie 2', 'Movie 1', 'Movie 0', 'Movie 6', 'Movie 5'])
+
+    def test_review_list_pages(self):
+        pages, links = self.walk('/api/rating-reviews/list/', page_size=2, movie_id=Movie.objects.get(title='Movie 0').pk)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertTrue(all('movie_id=' in link for link in links))
+        users = [review['logged_id'] for page in pages for review in page]
+        self.assertEqual(users, [4, 3, 2, 1, 0])
+
+    def test_single_page_has_no_link(self):
+        response = self.client.get('/api/movies/', {'page_size': 10})
+        self.assertEqual(len(response.json()), 7)
+        self.assertNotIn('Link', response)
+
+    def test_tampered_cursors_are_not_found(self):
+        cursors = ['not a cursor', encode_cursor(['popular', 1]), encode_cursor([1.0, 'x']),
+                   encode_cursor([[1], 2]), encode_cursor({'id': 1})]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get('/api/movies/', {'cursor': cursor}).status_code, 404)
+        response = self.client.get('/api/rating-reviews/list/', {'cursor': encode_cursor(['yesterday', 1])})
+        self.assertEqual(response.status_code, 404)
+
+
+class RetentionTests(TestCase):
+    """
+    Chunked deletes of the history retention policies.
+    """
+
+    def test_chunks_skip_gaps_in_the_keys(self):
+        movie = Movie.objects.create(title='Movie', director='Director', genre='Drama')
+        rows = WatchHistory.objects.bulk_create(
+            [WatchHistory(logged_id=index % 2, movie=movie) for index in range(10)])
+        # A wide gap in the keys, as years of pruned rows leave behind.
+        WatchHistory.objects.filter(pk__in=[row.pk for row in rows[2:8]]).delete()
+        WatchHistory.objects.update(watched_at=timezone.now() - timedelta(days=100))
+        kept = WatchHistory.objects.create(logged_id=0, movie=movie)
+        with CaptureQueriesContext(connection) as queries:
+            reclaimed = apply_retention({'WatchHistory': {'days': 90}}, chunk_size=2)
+        self.assertEqual(reclaimed, {'WatchHistory': 4})
+        self.assertEqual(list(WatchHistory.objects.values_list('pk', flat=True)), [kept.pk])
+        deletes = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('DELETE')]
+        self.assertEqual(len(deletes), 2)
+
+
+@override_settings(HISTORY_BUFFER_MAX_ROWS=3, HISTORY_BUFFER_INTERVAL_MS=60000,
+                   HISTORY_BUFFER_MAX_QUEUE=100, HISTORY_BUFFER_BLOCK_WHEN_FULL=False)
+class WriteBehindBufferTests(TransactionTestCase):
+    """
+    Flushing of the history write-behind buffer. The flusher thread has its own
+    database connection, so these tests commit their rows.
+    """
+
+    def setUp(self):
+        self.movies = [Movie.objects.create(title=f'Movie {index}') for index in range(5)]
+        self.buffer = WriteBehindBuffer(WatchHistory)
+        self.addCleanup(self.buffer.close)
+
+    def put(self, *movies):
+        for movie in movies:
+            self.buffer.put(WatchHistory(logged_id=1, movie_id=movie.pk))
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, 'timed out')
+            time.sleep(0.01)
+
+    def test_flushes_a_full_batch_before_the_interval(self):
+        self.put(*self.movies[:3])
+        self.wait_for(lambda: self.buffer.flushed == 3)
+        self.assertEqual(WatchHistoryRollup.objects.count(), 3)
+
+    @override_settings(HISTORY_BUFFER_MAX_ROWS=100, HISTORY_BUFFER_INTERVAL_MS=20)
+    def test_flushes_a_partial_batch_after_the_interval(self):
+        self.put(self.movies[0])
+        self.wait_for(lambda: self.buffer.flushed == 1)
+        self.assertEqual(WatchHistoryRollup.objects.count(), 1)
+
+    @override_settings(HISTORY_BUFFER_MAX_ROWS=1, HISTORY_BUFFER_MAX_QUEUE=1)
+    def test_drops_events_when_the_queue_is_full(self):
+        # Hold the flusher in its first write so the queue fills up.
+        with self.buffer._flush_lock:  # pylint: disable=protected-access
+            self.put(self.movies[0])
+            self.wait_for(lambda: self.buffer.depth() == 0)
+            self.put(self.movies[1])
+            with self.assertLogs('movies_sequels.history_buffer', 'WARNING'):
+                self.assertFalse(self.buffer.put(WatchHistory(logged_id=1, movie_id=self.movies[2].pk)))
+        self.buffer.close()
+        self.assertEqual(self.buffer.stats(), {'depth': 0, 'flushed': 2, 'dropped': 1})
+
+    @override_settings(HISTORY_BUFFER_MAX_ROWS=100)
+    def test_close_writes_every_queued_event(self):
+        self.put(*self.movies)
+        self.buffer.close()
+        self.assertEqual(self.buffer.stats(), {'depth': 0, 'flushed': 5, 'dropped': 0})
+        self.assertEqual(WatchHistoryRollup.objects.count(), 5)
+
+    @override_settings(HISTORY_BUFFER_MAX_ROWS=100)
+    def test_close_waits_for_an_event_being_queued(self):
+        self.put(self.movies[0])
+        queued, release = threading.Event(), threading.Event()
+        enqueue = self.buffer._queue.put  # pylint: disable=protected-access
+
+        def slow_put(item, *args, **kwargs):
+            if isinstance(item, WatchHistory):
+                queued.set()
+                release.wait(5)
+            enqueue(item, *args, **kwargs)
+
+        with mock.patch.object(self.buffer._queue, 'put', side_effect=slow_put):  # pylint: disable=protected-access
+            putter = threading.Thread(target=self.put, args=(self.movies[1],))
+            putter.start()
+            self.assertTrue(queued.wait(5))
+            closer = threading.Thread(target=self.buffer.close)
+            closer.start()
+            closer.join(0.1)
+            self.assertTrue(closer.is_alive())
+            release.set()
+            putter.join(5)
+            closer.join(5)
+        self.assertEqual(self.buffer.stats(), {'depth': 0, 'flushed': 2, 'dropped': 0})
+
+    def test_events_put_after_close_are_written_at_once(self):
+        self.buffer.close()
+        self.assertTrue(self.buffer.put(WatchHistory(logged_id=1, movie_id=self.movies[0].pk)))
+        self.assertEqual(self.buffer.stats(), {'depth': 0, 'flushed': 1, 'dropped': 0})
+        self.assertEqual(WatchHistoryRollup.objects.count(), 1)
+
+    @override_settings(HISTORY_BUFFER_MAX_ROWS=100)
+    def test_an_event_of_a_deleted_movie_drops_only_itself(self):
+        self.put(*self.movies)
+        Movie.objects.filter(pk=self.movies[2].pk).delete()
+        with self.assertLogs('movies_sequels.history_buffer', 'WARNING') as logs:
+            self.buffer.close()
+        self.assertIn(f'missing movie {self.movies[2].pk}', logs.output[-1])
+        self.assertEqual(self.buffer.stats(), {'depth': 0, 'flushed': 4, 'dropped': 1})
+        self.assertEqual(WatchHistoryRollup.objects.count(), 4)
+
+
+class MigrationTestCase(TransactionTestCase):
+    """
+    Migrates the app back to `migrate_from`, lets `set_up_before` add rows with
+    the historical models, then migrates to `migrate_to`.
+    """
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('movies_sequels', self.migrate_from)])
+        self.set_up_before(executor.loader.project_state(('movies_sequels', self.migrate_from)).apps)
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([('movies_sequels', self.migrate_to)])
+        self.apps = executor.loader.project_state(('movies_sequels', self.migrate_to)).apps
+        self.addCleanup(lambda: call_command('migrate', 'movies_sequels', verbosity=0))
+
+    def set_up_before(self, apps):
+        """
+        Add rows before migrating forward.
+        """
+
+
+class UpsertKeyMigrationTests(MigrationTestCase):
+    migrate_from = '0011_searchhistory_movie_name'
+    migrate_to = '0012_movie_sequel_unique_upsert_keys'
+
+    def set_up_before(self, apps):
+        movie_model = apps.get_model('movies_sequels', 'Movie')
+        sequel_model = apps.get_model('movies_sequels', 'Sequel')
+        review_model = apps.get_model('movies_sequels', 'RatingReview')
+        self.remakes = [movie_model.objects.create(title='Dune').pk for _ in range(2)]
+        for movie_id in self.remakes:
+            review_model.objects.create(movie_id=movie_id, logged_id=1, rating=8)
+        self.kept = sequel_model.objects.create(movie_id=self.remakes[0], title='Dune Part Two').pk
+        sequel_model.objects.create(movie_id=self.remakes[0], title='Dune Part Two')
+
+    def test_movies_sharing_a_title_are_kept(self):
+        movie_model = self.apps.get_model('movies_sequels', 'Movie')
+        remakes = movie_model.objects.filter(title='Dune').order_by('id')
+        self.assertEqual(list(remakes.values_list('id', flat=True)), self.remakes)
+        # One user's reviews of both remakes survive.
+        self.assertEqual([movie.ratings_and_reviews.count() for movie in remakes], [1, 1])
+
+    def test_duplicate_sequels_are_merged_into_the_oldest_row(self):
+        sequels = self.apps.get_model('movies_sequels', 'Sequel').objects.filter(title='Dune Part Two')
+        self.assertEqual(list(sequels.values_list('id', flat=True)), [self.kept])
+
+    def test_tmdb_ids_are_unique(self):
+        movie_model = self.apps.get_model('movies_sequels', 'Movie')
+        movie_model.objects.filter(pk=self.remakes[0]).update(tmdb_id=7)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            movie_model.objects.filter(pk=self.remakes[1]).update(tmdb_id=7)
+
+
+class FakeTMDBClient:
+    """
+    Stands in for `TMDBClient`, serving a discover listing of `pages` pages of
+    `per_page` movies. Every fifth movie belongs to a collection of the three
+    movies after the previous multiple of ten, which other movies share.
+    """
+
+    def __init__(self, pages=2, per_page=10, failing=(), detail_cache=None):
+        self.pages = pages
+        self.per_page = per_page
+        self.failing = set(failing)
+        self.detail_cache = detail_cache or DetailCache()
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def get_json(self, endpoint, params=None, **path_params):
+        with self._lock:
+            self.requests.append((endpoint, (params or {}).get('page', path_params.get('movie_id'))))
+        if endpoint is ApiEndpoint.GENRE_LIST:
+            return {'genres': [{'id': 1, 'name': 'Action'}, {'id': 2, 'name': 'Drama'}]}
+        if endpoint is ApiEndpoint.DISCOVER_MOVIE:
+            page = params['page']
+            return {'total_pages': self.pages, 'results': [] if page > self.pages else [
+                {'id': page * 100 + index, 'title': f'Movie {page}-{index}', 'release_date': '2024-01-02',
+                 'genre_ids': [1, 2], 'poster_path': f'/{page}-{index}.jpg', 'popularity': 100.0 - page - index / 100}
+                for index in range(self.per_page)
+            ]}
+        movie_id = path_params['movie_id']
+        if movie_id in self.failing:
+            raise ConnectionError(f'movie {movie_id} is unavailable')
+        details = {
+            'id': movie_id, 'title': f'Part {movie_id}', 'poster_path': f'/{movie_id}.jpg', 'popularity': 5.0,
+            'genres': [{'id': 1, 'name': 'Action'}],
+            'credits': {'crew': [{'job': 'Director', 'name': f'Director {movie_id % 3}'}]},
+        }
+        if movie_id % 5 == 0:
+            first = movie_id - movie_id % 10
+            details['belongs_to_collection'] = {'id': first, 'parts': [first + 1, first + 2, first + 3]}
+        return details
+
+    def detail_requests(self, movie_id=None):
+        """
+        Return how many detail payloads were requested, for one movie or in total.
+        """
+        return sum(1 for endpoint, key in self.requests
+                   if endpoint is ApiEndpoint.MOVIE_DETAIL and movie_id in (None, key))
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """
+    Answers each GET with the next status of `statuses`.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.requested = []
+
+    def get(self, url, params=None, timeout=None):
+        self.requested.append(url)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response._content = b'{"genres": []}'  # pylint: disable=protected-access
+        return response
+
+
+class IngestionTestCase(TestCase):
+    """
+    Runs the `populate_models` pipeline against a `FakeTMDBClient`.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def run_pipeline(self, client, checkpoint=None, **options):
+        if checkpoint is None:
+            checkpoint = Checkpoint(self.directory / 'checkpoint.json', genre_dict=get_genre_dict(client))
+        save_genres(checkpoint.genre_dict)
+        dead_letters = DeadLetters.load(self.directory / 'dead_letters.json')
+        pipeline = IngestionPipeline(
+            client, checkpoint, BatchWriter(batch_size=5), dead_letters, concurrency=4, **options)
+        pipeline.run()
+        return pipeline
+
+
+class IngestionPipelineTests(IngestionTestCase):
+
+    def test_saves_every_listed_movie_with_its_collection(self):
+        client = FakeTMDBClient(pages=3)
+        self.run_pipeline(client)
+        self.assertEqual(Movie.objects.count(), 30)
+        movie = Movie.objects.get(tmdb_id=105)
+        self.assertEqual(movie.director, 'Director 0')
+        self.assertCountEqual(movie.sequels.values_list('tmdb_id', flat=True), [101, 102, 103])
+        self.assertCountEqual(movie.genres.values_list('name', flat=True), ['Action', 'Drama'])
+
+    def test_rate_limiter_paces_requests_after_a_burst(self):
+        limiter = RateLimiter(50)
+        start = time.monotonic()
+        # The first 50 requests are the burst; the next 10 wait a fiftieth of a second each.
+        for _ in range(60):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.18)
+
+    def test_client_retries_rate_limited_responses(self):
+        client = TMDBClient(rps=0, backoff=0)
+        client.session = FakeSession([429, 503, 200])
+        with self.assertLogs('movies_sequels.tmdb', 'WARNING'):
+            self.assertEqual(client.get_json(ApiEndpoint.GENRE_LIST), {'genres': []})
+        self.assertEqual(len(client.session.requested), 3)
+
+
+
+class IncrementalSyncTests(IngestionTestCase):
+
+    def test_unchanged_movies_are_not_fetched_again(self):
+        self.run_pipeline(FakeTMDBClient())
+        client = FakeTMDBClient()
+        pipeline = self.run_pipeline(client, incremental=True)
+        self.assertEqual(pipeline.skipped, 20)
+        self.assertEqual(client.detail_requests(), 0)
+
+    def test_changed_movies_are_fetched_again(self):
+        self.run_pipeline(FakeTMDBClient())
+        Movie.objects.filter(tmdb_id=101).update(sync_fingerprint='changed on TMDB')
+        client = FakeTMDBClient()
+        pipeline = self.run_pipeline(client, incremental=True)
+        self.assertEqual(pipeline.skipped, 19)
+        self.assertEqual(client.detail_requests(), 1)
+
+
+class DetailCacheTests(IngestionTestCase):
+
+    def test_shared_collection_parts_are_fetched_once(self):
+        client = FakeTMDBClient(pages=1)
+        self.run_pipeline(client)
+        # 101-103 are listed and are parts of both 100's and 105's collections.
+        self.assertEqual([client.detail_requests(movie_id) for movie_id in (101, 102, 103)], [1, 1, 1])
+        self.assertEqual(client.detail_requests(), 10)
+        self.assertEqual(client.detail_cache.hits, 6)
+
+    def test_payloads_on_disk_are_reused_until_stale(self):
+        DetailCache(self.directory).get(7, lambda: {'id': 7})
+        cache = DetailCache(self.directory)
+        self.assertEqual(cache.get(7, self.fail), {'id': 7})
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        stale = DetailCache(self.directory, ttl=-1)
+        self.assertEqual(stale.get(7, lambda: {'id': 7, 'title': 'Refetched'}), {'id': 7, 'title': 'Refetched'})
+
+    def test_a_failed_fetch_is_retried(self):
+        def unavailable():
+            raise ConnectionError('TMDB is unavailable')
+
+        cache = DetailCache()
+        with self.assertRaises(ConnectionError):
+            cache.get(7, unavailable)
+        self.assertEqual(cache.get(7, lambda: {'id': 7}), {'id': 7})
+
+
+class CheckpointTests(IngestionTestCase):
+
+    def test_resumes_from_the_checkpointed_page(self):
+        client = FakeTMDBClient(pages=3)
+        checkpoint = Checkpoint(
+            self.directory / 'checkpoint.json', page=2, committed_ids=range(200, 205),
+            in_flight_ids=[205], genre_dict=get_genre_dict(client))
+        self.run_pipeline(client, checkpoint)
+        self.assertNotIn((ApiEndpoint.DISCOVER_MOVIE, 1), client.requests)
+        self.assertEqual(client.detail_requests(204), 0)
+        self.assertEqual(client.detail_requests(205), 1)
+        self.assertEqual(Movie.objects.filter(tmdb_id__lt=300).count(), 5)
+
+    def test_dead_letters_outlive_the_run(self):
+        client = FakeTMDBClient(failing=[104])
+        with self.assertLogs('movies_sequels.management.commands.populate_models', 'WARNING'):
+            pipeline = self.run_pipeline(client, max_attempts=2)
+        pipeline.checkpoint.clear()
+        self.assertEqual(client.detail_requests(104), 2)
+        self.assertFalse(Movie.objects.filter(tmdb_id=104).exists())
+        self.assertEqual(DeadLetters.load(self.directory / 'dead_letters.json').entries[104]['attempts'], 2)
+
+        client = FakeTMDBClient()
+        self.run_pipeline(client)
+        self.assertEqual(client.detail_requests(104), 0)
+        self.run_pipeline(client, retry_dead_letters=True)
+        self.assertTrue(Movie.objects.filter(tmdb_id=104).exists())
+        self.assertNotIn(104, DeadLetters.load(self.directory / 'dead_letters.json'))
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Movie.objects.create(title='The Lighthouse', description='Two keepers on a dragon-haunted island.')
+        Movie.objects.create(title='Dragon Slayer', director='Someone', description='A knight.')
+        Movie.objects.create(title='Unrelated', description='Nothing to see.')
+
+    def test_ranks_title_matches_first(self):
+        self.assertTrue(search.fts_available())
+        results, _ = search.search_movies('dragon', fields=('title',))
+        self.assertEqual([movie['title'] for movie in results], ['Dragon Slayer', 'The Lighthouse'])
+
+    def test_matches_directors(self):
+        results, _ = search.search_movies('someone', fields=('title',))
+        self.assertEqual([movie['title'] for movie in results], ['Dragon Slayer'])
+
+    def test_suggests_titles_by_prefix(self):
+        self.assertEqual(search.suggest_titles('drag'), ['Dragon Slayer'])
+
+    def test_falls_back_to_scans_without_an_index(self):
+        with mock.patch.dict(search._fts_tables, {'default': False}):  # pylint: disable=protected-access
+            self.assertIsNone(search.ranked_movie_hits('dragon'))
+            results, _ = search.search_movies('dragon', fields=('title',))
+            self.assertEqual([movie['title'] for movie in results], ['The Lighthouse', 'Dragon Slayer'])
+            self.assertEqual(search.suggest_titles('drag'), ['Dragon Slayer'])
+            results, _ = search.search_movies('someone', fields=('title',))
+            self.assertEqual([movie['title'] for movie in results], ['Dragon Slayer'])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'PostgreSQL plans empty tables as sequential scans')
+class LookupIndexTests(TestCase):
+    """
+    The hot lookups are planned on their indexes rather than full table scans.
+    """
+
+    def assertUsesIndex(self, queryset, index):
+        self.assertIn(index, queryset.explain())
+
+    def test_catalog_filters(self):
+        self.assertUsesIndex(Movie.objects.filter(director='Director'), 'movie_director')
+        self.assertUsesIndex(Movie.objects.filter(genre='Drama'), 'movie_genre')
+        self.assertUsesIndex(Movie.objects.filter(release_date__gte=timezone.now().date()), 'movie_release_date')
+        self.assertUsesIndex(Sequel.objects.filter(genre='Drama'), 'sequel_genre')
+
+    def test_reviews_by_user_and_by_movie(self):
+        self.assertUsesIndex(RatingReview.objects.filter(logged_id=1).order_by('-created_at', '-id'),
+                             'review_user_keyset')
+        self.assertUsesIndex(RatingReview.objects.filter(movie_id=1).order_by('-created_at', '-id'),
+                             'review_movie_keyset')
+
+
+class GenreLinkMigrationTests(MigrationTestCase):
+    migrate_from = '0018_genre'
+    migrate_to = '0019_split_genre_strings'
+
+    def set_up_before(self, apps):
+        movie = apps.get_model('movies_sequels', 'Movie').objects.create(
+            title='Heat', genre='Action, Crime, Unknown')
+        apps.get_model('movies_sequels', 'Sequel').objects.create(movie=movie, title='Heat 2', genre='Crime')
+        apps.get_model('movies_sequels', 'Movie').objects.create(title='Untitled', genre=None)
+
+    def test_genre_strings_become_links(self):
+        movie_model = self.apps.get_model('movies_sequels', 'Movie')
+        self.assertCountEqual(movie_model.objects.get(title='Heat').genres.values_list('name', flat=True),
+                              ['Action', 'Crime'])
+        self.assertFalse(movie_model.objects.get(title='Untitled').genres.exists())
+        sequel = self.apps.get_model('movies_sequels', 'Sequel').objects.get(title='Heat 2')
+        self.assertEqual(list(sequel.genres.values_list('name', flat=True)), ['Crime'])
+        self.assertEqual(self.apps.get_model('movies_sequels', 'Genre').objects.count(), 2)
+
+
+class HistoryRollupTests(TestCase):
+
+    def test_events_roll_up_per_user_and_movie(self):
+        movie = Movie.objects.create(title='Heat')
+        now = timezone.now()
+        record_events(SearchHistory, [
+            SearchHistory(logged_id=1, movie=movie, movie_name='heat', watched_at=now - timedelta(days=2)),
+            SearchHistory(logged_id=2, movie=movie, movie_name='heat', watched_at=now),
+        ])
+        record_events(SearchHistory, [
+            SearchHistory(logged_id=1, movie=movie, movie_name='Heat (1995)', watched_at=now),
+            SearchHistory(logged_id=1, movie=movie, movie_name='older', watched_at=now - timedelta(days=1)),
+        ])
+        rollup = SearchHistoryRollup.objects.get(logged_id=1)
+        self.assertEqual((rollup.count, rollup.first_seen, rollup.last_seen), (3, now - timedelta(days=2), now))
+        self.assertEqual(rollup.movie_name, 'Heat (1995)')
+        self.assertEqual(SearchHistoryRollup.objects.count(), 2)
+
+    @override_settings(HISTORY_RAW_LOG_ENABLED=True)
+    def test_raw_log_keeps_the_events_as_recorded(self):
+        movie = Movie.objects.create(title='Heat')
+        seen = timezone.now() - timedelta(hours=3)
+        record_events(SearchHistory, [SearchHistory(
+            logged_id=1, logged_name='Vincent', movie=movie, movie_name='heat', watched_at=seen)])
+        record_events(WatchHistory, [WatchHistory(logged_id=1, logged_name='Vincent', movie=movie)])
+        search_event = SearchHistory.objects.get()
+        self.assertEqual((search_event.logged_name, search_event.movie_name, search_event.watched_at),
+                         ('Vincent', 'heat', seen))
+        self.assertEqual(SearchHistoryRollup.objects.get().last_seen, seen)
+        watch_event = WatchHistory.objects.get()
+        self.assertEqual(watch_event.logged_name, 'Vincent')
+        self.assertEqual(watch_event.watched_at, WatchHistoryRollup.objects.get().last_seen)
+
+
+class HistoryBackfillMigrationTests(MigrationTestCase):
+    migrate_from = '0021_history_rollups'
+    migrate_to = '0022_backfill_history_rollups'
+
+    def set_up_before(self, apps):
+        movie = apps.get_model('movies_sequels', 'Movie').objects.create(title='Heat')
+        watch_history = apps.get_model('movies_sequels', 'WatchHistory')
+        for logged_id in (1, 1, 1, 2):
+            watch_history.objects.create(logged_id=logged_id, movie=movie)
+
+    def test_raw_events_are_rolled_up(self):
+        rollups = self.apps.get_model('movies_sequels', 'WatchHistoryRollup').objects.order_by('logged_id')
+        self.assertEqual(list(rollups.values_list('logged_id', 'count')), [(1, 3), (2, 1)])
+
+
+class PrimaryReplicaRouterTests(TransactionTestCase):
+    """
+    Runs outside a test transaction, as the router keeps reads inside one on the primary.
+    """
+    router = PrimaryReplicaRouter()
+
+    def test_catalog_reads_go_to_the_replica(self):
+        for model in (Movie, Sequel, Movie.genres.through):
+            self.assertEqual(self.router.db_for_read(model), 'replica')
+        self.assertEqual(self.router.db_for_read(RatingReview), 'default')
+        self.assertEqual(self.router.db_for_write(Movie), 'default')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.router.db_for_read(Movie), 'default')
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'movies_sequels'))
+        self.assertFalse(self.router.allow_migrate('replica', 'movies_sequels'))
+
+
+class SQLiteTuningTests(SimpleTestCase):
+
+    def pragmas(self, *names):
+        """
+        Open a new connection to a database file and read some of its pragmas.
+        """
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        database = SQLiteDatabaseWrapper(
+            {**connection.settings_dict, 'NAME': Path(directory.name) / 'tuned.sqlite3'}, alias='tuned')
+        self.addCleanup(database.close)
+        with database.cursor() as cursor:
+            values = []
+            for name in names:
+                cursor.execute(f'PRAGMA {name}')
+                values.append(cursor.fetchone()[0])
+        return values
+
+    @override_settings(SQLITE_TUNING_ENABLED=True)
+    def test_pragmas_are_applied_to_new_connections(self):
+        self.assertEqual(self.pragmas('journal_mode', 'synchronous', 'busy_timeout', 'temp_store'),
+                         ['wal', 1, 5000, 2])
+
+    @override_settings(SQLITE_TUNING_ENABLED=False)
+    def test_nothing_is_changed_when_disabled(self):
+        self.assertEqual(self.pragmas('journal_mode', 'synchronous'), ['delete', 2])
@@ -0,0 +1,268 @@
+"""
+HTTP client for The Movie Database (TMDB) API.
+
+This module contains the pieces shared by the ingestion pipeline in the
+`populate_models` management command:
+
+- `ApiEndpoint`: The TMDB endpoints used by the application.
+- `RateLimiter`: A thread-safe token bucket enforcing a requests-per-second budget.
+- `DetailCache`: A per-run memo of movie detail payloads, optionally backed by
+    an on-disk cache with a TTL.
+- `TMDBClient`: A pooled `requests.Session` wrapper that applies the rate limit
+    and retries with exponential backoff on 429 and 5xx responses.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from enum import Enum
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_KEY = '316aaf03b6a33bb139c69970f4272133'
+BASE_URL = 'https://api.themoviedb.org/3/'
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+logger = logging.getLogger(__name__)
+
+
+class ApiEndpoint(Enum):
+    """
+    TMDB API endpoints, relative to `BASE_URL`.
+    """
+    GENRE_LIST = 'genre/movie/list'
+    DISCOVER_MOVIE = 'discover/movie'
+    MOVIE_DETAIL = 'movie/{movie_id}'
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests are started per second.
+
+    The bucket holds at most `rate` tokens, so a burst never exceeds one
+    second's worth of budget. Safe to share between threads.
+    """
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate (float): The allowed number of requests per second. A value of
+                zero or less disables limiting.
+        """
+        self.rate = rate
+        self._tokens = rate
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be started.
+        """
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class DetailCache:
+    """
+    Memo of TMDB movie detail payloads keyed by movie id.
+
+    Every id is fetched at most once per run: concurrent callers asking for an
+    id that is already being fetched wait for that fetch instead of starting
+    another. When a directory is given, payloads are also stored there as
+    `<movie_id>.json` and reused by later runs until they are `ttl` seconds old,
+    which also lets the command run offline against recorded files.
+    """
+
+    def __init__(self, directory=None, ttl=86400):
+        """
+        Args:
+            directory (str): The on-disk cache directory, or None for memo only.
+            ttl (float): How many seconds an on-disk payload stays fresh.
+        """
+        self.directory = Path(directory) if directory else None
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._lock = threading.Lock()
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, movie_id, fetch):
+        """
+        Return the payload for a movie, calling `fetch` only on a cache miss.
+
+        Args:
+            movie_id (int): The TMDB ID of the movie.
+            fetch (callable): Returns the payload from the API.
+
+        Returns:
+            dict: The movie detail payload.
+        """
+        with self._lock:
+            entry = self._memo.get(movie_id)
+            owner = entry is None
+            if owner:
+                entry = self._memo[movie_id] = Future()
+            else:
+                self.hits += 1
+        if not owner:
+            return entry.result()
+
+        try:
+            data = self._read(movie_id)
+            if data is None:
+                data = fetch()
+                self._write(movie_id, data)
+                with self._lock:
+                    self.misses += 1
+            else:
+                with self._lock:
+                    self.hits += 1
+        except Exception as exc:
+            # Forget the failure so a later call can retry the fetch.
+            with self._lock:
+                del self._memo[movie_id]
+            entry.set_exception(exc)
+            raise
+        entry.set_result(data)
+        return data
+
+    def _path(self, movie_id):
+        return self.directory / f'{movie_id}.json'
+
+    def _read(self, movie_id):
+        """
+        Return a fresh on-disk payload, or None.
+        """
+        if not self.directory:
+            return None
+        path = self._path(movie_id)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                return None
+            with path.open(encoding='utf-8') as cached:
+                return json.load(cached)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, movie_id, data):
+        """
+        Store a payload on disk, replacing any previous file atomically.
+        """
+        if not self.directory:
+            return
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(handle, 'w', encoding='utf-8') as temp_file:
+            json.dump(data, temp_file)
+        os.replace(temp_path, self._path(movie_id))
+
+
+class TMDBClient:
+    """
+    Thread-safe TMDB client sharing one pooled HTTP session between workers.
+    """
+
+    def __init__(self, api_key=API_KEY, rps=40, pool_size=10, max_retries=5, backoff=0.5, timeout=10,
+                 detail_cache=None):
+        """
+        Args:
+            api_key (str): The TMDB API key sent with every request.
+            rps (float): The requests-per-second budget.
+            pool_size (int): The number of pooled connections to keep open.
+            max_retries (int): How many times a 429/5xx or connection error is retried.
+            backoff (float): The base delay in seconds, doubled on every retry.
+            timeout (float): The per-request timeout in seconds.
+            detail_cache (DetailCache): The movie detail cache; defaults to a per-run memo.
+        """
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(rps)
+        self.detail_cache = detail_cache or DetailCache()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, endpoint, params=None, **path_params):
+        """
+        Fetch a TMDB endpoint and return its decoded JSON body.
+
+        Args:
+            endpoint (ApiEndpoint): The endpoint to request.
+            params (dict): Extra query parameters; the API key and language are added.
+            **path_params: Values substituted into the endpoint path.
+
+        Returns:
+            dict: The JSON response.
+
+        Raises:
+            requests.HTTPError: If the response is an error, or still retryable
+                after `max_retries` attempts.
+        """
+        url = f'{BASE_URL}{endpoint.value.format(**path_params)}'
+        query = {'api_key': self.api_key, 'language': 'en-US', **(params or {})}
+        return self.fetch_json(url, query)
+
+    def fetch_json(self, url, params):
+        """
+        GET a URL through the rate limiter, retrying on 429/5xx with exponential backoff.
+
+        Args:
+            url (str): The URL to fetch data from.
+            params (dict): The parameters to include in the request.
+
+        Returns:
+            dict: The JSON response from the request.
+        """
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
+                delay = self._retry_after(response) or self.backoff * 2 ** attempt
+            attempt += 1
+            logger.warning('Retrying %s in %.1fs (attempt %d)', url, delay, attempt)
+            time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(response):
+        """
+        Return the delay requested by a `Retry-After` header, if any.
+        """
+        try:
+            return float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            return None
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,144 @@
+"""
+Trending movies from the app's own watch and search traffic.
+
+Events are counted as they are recorded: `count_events`, called by
+`history.record_events`, adds each batch to per-movie `TrendingBucket` rows of
+`TRENDING_BUCKET_SECONDS`, so the counters form a sliding window that is never
+rebuilt from the history tables.
+
+`snapshot_trending` turns the buckets into rankings. For each window in
+`TRENDING_WINDOWS`, every bucket younger than the window adds its weighted
+event count, halved every half-life of that window, to its movie's score. A
+heap keeps the `TRENDING_TOP_K` best movies, which replace the window's
+`TrendingSnapshot` rows. Buckets older than the longest window are deleted.
+
+Snapshots are refreshed only by the `snapshot_trending` command, run from
+cron or kept running with `--loop`, every `TRENDING_SNAPSHOT_INTERVAL`. The
+snapshots live in the database, so every process serves the same ones, and a
+request reads the snapshot rows of its window and nothing else.
+"""
+import heapq
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SearchHistory, TrendingBucket, TrendingSnapshot, WatchHistory
+
+# The counter column of each history model.
+EVENT_COLUMNS = {WatchHistory: 'watches', SearchHistory: 'searches'}
+
+
+def bucket_start(moment):
+    """
+    Return the start of the `TRENDING_BUCKET_SECONDS` bucket holding `moment`.
+    """
+    size = settings.TRENDING_BUCKET_SECONDS
+    seconds = int(moment.timestamp())
+    return datetime.fromtimestamp(seconds - seconds % size, tz=dt_timezone.utc)
+
+
+def count_events(model, events):
+    """
+    Add watch or search events to the trending bucket counters.
+
+    Args:
+        model (Model): `WatchHistory` or `SearchHistory`.
+        events (list): Instances of `model`; unsaved ones count as happening now.
+    """
+    counts = defaultdict(int)
+    for event in events:
+        counts[event.movie_id, bucket_start(event.watched_at or timezone.now())] += 1
+    if not counts:
+        return
+    quote = connection.ops.quote_name
+    table = quote(TrendingBucket._meta.db_table)
+    watches, searches = quote('watches'), quote('searches')
+    sql = (
+        f'INSERT INTO {table} ({quote("movie_id")}, {quote("bucket_start")}, {watches}, {searches}) '
+        f'VALUES (%s, %s, %s, %s) ON CONFLICT ({quote("movie_id")}, {quote("bucket_start")}) DO UPDATE SET '
+        f'{watches} = {table}.{watches} + excluded.{watches}, {searches} = {table}.{searches} + excluded.{searches}'
+    )
+    adapt = connection.ops.adapt_datetimefield_value
+    is_watch = EVENT_COLUMNS[model] == 'watches'
+    params = [
+        (movie_id, adapt(start), count if is_watch else 0, 0 if is_watch else count)
+        for (movie_id, start), count in counts.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def window_scores(buckets, now, window, half_life):
+    """
+    Score movies by their decayed event counts over one window.
+
+    Args:
+        buckets (list): `(movie_id, bucket_start, watches, searches)` rows.
+        now (datetime): The time the scores are computed for.
+        window (timedelta): How far back buckets count.
+        half_life (timedelta): The age at which an event counts half.
+
+    Returns:
+        dict: Maps a movie ID to its score.
+    """
+    middle = timedelta(seconds=settings.TRENDING_BUCKET_SECONDS / 2)
+    scores = defaultdict(float)
+    for movie_id, start, watches, searches in buckets:
+        age = now - (start + middle)
+        if age >= window:
+            continue
+        events = watches * settings.TRENDING_WATCH_WEIGHT + searches * settings.TRENDING_SEARCH_WEIGHT
+        scores[movie_id] += events * 0.5 ** (max(age, timedelta(0)) / half_life)
+    return scores
+
+
+def snapshot_trending(now=None):
+    """
+    Recompute the top movies of every window and drop buckets no window needs.
+
+    Returns:
+        dict: Maps each window name to the number of movies stored.
+    """
+    now = now or timezone.now()
+    longest = max(window for window, _ in settings.TRENDING_WINDOWS.values())
+    # pylint: disable=no-member
+    buckets = list(
+        TrendingBucket.objects.filter(bucket_start__gte=now - longest - timedelta(
+            seconds=settings.TRENDING_BUCKET_SECONDS))
+        .values_list('movie_id', 'bucket_start', 'watches', 'searches')
+    )
+    stored = {}
+    with transaction.atomic():
+        for name, (window, half_life) in settings.TRENDING_WINDOWS.items():
+            scores = window_scores(buckets, now, window, half_life)
+            top = heapq.nlargest(settings.TRENDING_TOP_K, scores.items(), key=lambda item: (item[1], -item[0]))
+            TrendingSnapshot.objects.filter(window=name).delete()
+            TrendingSnapshot.objects.bulk_create(
+                TrendingSnapshot(window=name, rank=rank, movie_id=movie_id, score=score, computed_at=now)
+                for rank, (movie_id, score) in enumerate(top)
+            )
+            stored[name] = len(top)
+        TrendingBucket.objects.filter(bucket_start__lt=now - longest - timedelta(
+            seconds=settings.TRENDING_BUCKET_SECONDS)).delete()
+    return stored
+
+
+def get_trending(window):
+    """
+    Return the latest snapshot of a window.
+
+    Args:
+        window (str): One of `TRENDING_WINDOWS`.
+
+    Returns:
+        tuple: The `(movie_id, score)` pairs, best first, and the snapshot time
+            (None while nothing is trending).
+    """
+    # pylint: disable=no-member
+    rows = list(TrendingSnapshot.objects.filter(window=window).order_by('rank')
+                .values_list('movie_id', 'score', 'computed_at'))
+    computed_at = rows[0][2] if rows else None
+    return [(movie_id, score) for movie_id, score, _ in rows], computed_at
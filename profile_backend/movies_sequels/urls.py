@@ -7,16 +7,20 @@ released movies and sequels, the most popular movies and sequels, search
 suggestions, and search results.
 
 Endpoints:
-- /movies/ - Movie viewset
-- /sequels/ - Sequel viewset
+- /movies/ - Movie viewset; ?fields= and ?expand=sequels select a sparse fieldset
+- /sequels/ - Sequel viewset; ?fields= selects a sparse fieldset
 - /recently-released/ - Recently released movies and sequels
 - /most-popular/ - Most popular movies and sequels
+- /trending/?window=1h|24h|7d - Movies trending in watch and search traffic
+- /top-user-rated/ - Movies by Bayesian user rating score
 - /suggestions/ - Search suggestions
 - /search/ - Search movies
 - /<str:movie_name>/sequels/ - Movie sequels
 - /<str:movie_name>/movie-details/ - Movie details
 - /rating-reviews/ - Create a new rating and review
 - /rating-reviews/list/ - List all rating and review entries
+- /recommendation-cache/stats/ - Recommendation cache hit/miss counters (admin only)
+- /history-buffer/stats/ - History write-behind queue depth and counters (admin only)
 """
 
 from django.urls import path, include
@@ -26,6 +30,8 @@ MovieViewSet,
 SequelViewSet,
 RecentlyReleasedMoviesAndSequelsView,
 MostPopularMoviesView,
+TopUserRatedMoviesView,
+TrendingMoviesView,
 SearchMoviesView,
 SearchSuggestionsView,
 MovieSequelsView,
@@ -33,9 +39,11 @@ MovieDetailsView,
 RatingReviewCreateView,
 RatingReviewListView,
 UserRecommendationView,
+RecommendationCacheStatsView,
 SearchHistoryListCreateView,
 UserWatchHistoryListView,
 WatchHistoryListCreateView,
+HistoryBufferStatsView,
 MovieListView,
 ClearWatchHistoryView,
 SearchHistoryDetailView,
@@ -55,6 +63,10 @@ path('recently-released/', RecentlyReleasedMoviesAndSequelsView.as_view(),
      name='recently_released_movies_and_sequels'),
 path('most-popular/', MostPopularMoviesView.as_view(),
      name='most_popular_movies'),
+path('trending/', TrendingMoviesView.as_view(),
+     name='trending_movies'),
+path('top-user-rated/', TopUserRatedMoviesView.as_view(),
+     name='top_user_rated_movies'),
 path('suggestions/', SearchSuggestionsView.as_view(), name='search_suggestions'),
 path('search/', SearchMoviesView.as_view(), name='search_movies'),
 path('<str:movie_name>/sequels/', MovieSequelsView.as_view(),
@@ -67,12 +79,16 @@ path('rating-reviews/list/', RatingReviewListView.as_view(),
      name='rating-review-list'),
 path('recommendations/<str:username>/', UserRecommendationView.as_view(),
      name='user-recommendations'),
+path('recommendation-cache/stats/', RecommendationCacheStatsView.as_view(),
+     name='recommendation-cache-stats'),
 path('search-history/', SearchHistoryListCreateView.as_view(),
      name='search-history-list-create'),
 path('search-history/<int:pk>/', SearchHistoryDetailView.as_view(),
      name='search-history-detail'),
 path('watch-history/', WatchHistoryListCreateView.as_view(),
      name='watch-history-list-create'),
+path('history-buffer/stats/', HistoryBufferStatsView.as_view(),
+     name='history-buffer-stats'),
 path('list-watch-history/', UserWatchHistoryListView.as_view(),
      name='user-watch-history'),
 path('list-search-history/', SearchHistoryDetailView.as_view(),
@@ -1,77 +1,200 @@
 import logging
 
-from django.db.models import Q
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets, generics, status
 from rest_framework.views import APIView
-from django.http import  JsonResponse
-from rest_framework.permissions import AllowAny
+from django.http import Http404, HttpResponse, JsonResponse
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
-from .models import Movie, Sequel, RatingReview, SearchHistory, WatchHistory
+from .models import (
+    SYNC_FIELDS, Movie, Sequel, RatingReview, SearchHistory, WatchHistory,
+    SearchHistoryRollup, WatchHistoryRollup,
+)
 from .serializers import (
     MovieSerializer,
     SequelSerializer,
     SearchResultSerializer,
     SearchSuggestionSerializer,
+    UserRatedMovieSerializer,
     RatingReviewSerializer,
     SearchHistorySerializer,
-    WatchHistorySerializer
+    SearchHistoryRollupSerializer,
+    WatchHistorySerializer,
+    WatchHistoryRollupSerializer,
 )
 from .movieRecommendation import RecommendationEngine
+from .pagination import (
+    CreatedAtPagination,
+    KeysetPagination,
+    LastSeenPagination,
+    PopularityPagination,
+    UserPopularityPagination,
+    decode_cursor,
+    encode_cursor,
+)
+from .catalog_version import catalog_conditional
+from .fast_serializers import movie_values, sequel_values
+from .fieldsets import LIST_FIELDS, narrow, requested_fields
+from .feeds import MOST_POPULAR, RECENTLY_RELEASED, get_feed
+from .history import record_events
+from .history_buffer import search_history_buffer, watch_history_buffer
+from .recommendation_cache import get_recommendations, recommendation_cache_stats
+from .search import search_movies, suggest_titles
+from .trending import get_trending
+from .suggestions import suggestion_index
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-class MovieViewSet(viewsets.ModelViewSet):
+class SparseFieldsMixin:
+    """
+    Mixin for the catalog viewsets serving `?fields=` and `?expand=` sparse fieldsets.
+
+    Lists default to the slim `LIST_FIELDS` and are serialized from `.values()`
+    rows by `values_serializer`; single objects default to the full
+    representation and load only the selected columns with `.only()`.
+    """
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        """
+        List the selected fields through the `.values()` serializer, which renders
+        the same JSON as `serializer_class` at a fraction of the cost.
+        """
+        fields = requested_fields(request, self.serializer_class, LIST_FIELDS)
+        values = self.values_serializer.with_fields(fields)
+        queryset = values.values(self.filter_queryset(self.get_queryset()), self.paginator.key_field)
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(values.serialize(page))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = narrow(queryset, self.serializer_class, requested_fields(self.request, self.serializer_class))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'retrieve':
+            kwargs['fields'] = requested_fields(self.request, self.serializer_class)
+        return super().get_serializer(*args, **kwargs)
+
+@method_decorator(catalog_conditional(), name='dispatch')
+class MovieViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing Movie instances.
+    Serves sparse fieldsets; `?expand=sequels` nests the sequels in lists.
+    Answers conditional GETs from the catalog version.
     """
-    queryset = Movie.objects.all()
+    queryset = Movie.objects.for_listing()
     serializer_class = MovieSerializer
+    values_serializer = movie_values
+    pagination_class = PopularityPagination
 
-class SequelViewSet(viewsets.ModelViewSet):
+@method_decorator(catalog_conditional(), name='dispatch')
+class SequelViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """
     ViewSet for viewing and editing Sequel instances.
+    Serves sparse fieldsets.
+    Answers conditional GETs from the catalog version.
     """
-    queryset = Sequel.objects.all()
+    queryset = Sequel.objects.defer(*SYNC_FIELDS)
     serializer_class = SequelSerializer
+    values_serializer = sequel_values
+    pagination_class = PopularityPagination
 
+@method_decorator(catalog_conditional(daily=True), name='dispatch')
 class RecentlyReleasedMoviesAndSequelsView(APIView):
     """
     API view to retrieve recently released movies and sequels.
+    Served from the home feed cache; answers conditional GETs from the catalog version.
     """
+    @staticmethod
+    def build_feed():
+        """
+        Build the recently released feed data.
+        """
+        movies = movie_values.values(Movie.get_recently_released())
+        sequels = sequel_values.values(Sequel.get_recently_released())
+        return {
+            'recently_released_movies': movie_values.serialize(movies),
+            'recently_released_sequels': sequel_values.serialize(sequels)
+        }
+
     def get(self, request):
         """
         Get method for recently released movies and sequels.
         """
-        movies = Movie.get_recently_released()
-        sequels = Sequel.get_recently_released()
-        movie_serializer = MovieSerializer(movies, many=True)
-        sequel_serializer = SequelSerializer(sequels, many=True)
-        return Response({
-            'recently_released_movies': movie_serializer.data,
-            'recently_released_sequels': sequel_serializer.data
-        })
+        payload = get_feed(RECENTLY_RELEASED, self.build_feed)
+        return HttpResponse(payload, content_type='application/json')
 
+@method_decorator(catalog_conditional(), name='dispatch')
 class MostPopularMoviesView(APIView):
     """
     API view to retrieve the most popular movies.
+    Served from the home feed cache; answers conditional GETs from the catalog version.
     """
+    @staticmethod
+    def build_feed():
+        """
+        Build the most popular feed data.
+        """
+        movies = movie_values.values(Movie.get_top_rated_movies())
+        return {
+            'tmdb_popular_movies': movie_values.serialize(movies),
+        }
+
     def get(self, request):
         """
         Get method for most popular movies view.
         """
-        movies = Movie.get_top_rated_movies()
-        movie_serializer = MovieSerializer(movies, many=True)
+        payload = get_feed(MOST_POPULAR, self.build_feed)
+        return HttpResponse(payload, content_type='application/json')
+
+class TrendingMoviesView(APIView):
+    """
+    API view to retrieve the movies trending in our own watch and search traffic.
+    Reads the latest trending snapshot of the `window` query parameter.
+    """
+    def get(self, request):
+        """
+        Get method for trending movies view.
+        """
+        window = request.GET.get('window', '24h')
+        if window not in settings.TRENDING_WINDOWS:
+            return Response({'error': f'window must be one of {", ".join(settings.TRENDING_WINDOWS)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        ranking, computed_at = get_trending(window)
+        movies = Movie.objects.for_listing().in_bulk([movie_id for movie_id, _ in ranking])
+        trending = []
+        for movie_id, score in ranking:
+            if movie_id in movies:
+                trending.append({**MovieSerializer(movies[movie_id]).data, 'trending_score': score})
         return Response({
-            'tmdb_popular_movies': movie_serializer.data,
+            'window': window,
+            'computed_at': computed_at,
+            'trending_movies': trending,
         })
 
+class TopUserRatedMoviesView(generics.ListAPIView):
+    """
+    API view to list movies by their Bayesian user rating score, best first.
+    Reads the precomputed rating aggregates; movies without ratings are left out.
+    Not answered from the catalog version: the rating counts and averages change
+    with every review, while the version only moves when the scores are synced.
+    """
+    queryset = Movie.objects.for_listing().select_related('rating_stats').filter(user_popularity__isnull=False)
+    serializer_class = UserRatedMovieSerializer
+    pagination_class = UserPopularityPagination
+
 class SearchSuggestionsView(APIView):
     """
     API view to provide search suggestions based on a query.
+    Answered from the in-process suggestion index when it is enabled.
     """
     def get(self, request):
         """
@@ -79,31 +202,39 @@ class SearchSuggestionsView(APIView):
         """
         query = request.GET.get('q', '')
         suggestions = []
-        if query:
-            suggestions = (
-                Movie.objects.filter(Q(title__icontains=query))
-                .values_list('title', flat=True)[:4]
-                | Movie.objects.filter(Q(director__icontains=query))
-                .values_list('title', flat=True)[:4]
-            )
+        if query and settings.SUGGESTION_INDEX_ENABLED:
+            suggestions = suggestion_index.suggest(query, limit=8)
+        elif query:
+            suggestions = suggest_titles(query, limit=8)
         serializer = SearchSuggestionSerializer({'suggestions': suggestions})
         return Response(serializer.data)
 
 class SearchMoviesView(APIView):
     """
-    API view to return movies matching a search query in title or description.
+    API view to return movies matching a search query in title, director or
+    description, most relevant first, one page at a time. `next` holds the URL
+    of the following page, or None on the last page.
     """
+    pagination = KeysetPagination()
+
     def get(self, request):
         """
         Get method for search movies view.
         """
         query = request.GET.get('q', '')
-        movies = []
+        movies, next_url = [], None
         if query:
-            movies = Movie.objects.filter(
-                Q(title__icontains=query) | Q(description__icontains=query))
-        serializer = SearchResultSerializer(
-            {'results': list(movies.values('title', 'description', 'image_url'))})
+            cursor = request.GET.get(self.pagination.cursor_query_param)
+            movies, next_key = search_movies(
+                query,
+                limit=self.pagination.get_page_size(request),
+                after=decode_cursor(cursor) if cursor else None,
+            )
+            if next_key:
+                next_url = replace_query_param(
+                    request.build_absolute_uri(), self.pagination.cursor_query_param,
+                    encode_cursor(next_key))
+        serializer = SearchResultSerializer({'results': movies, 'next': next_url})
         return Response(serializer.data)
 
 class MovieSequelsView(APIView):
@@ -114,7 +245,10 @@ class MovieSequelsView(APIView):
         """
         Get method for movie sequels view.
         """
-        movie = get_object_or_404(Movie, title=movie_name)
+        # Titles repeat across remakes; the most popular one is meant.
+        movie = Movie.objects.filter(title=movie_name).order_by('-tmdb_popularity', '-id').first()
+        if movie is None:
+            raise Http404('No Movie matches the given query.')
         sequels = movie.sequels.all()
         serializer = SequelSerializer(sequels, many=True)
         return Response(serializer.data)
@@ -128,12 +262,12 @@ class MovieDetailsView(APIView):
         Get method for movie details view.
         """
         if movie_name:
-            try:
-                movie = Movie.objects.get(title=movie_name)
-                serializer = MovieSerializer(movie)
-                return Response(serializer.data)
-            except Movie.DoesNotExist:
+            # Titles repeat across remakes; the most popular one is meant.
+            movie = Movie.objects.filter(title=movie_name).order_by('-tmdb_popularity', '-id').first()
+            if movie is None:
                 return Response({'error': 'Movie not found'}, status=status.HTTP_404_NOT_FOUND)
+            serializer = MovieSerializer(movie)
+            return Response(serializer.data)
         return Response({'error': 'No movie name provided'}, status=status.HTTP_400_BAD_REQUEST)
 
 class RatingReviewCreateView(generics.CreateAPIView):
@@ -151,9 +285,10 @@ class RatingReviewCreateView(generics.CreateAPIView):
 
 class RatingReviewListView(generics.ListAPIView):
     """
-    List all rating and review entries for a specific movie or user.
+    List all rating and review entries for a specific movie or user, newest first.
     """
     serializer_class = RatingReviewSerializer
+    pagination_class = CreatedAtPagination
 
     def get_queryset(self):
         """
@@ -163,76 +298,150 @@ class RatingReviewListView(generics.ListAPIView):
         movie_id = self.request.query_params.get('movie_id')
         user_id = self.request.query_params.get('user_id')
         if movie_id:
-            return RatingReview.objects.filter(movie_id=movie_id).order_by('-created_at')
+            return RatingReview.objects.filter(movie_id=movie_id)
         elif user_id:
-            return RatingReview.objects.filter(logged_id=user_id).order_by('-created_at')
+            return RatingReview.objects.filter(logged_id=user_id)
         else:
             return RatingReview.objects.all()
 
-    def list(self, request, *args, **kwargs):
+class UserRecommendationView(APIView):
+    """
+    API view to recommend movies and sequels from the precomputed neighbour table.
+    Served from the per-user recommendation cache.
+    """
+    @staticmethod
+    def build_recommendations(user_id):
         """
-        Handle GET requests to list reviews.
+        Build the recommendation data of a user.
         """
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        engine = RecommendationEngine(user_id=user_id)
+        weights = engine.get_seed_weights()
+        recommended_movies = engine.recommend_movies(weights)
+        recommended_sequels = engine.recommend_sequels(weights, recommended_movies)
+
+        movie_serializer = MovieSerializer(recommended_movies, many=True)
+        sequel_serializer = SequelSerializer(recommended_sequels, many=True)
+
+        return {
+            'recommended_movies': movie_serializer.data,
+            'recommended_sequels': sequel_serializer.data,
+        }
 
-class UserRecommendationView(APIView):
     def get(self, request, username):
         user_id = self.request.query_params.get('user_id')
         if not user_id:
             return Response({'error': 'User ID is required'}, status=400)
-        print(f"user id is {user_id}")
-        engine = RecommendationEngine(user_id=user_id)
-        recommended_sequels = engine.recommend_sequels_based_on_genre()
-        recommended_movies_by_director = engine.recommend_movies_by_director()
+        payload = get_recommendations(user_id, lambda: self.build_recommendations(user_id))
+        return HttpResponse(payload, content_type='application/json')
 
+class RecommendationCacheStatsView(APIView):
+    """
+    API view to report the recommendation cache hit and miss counters, for sizing it.
+    """
+    permission_classes = [IsAdminUser]
 
-        movie_serializer = MovieSerializer(recommended_movies_by_director, many=True)
-        sequel_serializer = SequelSerializer(recommended_sequels, many=True)
+    def get(self, request):
+        """
+        Get method for recommendation cache stats.
+        """
+        return Response(recommendation_cache_stats())
 
-        return Response({
-            'recommended_movies': movie_serializer.data,
-            'recommended_sequels': sequel_serializer.data,
-        })
+class HistoryCreateMixin:
+    """
+    Mixin for history views that record events into the rollup tables.
 
-class SearchHistoryListCreateView(generics.ListCreateAPIView):
+    POSTs are validated with `serializer_class` and recorded with
+    `history.record_events`; lists read `rollup_queryset` with
+    `rollup_serializer_class`. With `HISTORY_BUFFER_ENABLED`, a valid POST is
+    queued and answered with 202 Accepted before it is written; otherwise it is
+    recorded at once.
+    """
+    buffer = None
+    rollup_queryset = None
+    rollup_serializer_class = None
+    pagination_class = LastSeenPagination
+
+    def get_queryset(self):
+        return self.rollup_queryset.all()
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return self.rollup_serializer_class
+        return super().get_serializer_class()
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance = serializer.Meta.model(**serializer.validated_data)
+        # Taken now, so buffered events keep the time they were requested.
+        instance.watched_at = timezone.now()
+        if not settings.HISTORY_BUFFER_ENABLED:
+            record_events(serializer.Meta.model, [instance])
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        if not self.buffer.put(instance):
+            return Response({'error': 'History buffer is full'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+class SearchHistoryListCreateView(HistoryCreateMixin, generics.ListCreateAPIView):
     """
     API view to list and create search history entries.
+    Entries are written behind through the search history buffer.
     """
-    queryset = SearchHistory.objects.all()
     serializer_class = SearchHistorySerializer
+    rollup_queryset = SearchHistoryRollup.objects.all()
+    rollup_serializer_class = SearchHistoryRollupSerializer
+    buffer = search_history_buffer
 
 class SearchHistoryDetailView(generics.ListAPIView):
     """
-    API view to retrieve, update, or delete a specific search history entry.
+    API view to list the search history of a user, one entry per movie.
     """
-    serializer_class = SearchHistorySerializer
+    serializer_class = SearchHistoryRollupSerializer
     permission_classes = [AllowAny]
+    pagination_class = LastSeenPagination
 
     def get_queryset(self):
         user_id = self.request.query_params.get('user_id')
-        return SearchHistory.objects.filter(logged_id=user_id).order_by('-watched_at')
+        return SearchHistoryRollup.objects.filter(logged_id=user_id)
 
-class WatchHistoryListCreateView(generics.ListCreateAPIView):
+class WatchHistoryListCreateView(HistoryCreateMixin, generics.ListCreateAPIView):
     """
     API view to list and create watch history entries.
+    Entries are written behind through the watch history buffer.
     """
-    queryset = WatchHistory.objects.all()
     serializer_class = WatchHistorySerializer
+    rollup_queryset = WatchHistoryRollup.objects.all()
+    rollup_serializer_class = WatchHistoryRollupSerializer
     permission_classes = [AllowAny]
+    buffer = watch_history_buffer
+
+class HistoryBufferStatsView(APIView):
+    """
+    API view to report the queue depth and counters of the history write-behind buffers.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        """
+        Get method for history buffer stats.
+        """
+        return Response({
+            'watch_history': watch_history_buffer.stats(),
+            'search_history': search_history_buffer.stats(),
+        })
 
 
 class UserWatchHistoryListView(generics.ListAPIView):
     """
-    API view to list watch history for the authenticated user.
+    API view to list watch history for the authenticated user, one entry per movie.
     """
-    serializer_class = WatchHistorySerializer
+    serializer_class = WatchHistoryRollupSerializer
     permission_classes = [AllowAny]
+    pagination_class = LastSeenPagination
 
     def get_queryset(self):
         user_id = self.request.query_params.get('user_id')
-        return WatchHistory.objects.filter(logged_id=user_id).order_by('-watched_at')
+        return WatchHistoryRollup.objects.filter(logged_id=user_id)
 
 class MovieListView(generics.RetrieveAPIView):
     """
@@ -253,6 +462,7 @@ class ClearWatchHistoryView(APIView):
 
     def post(self, request, *args, **kwargs):
         user = request.user
+        WatchHistoryRollup.objects.filter(logged_id=user.id).delete()
         WatchHistory.objects.filter(logged_id=user.id).delete()
         return Response({'message': 'Watch history cleared successfully.'})
 
@@ -265,6 +475,7 @@ class ClearSearchHistoryView(APIView):
     def post(self, request, *args, **kwargs):
         user_id = self.request.query_params.get('user_id')
         print(user_id)
+        SearchHistoryRollup.objects.filter(logged_id=user_id).delete()
         SearchHistory.objects.filter(logged_id=user_id).delete()
         return JsonResponse({'message': 'Watch history cleared successfully.'})
 
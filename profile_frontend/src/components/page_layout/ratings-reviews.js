@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { FaChevronDown, FaChevronUp } from 'react-icons/fa';
-import { truncateText } from '../utility_functions/utils';
+import { fetchAllPages, truncateText } from '../utility_functions/utils';
 import { Rating } from 'react-simple-star-rating';
 import { useUser } from '../utility_functions/useContext';
 import './css/rating-reviews.css';
@@ -20,13 +20,14 @@ const ReviewsSection = ({ movieId }) => {
     const fetchReviews = async () => {
       setLoading(true);
       try {
-        const response = await axios.get(`http://localhost:8000/api/rating-reviews/list/?movie_id=${movieId}`, {
+        const allReviews = await fetchAllPages('http://localhost:8000/api/rating-reviews/list/', {
+          params: { movie_id: movieId },
           withCredentials: true,
           headers: { 'X-CSRFToken': getCsrfToken() },
         });
-        setReviews(response.data);
+        setReviews(allReviews);
         if (isLoggedIn) {
-          const userReview = response.data.find(review => review.logged_id === user.user_id);
+          const userReview = allReviews.find(review => review.logged_id === user.user_id);
           setHasReviewed(!!userReview);
         }
       } catch (error) {
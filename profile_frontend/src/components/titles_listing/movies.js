@@ -4,8 +4,12 @@ import ReactPaginate from 'react-paginate';
 import { useNavigate } from 'react-router-dom';
 import Sidebar from '../page_layout/sidebar';
 import { useUser } from '../utility_functions/useContext';
+import { fetchAllPages } from '../utility_functions/utils';
 import './css/movies.css';
 
+// The fields the grid filters on and shows; list endpoints return only id, title and image_url by default.
+const GRID_FIELDS = 'id,title,image_url,genre,director,release_date,tmdb_popularity,description';
+
 const Movies = () => {
     const [items, setItems] = useState([]);
     const { user, logout } = useUser();
@@ -20,11 +24,11 @@ const Movies = () => {
     useEffect(() => {
         const fetchData = async () => {
             try {
-                const [moviesResponse, sequelsResponse] = await axios.all([
-                    axios.get('http://localhost:8000/api/movies/'),
-                    axios.get('http://localhost:8000/api/sequels/')
+                const [movies, sequels] = await Promise.all([
+                    fetchAllPages('http://localhost:8000/api/movies/', { params: { fields: GRID_FIELDS } }),
+                    fetchAllPages('http://localhost:8000/api/sequels/', { params: { fields: GRID_FIELDS } })
                 ]);
-                const combinedItems = [...moviesResponse.data, ...sequelsResponse.data].filter(item => item.image_url);
+                const combinedItems = [...movies, ...sequels].filter(item => item.image_url);
                 setItems(combinedItems);
                 setFilteredItems(combinedItems);
             } catch (error) {
@@ -4,10 +4,13 @@ import axios from 'axios';
 import ReactPaginate from 'react-paginate';
 import Sidebar from '../page_layout/sidebar';
 import { useUser } from '../utility_functions/useContext';
-import { truncateText } from '../utility_functions/utils';
+import { fetchAllPages, truncateText } from '../utility_functions/utils';
 import './css/sequels.css';
 import { RiMovie2Line } from "react-icons/ri";
 
+// The fields the grid filters on and shows; list endpoints return only id, title and image_url by default.
+const GRID_FIELDS = 'id,title,image_url,genre,director,release_date,tmdb_popularity,description';
+
 /**
  * Component for displaying and filtering movie sequels.
  *
@@ -27,9 +30,9 @@ const Sequels = () => {
     useEffect(() => {
         const fetchSequels = async () => {
             try {
-                const response = await axios.get('http://localhost:8000/api/sequels/');
-                console.log('Received sequels data:', response.data);
-                const sequelsData = response.data.filter(sequel => sequel.image_url);
+                const sequels = await fetchAllPages('http://localhost:8000/api/sequels/', { params: { fields: GRID_FIELDS } });
+                console.log('Received sequels data:', sequels);
+                const sequelsData = sequels.filter(sequel => sequel.image_url);
                 setSequels(sequelsData);
                 setFilteredSequels(sequelsData);
             } catch (error) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useUser } from '../utility_functions/useContext';
+import { fetchAllPages } from '../utility_functions/utils';
 import '../user_auth/css/watchHistory.css';
 
 const SearchHistory = () => {
@@ -17,12 +18,12 @@ const SearchHistory = () => {
     useEffect(() => {
         const fetchWatchHistory = async () => {
             try {
-                const response = await axios.get('http://localhost:8000/api/list-search-history/', {
+                const history = await fetchAllPages('http://localhost:8000/api/list-search-history/', {
                     params: { user_id: user.user_id },
                     withCredentials: true,
                     headers: { 'X-CSRFToken': getCsrfToken() },
                 });
-                setItems(response.data);
+                setItems(history);
             } catch (error) {
                 console.error('Error fetching watch history:', error);
                 alert('Failed to fetch watch history, please try again later.');
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import { useUser } from '../utility_functions/useContext';
+import { fetchAllPages } from '../utility_functions/utils';
 import '../user_auth/css/watchHistory.css';
 
 const WatchHistory = () => {
@@ -16,12 +17,12 @@ const WatchHistory = () => {
 
     const fetchWatchHistory = async () => {
         try {
-            const response = await axios.get('http://localhost:8000/api/list-watch-history/', {
+            const history = await fetchAllPages('http://localhost:8000/api/list-watch-history/', {
                 params: { user_id: user.user_id },
                 withCredentials: true,
                 headers: { 'X-CSRFToken': getCsrfToken() },
             });
-            setItems(response.data);
+            setItems(history);
         } catch (error) {
             console.error('Error fetching watch history:', error);
             alert('Failed to fetch watch history, please try again later.');
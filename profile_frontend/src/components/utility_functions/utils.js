@@ -1,4 +1,8 @@
 // src/utils.js
+import axios from 'axios';
+
+// The largest page the API's list endpoints serve.
+const MAX_PAGE_SIZE = 500;
 
 /**
  * Truncates text to a specified number of words.
@@ -13,3 +17,26 @@ export const truncateText = (text, maxWords) => {
     }
     return text;
 };
+
+/**
+ * Fetches every page of a paginated list endpoint. Each page is a plain array,
+ * and the URL of the next one is in the `Link: <url>; rel="next"` header, which
+ * is absent on the last page.
+ * @param {string} url - The list endpoint.
+ * @param {object} config - The axios request config, such as params and headers.
+ * @returns {Promise<Array>} The items of every page, in order.
+ */
+export const fetchAllPages = async (url, config = {}) => {
+    const items = [];
+    let next = url;
+    let params = { page_size: MAX_PAGE_SIZE, ...config.params };
+    while (next) {
+        const response = await axios.get(next, { ...config, params });
+        items.push(...response.data);
+        const match = /<([^>]+)>;\s*rel="next"/.exec(response.headers.link || '');
+        next = match ? match[1] : null;
+        // The next link already carries every query parameter.
+        params = undefined;
+    }
+    return items;
+};